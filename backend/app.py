@@ -2,21 +2,22 @@
 UniVideo 后端主应用入口
 提供视频分享平台的核心API服务
 """
-from flask import Flask, jsonify
+from flask import Flask
 from flask_cors import CORS
 from flask_migrate import Migrate
 import os
 
 # 导入配置和数据库模型
-from config import config
+from config import config, build_engine_options
 from models import db
 
 # 创建Flask应用实例
-def create_app(config_name='development'):
+def create_app(config_name='development', config_overrides=None):
     """
     应用工厂函数：创建并配置Flask应用
     参数:
         config_name: 配置环境名称 ('development', 'testing', 'production')
+        config_overrides: 覆盖配置项的字典（可选，如性能测试时指定数据库URI）
     返回:
         配置好的Flask应用实例
     """
@@ -27,12 +28,85 @@ def create_app(config_name='development'):
     
     # 加载配置
     app.config.from_object(config[config_name])
+    if config_overrides:
+        app.config.update(config_overrides)
+    # 未显式指定引擎参数时，按 DB_POOL_* 配置生成连接池参数
+    if 'SQLALCHEMY_ENGINE_OPTIONS' not in app.config:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(app.config)
+    
+    # 设置 JSON provider（默认使用 orjson 加速 jsonify）
+    from utils.json_provider import init_json_provider
+    init_json_provider(app)
     
     # 初始化扩展
     db.init_app(app)  # 初始化SQLAlchemy
     migrate = Migrate(app, db)  # 初始化Flask-Migrate数据库迁移工具
     CORS(app)  # 初始化CORS，允许前端跨域访问
     
+    # 初始化JWT认证（登录签发令牌，@login_required 无状态校验）
+    from utils.auth import init_auth
+    init_auth(app)
+    
+    # 配置密码哈希线程池（算法强度、并发上限）
+    from utils.passwords import init_passwords
+    init_passwords(app)
+    
+    # 初始化Prometheus指标（请求延迟、连接池、上传量、缓存命中率），通过 /metrics 暴露
+    from utils.metrics import init_metrics
+    init_metrics(app)
+    
+    # 初始化SQL性能分析（按配置启用）
+    from utils.sql_profiler import init_sql_profiler
+    init_sql_profiler(app)
+    
+    # 初始化读写分离（配置 DATABASE_REPLICA_URL 时生效）
+    from utils.replica import init_replica
+    init_replica(app)
+    
+    # 初始化准入控制（限流、上传并发上限、过载保护）
+    from utils.rate_limit import init_rate_limit
+    init_rate_limit(app)
+    
+    # 启用响应压缩（gzip / brotli）
+    from utils.compression import init_compression
+    init_compression(app)
+    
+    # 按配置设置进程内缓存的过期时间
+    from utils.cache import configure_caches
+    configure_caches(app)
+    
+    # 配置运营统计批量写回（需在播放量计数器之前注册：退出时播放量先写回，其播放次数再随运营统计写回）
+    from utils.analytics import init_analytics
+    init_analytics(app)
+    
+    # 配置播放量批量写回
+    from utils.view_counter import init_view_counter
+    init_view_counter(app)
+    
+    # 配置独立访客草图写回（HyperLogLog）
+    from utils.unique_viewers import init_unique_viewers
+    init_unique_viewers(app)
+    
+    # 配置播放心跳日志分段文件（flask rollup-playback 汇总）
+    from utils.playback import init_playback
+    init_playback(app)
+    
+    # 配置标题联想索引（预热或第一次查询时构建）
+    from utils.suggest import init_suggest
+    init_suggest(app)
+    
+    # 注册相关视频构建命令（flask build-related）
+    from utils.related import init_related
+    init_related(app)
+    
+    # 注册首页推荐候选列表构建命令（flask build-feeds）
+    from utils.personal_feed import init_personal_feed
+    init_personal_feed(app)
+    
+    # 注册作者统计全量重算命令（flask recompute-author-stats）
+    from utils.author_stats import init_author_stats
+    init_author_stats(app)
+    
     # 确保上传目录存在
     with app.app_context():
         os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'videos'), exist_ok=True)
@@ -59,6 +133,10 @@ def create_app(config_name='development'):
     from routes.user import user_bp
     app.register_blueprint(user_bp, url_prefix='/api/users')
     
+    # 注册健康检查路由蓝图（存活、就绪、连接池统计）
+    from routes.health import health_bp
+    app.register_blueprint(health_bp, url_prefix='/api/health')
+    
     return app
 
 # 创建应用实例
@@ -73,27 +151,6 @@ def index():
     return "UniVideo API is running..."
 
 
-@app.route('/api/health')
-def health_check():
-    """
-    健康检查接口：用于监控服务状态和数据库连接
-    """
-    from sqlalchemy import text
-    try:
-        # 测试数据库连接
-        db.session.execute(text('SELECT 1'))
-        db_status = 'connected'
-    except Exception as e:
-        db_status = f'error: {str(e)}'
-    
-    return jsonify({
-        'status': 'healthy',
-        'service': 'UniVideo Backend',
-        'database': db_status,
-        'version': '1.0.0'
-    })
-
-
 if __name__ == '__main__':
     # 开发模式运行，启用调试和自动重载
     app.run(
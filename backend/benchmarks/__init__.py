@@ -0,0 +1,4 @@
+"""
+性能测试模块
+包含接口基准测试、并发压测等脚本（在 backend 目录下以 python -m benchmarks.xxx 运行）
+"""
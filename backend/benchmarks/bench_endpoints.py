@@ -0,0 +1,271 @@
+"""
+接口基准测试
+通过 Flask test client 在指定规模的 SQLite 合成数据库上依次调用各蓝图的接口，
+统计每个场景的 p50/p95/p99 延迟、每请求SQL查询次数和峰值内存，结果保存为 JSON 基线；
+compare 子命令对比两份结果，任一场景退化超过阈值时以非零状态码退出（可用于 CI 门禁）。
+
+使用方法（在 backend 目录下）:
+    # 运行基准测试（数据库文件不存在时自动生成合成数据）
+    python -m benchmarks.bench_endpoints run --db benchmarks/results/bench.db --out benchmarks/results/baseline.json
+
+    # 修改代码后再次运行，并与基线对比（退化超过 20% 时失败）
+    python -m benchmarks.bench_endpoints run --db benchmarks/results/bench.db --out benchmarks/results/current.json
+    python -m benchmarks.bench_endpoints compare benchmarks/results/baseline.json benchmarks/results/current.json --threshold 0.2
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.common import (
+    DEFAULT_DATASET,
+    auth_headers,
+    create_bench_app,
+    ensure_dataset,
+    load_samples,
+    percentile,
+)
+
+
+# ==================== 测试场景 ====================
+# 每个场景返回 (HTTP方法, URL, 请求参数)，rng 用于在样本中随机挑选ID
+
+def _pick(rng, values):
+    return rng.choice(values) if values else 1
+
+
+def _as_user(rng, s, key='user_ids', **kwargs):
+    """
+    以随机样本用户的身份请求（携带该用户的访问令牌）
+    """
+    return dict(kwargs, headers=auth_headers(s, _pick(rng, s[key])))
+
+
+def _as_admin(s, **kwargs):
+    return dict(kwargs, headers=auth_headers(s, s['admin_id']))
+
+
+SCENARIOS = {
+    # 视频蓝图
+    'video.categories': lambda rng, s: ('GET', '/api/videos/categories', {}),
+    'video.list': lambda rng, s: ('GET', '/api/videos/list', {}),
+    'video.list_category': lambda rng, s: ('GET', '/api/videos/list', {'query_string': {'category_id': rng.randint(1, 4)}}),
+    'video.list_search': lambda rng, s: ('GET', '/api/videos/list', {'query_string': {'keyword': str(rng.randint(1, 99))}}),
+    'video.suggest': lambda rng, s: ('GET', '/api/videos/suggest', {'query_string': {'q': f'视频 {rng.randint(1, 99)}'}}),
+    'video.detail': lambda rng, s: ('GET', f"/api/videos/{_pick(rng, s['video_ids'])}", {}),
+    'video.related': lambda rng, s: ('GET', f"/api/videos/{_pick(rng, s['video_ids'])}/related", {}),
+    'video.personal_feed': lambda rng, s: ('GET', '/api/videos/list', _as_user(rng, s, query_string={'mode': 'personal'})),
+    # 互动蓝图
+    'interaction.comments': lambda rng, s: ('GET', f"/api/videos/{_pick(rng, s['video_ids'])}/comments", {}),
+    'interaction.like_status': lambda rng, s: (
+        'GET', f"/api/videos/{_pick(rng, s['video_ids'])}/like/status", _as_user(rng, s)),
+    'interaction.collect_status': lambda rng, s: (
+        'GET', f"/api/videos/{_pick(rng, s['video_ids'])}/collect/status", _as_user(rng, s)),
+    'interaction.toggle_like': lambda rng, s: (
+        'POST', f"/api/videos/{_pick(rng, s['video_ids'])}/like", _as_user(rng, s)),
+    'interaction.toggle_collect': lambda rng, s: (
+        'POST', f"/api/videos/{_pick(rng, s['video_ids'])}/collect", _as_user(rng, s)),
+    'interaction.create_comment': lambda rng, s: (
+        'POST', f"/api/videos/{_pick(rng, s['video_ids'])}/comments",
+        _as_user(rng, s, json={'content': '基准测试评论'})),
+    # 用户蓝图
+    'user.profile': lambda rng, s: ('GET', '/api/users/me', _as_user(rng, s)),
+    'user.my_videos': lambda rng, s: ('GET', '/api/users/me/videos', _as_user(rng, s, 'uploader_ids')),
+    'user.my_collections': lambda rng, s: ('GET', '/api/users/me/collections', _as_user(rng, s)),
+    'user.author_page': lambda rng, s: ('GET', f"/api/users/{_pick(rng, s['uploader_ids'])}", {}),
+    # 管理员蓝图
+    'admin.manage_list': lambda rng, s: ('GET', '/api/admin/manage/list', _as_admin(s, query_string={'status': 1})),
+    'admin.audit_list': lambda rng, s: ('GET', '/api/admin/audit/list', _as_admin(s)),
+}
+
+
+def build_request(name, rng, samples):
+    """
+    构建场景的请求参数
+    """
+    return SCENARIOS[name](rng, samples)
+
+
+def _call(client, method, url, kwargs):
+    """
+    发送请求并返回 (响应状态码, 本次请求的SQL查询次数)
+    """
+    response = client.open(url, method=method, **kwargs)
+    queries = int(response.headers.get('X-DB-Query-Count', 0))
+    status = response.status_code
+    response.close()
+    return status, queries
+
+
+def run_scenario(app, name, samples, requests, warmup, memory_requests, seed):
+    """
+    运行单个场景
+    返回:
+        dict: 延迟分位数、平均查询次数、峰值内存、错误数
+    """
+    client = app.test_client()
+    rng = random.Random(f'{seed}:{name}')
+
+    for _ in range(warmup):
+        _call(client, *build_request(name, rng, samples))
+
+    latencies, query_counts, errors = [], [], 0
+    gc.collect()
+    for _ in range(requests):
+        method, url, kwargs = build_request(name, rng, samples)
+        start = time.perf_counter()
+        status, queries = _call(client, method, url, kwargs)
+        latencies.append((time.perf_counter() - start) * 1000)
+        query_counts.append(queries)
+        if status >= 500:
+            errors += 1
+
+    # 峰值内存单独测量（tracemalloc 会显著拖慢执行，不与延迟测量混在一起）
+    tracemalloc.start()
+    for _ in range(memory_requests):
+        _call(client, *build_request(name, rng, samples))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        'queries_per_request': round(sum(query_counts) / len(query_counts), 2) if query_counts else 0.0,
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def run(args):
+    """
+    运行基准测试并保存结果
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    app = create_bench_app(args.db)
+    ensure_dataset(app, args.users, args.videos, args.interactions, args.seed)
+    samples = load_samples(app)
+
+    names = args.scenarios.split(',') if args.scenarios else list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        print(f'未知场景: {", ".join(unknown)}')
+        return 2
+
+    results = {}
+    print(f'{"场景":<30}{"p50":>10}{"p95":>10}{"p99":>10}{"查询/请求":>12}{"峰值内存KB":>14}')
+    for name in names:
+        result = run_scenario(app, name, samples, args.requests, args.warmup, args.memory_requests, args.seed)
+        results[name] = result
+        print(f'{name:<30}{result["p50_ms"]:>10.2f}{result["p95_ms"]:>10.2f}{result["p99_ms"]:>10.2f}'
+              f'{result["queries_per_request"]:>12.1f}{result["peak_memory_kb"]:>14.1f}')
+
+    report = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'dataset': {
+                'users': args.users,
+                'videos': args.videos,
+                'interactions': args.interactions,
+                'seed': args.seed,
+            },
+            'requests_per_scenario': args.requests,
+        },
+        'scenarios': results,
+    }
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'\n结果已保存: {args.out}')
+    return 0
+
+
+# 参与退化判断的指标
+COMPARE_METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request', 'peak_memory_kb')
+
+
+def compare(args):
+    """
+    对比基线与当前结果，任一场景指标退化超过阈值时返回非零状态码
+    """
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)['scenarios']
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)['scenarios']
+
+    metrics = args.metrics.split(',') if args.metrics else COMPARE_METRICS
+    regressions = []
+    for name, result in current.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f'{name}: 基线中没有该场景，跳过')
+            continue
+        for metric in metrics:
+            old, new = base.get(metric, 0), result.get(metric, 0)
+            # 基线值很小时允许一个绝对误差，避免亚毫秒级抖动被判定为退化
+            if new <= old * (1 + args.threshold) or new - old <= args.min_delta.get(metric, 0):
+                continue
+            change = (new - old) / old if old else float('inf')
+            regressions.append((name, metric, old, new, change))
+
+    if not regressions:
+        print(f'✓ 没有场景退化超过 {args.threshold:.0%}')
+        return 0
+
+    print(f'✗ {len(regressions)} 项指标退化超过 {args.threshold:.0%}:')
+    for name, metric, old, new, change in regressions:
+        print(f'  {name:<30}{metric:<22}{old:>10} -> {new:<10} (+{change:.0%})')
+    return 1
+
+
+def parse_args(argv=None):
+    """
+    解析命令行参数
+    """
+    parser = argparse.ArgumentParser(description='UniVideo 接口基准测试')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = sub.add_parser('run', help='运行基准测试')
+    run_parser.add_argument('--db', default='benchmarks/results/bench.db', help='SQLite 数据库文件')
+    run_parser.add_argument('--out', help='结果 JSON 文件')
+    run_parser.add_argument('--users', type=int, default=DEFAULT_DATASET['users'])
+    run_parser.add_argument('--videos', type=int, default=DEFAULT_DATASET['videos'])
+    run_parser.add_argument('--interactions', type=int, default=DEFAULT_DATASET['interactions'])
+    run_parser.add_argument('--seed', type=int, default=DEFAULT_DATASET['seed'])
+    run_parser.add_argument('--requests', type=int, default=50, help='每个场景的请求次数')
+    run_parser.add_argument('--warmup', type=int, default=5, help='每个场景的预热请求次数')
+    run_parser.add_argument('--memory-requests', type=int, default=5, help='测量峰值内存的请求次数')
+    run_parser.add_argument('--scenarios', help='只运行指定场景（逗号分隔）')
+
+    compare_parser = sub.add_parser('compare', help='对比基线与当前结果')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.2, help='允许的退化比例（0.2 表示 20%%）')
+    compare_parser.add_argument('--metrics', help=f'参与对比的指标（默认 {",".join(COMPARE_METRICS)}）')
+
+    args = parser.parse_args(argv)
+    if args.command == 'compare':
+        # 各指标的最小绝对退化量
+        args.min_delta = {'p50_ms': 0.5, 'p95_ms': 1.0, 'p99_ms': 2.0, 'queries_per_request': 0.5, 'peak_memory_kb': 64}
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    return run(args) if args.command == 'run' else compare(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
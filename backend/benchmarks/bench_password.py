@@ -0,0 +1,165 @@
+"""
+登录吞吐量基准测试
+多个线程同时调用登录接口（Flask test client），按哈希算法统计每秒登录次数、每核每秒登录次数和登录延迟分位数；
+同时用一个探测线程持续请求分类列表接口，观察登录高峰期间其他接口的延迟是否受影响。
+
+测试前会用每个样本用户登录一次，使数据库中的哈希升级为当前测试的算法（登录时自动 rehash），
+因此测试会修改数据库文件中样本用户的密码哈希（密码不变）。
+
+使用方法（在 backend 目录下）:
+    python -m benchmarks.bench_password --db benchmarks/results/bench.db
+    python -m benchmarks.bench_password --methods pbkdf2:sha256:600000,pbkdf2:sha256:260000,scrypt:32768:8:1 --concurrency 16
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+from benchmarks.common import (
+    DEFAULT_DATASET,
+    create_bench_app,
+    ensure_dataset,
+    load_samples,
+    percentile,
+)
+
+# 探测接口：登录高峰期间其他请求的延迟
+PROBE_PATH = '/api/videos/categories'
+
+
+def cpu_cores():
+    """
+    当前进程可用的 CPU 核数
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _usernames(app, user_ids):
+    from models import User
+
+    with app.app_context():
+        return [username for (username,) in User.query.with_entities(User.username)
+                .filter(User.id.in_(user_ids)).order_by(User.id)]
+
+
+def run_method(db_path, method, args):
+    """
+    测试一种哈希算法
+    返回:
+        dict: 吞吐量、延迟分位数、探测接口延迟
+    """
+    from utils.synthetic import BULK_USER_PASSWORD
+
+    app = create_bench_app(db_path, {
+        'SQL_PROFILER_ENABLED': False,
+        'PASSWORD_HASH_METHOD': method,
+        'PASSWORD_HASH_WORKERS': args.workers,
+        'PASSWORD_HASH_MAX_PENDING': max(args.concurrency, 1) * 2,
+    })
+    usernames = _usernames(app, load_samples(app, limit=args.users_sample)['user_ids'])
+
+    # 预热：每个用户登录一次，把哈希升级为本次测试的算法
+    client = app.test_client()
+    for username in usernames:
+        client.post('/api/auth/login', json={'username': username, 'password': BULK_USER_PASSWORD}).close()
+
+    latencies, probe_latencies = [], []
+    status = {}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def login_worker(index):
+        worker_client = app.test_client()
+        i = index
+        while not stop.is_set():
+            username = usernames[i % len(usernames)]
+            i += args.concurrency
+            start = time.perf_counter()
+            response = worker_client.post('/api/auth/login', json={'username': username, 'password': BULK_USER_PASSWORD})
+            elapsed = (time.perf_counter() - start) * 1000
+            code = response.status_code
+            response.close()
+            with lock:
+                latencies.append(elapsed)
+                status[code] = status.get(code, 0) + 1
+
+    def probe_worker():
+        probe_client = app.test_client()
+        while not stop.is_set():
+            start = time.perf_counter()
+            probe_client.get(PROBE_PATH).close()
+            probe_latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login_worker, args=(i,), daemon=True) for i in range(args.concurrency)]
+    threads.append(threading.Thread(target=probe_worker, daemon=True))
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    probe_latencies.sort()
+    cores = cpu_cores()
+    succeeded = status.get(200, 0)
+    return {
+        'method': method,
+        'logins': succeeded,
+        'status': status,
+        'logins_per_second': round(succeeded / elapsed, 2),
+        'logins_per_second_per_core': round(succeeded / elapsed / cores, 2),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'probe_p50_ms': round(percentile(probe_latencies, 50), 2),
+        'probe_p95_ms': round(percentile(probe_latencies, 95), 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='UniVideo 登录吞吐量基准测试')
+    parser.add_argument('--db', default='benchmarks/results/bench.db', help='SQLite 数据库文件')
+    parser.add_argument('--methods', default='pbkdf2:sha256:600000', help='参与测试的哈希算法（逗号分隔）')
+    parser.add_argument('--concurrency', type=int, default=8, help='并发登录线程数')
+    parser.add_argument('--duration', type=float, default=10, help='每种算法的测试时长（秒）')
+    parser.add_argument('--workers', type=int, default=0, help='PASSWORD_HASH_WORKERS（0 表示 CPU 核数）')
+    parser.add_argument('--users-sample', type=int, default=50, help='参与登录的用户数')
+    parser.add_argument('--users', type=int, default=DEFAULT_DATASET['users'])
+    parser.add_argument('--videos', type=int, default=DEFAULT_DATASET['videos'])
+    parser.add_argument('--interactions', type=int, default=DEFAULT_DATASET['interactions'])
+    parser.add_argument('--seed', type=int, default=DEFAULT_DATASET['seed'])
+    parser.add_argument('--out', help='结果 JSON 文件')
+    args = parser.parse_args(argv)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    ensure_dataset(create_bench_app(args.db), args.users, args.videos, args.interactions, args.seed)
+
+    print(f'CPU 核数: {cpu_cores()}，并发登录线程: {args.concurrency}，每种算法 {args.duration} 秒')
+    print(f'{"算法":<26}{"登录/秒":>10}{"每核/秒":>10}{"p50":>10}{"p95":>10}{"探测p50":>10}{"探测p95":>10}')
+    results = []
+    for method in args.methods.split(','):
+        result = run_method(args.db, method.strip(), args)
+        results.append(result)
+        print(f'{result["method"]:<26}{result["logins_per_second"]:>10.1f}{result["logins_per_second_per_core"]:>10.1f}'
+              f'{result["p50_ms"]:>10.1f}{result["p95_ms"]:>10.1f}{result["probe_p50_ms"]:>10.1f}{result["probe_p95_ms"]:>10.1f}')
+        other = {code: count for code, count in result['status'].items() if code != 200}
+        if other:
+            print(f'  非 200 响应: {other}')
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'cores': cpu_cores(), 'concurrency': args.concurrency, 'results': results},
+                      f, ensure_ascii=False, indent=2)
+        print(f'\n结果已保存: {args.out}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,134 @@
+"""
+性能测试公共模块
+负责创建指向 SQLite 测试库的应用实例、按需生成合成数据，并抽取压测使用的样本ID
+"""
+import logging
+import os
+import sys
+
+# 保证以 python -m benchmarks.xxx 或直接运行脚本时都能导入 backend 下的模块
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# 导入 app 模块时会按 FLASK_ENV 创建一个默认应用实例，这里避免其连接开发环境的 MySQL
+os.environ.setdefault('FLASK_ENV', 'testing')
+
+from sqlalchemy import select, func  # noqa: E402
+
+from app import create_app  # noqa: E402
+from models import db, User, Video  # noqa: E402
+
+# 默认数据规模（可通过命令行参数调整）
+DEFAULT_DATASET = {
+    'users': 500,
+    'videos': 2000,
+    'interactions': 50000,
+    'seed': 42,
+}
+
+# 压测使用的管理员账号
+BENCH_ADMIN_USERNAME = 'bench_admin'
+
+
+def create_bench_app(db_path, extra_config=None):
+    """
+    创建连接 SQLite 测试库的应用实例
+    参数:
+        db_path: SQLite 数据库文件路径
+        extra_config: 额外的配置项
+    返回:
+        Flask 应用实例
+    """
+    overrides = {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.abspath(db_path)}',
+        # 开启SQL分析，通过响应头读取每个请求的查询次数
+        'SQL_PROFILER_ENABLED': True,
+        'SQL_PROFILER_HEADERS': True,
+    }
+    overrides.update(extra_config or {})
+    app = create_app('testing', config_overrides=overrides)
+    # 压测时不输出每个请求的 N+1 告警日志（查询次数已体现在结果中）
+    app.logger.setLevel(logging.ERROR)
+    return app
+
+
+def ensure_dataset(app, users, videos, interactions, seed, log=print):
+    """
+    数据库为空时生成合成数据，并确保存在压测用的管理员账号
+    """
+    from utils.synthetic import seed_bulk
+
+    with app.app_context():
+        db.create_all()
+        if db.session.execute(select(func.count(Video.id))).scalar() == 0:
+            log(f'生成合成数据: 用户 {users}，视频 {videos}，互动 {interactions}，种子 {seed}')
+            seed_bulk(
+                users=users,
+                videos=videos,
+                likes=interactions * 5 // 10,
+                collections=interactions * 2 // 10,
+                comments=interactions - interactions * 5 // 10 - interactions * 2 // 10,
+                seed=seed,
+                log=log,
+            )
+        if User.query.filter_by(username=BENCH_ADMIN_USERNAME).first() is None:
+            admin = User(username=BENCH_ADMIN_USERNAME, nickname='压测管理员', role='admin')
+            admin.set_password('admin123')
+            db.session.add(admin)
+            db.session.commit()
+
+
+def load_samples(app, limit=200):
+    """
+    抽取压测使用的样本ID（热门视频、活跃用户、管理员），并为样本用户签发访问令牌
+    返回:
+        dict: {'video_ids': [...], 'user_ids': [...], 'uploader_ids': [...], 'admin_id': int,
+               'tokens': {用户ID: 访问令牌}}
+    """
+    from utils.auth import issue_token
+
+    with app.app_context():
+        video_ids = list(db.session.execute(
+            select(Video.id).where(Video.status == Video.STATUS_PUBLISHED)
+            .order_by(Video.view_count.desc()).limit(limit)
+        ).scalars())
+        user_ids = list(db.session.execute(
+            select(User.id).where(User.role == 'user').order_by(User.id).limit(limit)
+        ).scalars())
+        uploader_ids = list(db.session.execute(
+            select(Video.user_id).group_by(Video.user_id)
+            .order_by(func.count(Video.id).desc()).limit(limit)
+        ).scalars())
+        admin_id = db.session.execute(
+            select(User.id).where(User.username == BENCH_ADMIN_USERNAME)
+        ).scalar()
+        token_ids = set(user_ids) | set(uploader_ids) | {admin_id}
+        tokens = {
+            user.id: issue_token(user)
+            for user in User.query.filter(User.id.in_(token_ids))
+        }
+    return {
+        'video_ids': video_ids,
+        'user_ids': user_ids,
+        'uploader_ids': uploader_ids,
+        'admin_id': admin_id,
+        'tokens': tokens,
+    }
+
+
+def auth_headers(samples, user_id):
+    """
+    返回以指定用户身份请求的认证头
+    """
+    return {'Authorization': f"Bearer {samples['tokens'][user_id]}"}
+
+
+def percentile(sorted_values, pct):
+    """
+    计算已排序列表的分位数（最近秩法）
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
@@ -0,0 +1,334 @@
+"""
+并发压测工具
+按前端的真实操作流程回放用户会话，多个并发客户端（线程）同时访问本地启动的服务，
+统计吞吐量、各步骤延迟分位数、错误率以及死锁/锁等待次数；支持逐级提升并发数寻找饱和点。
+
+会话脚本（对应前端页面流程）:
+    browse  : 首页 → 分类列表 + 视频列表
+    watch   : 打开视频 → 详情 + 点赞状态 + 收藏状态 + 评论列表
+    like    : 打开视频后点赞/取消点赞
+    comment : 打开视频后发表评论
+    upload  : 上传一个小视频文件
+
+使用方法（在 backend 目录下）:
+    # 在本进程内启动服务（多线程 WSGI 服务器 + SQLite 合成数据库），16 个并发压测 30 秒
+    python -m benchmarks.loadtest --serve --db benchmarks/results/bench.db --concurrency 16 --duration 30
+
+    # 逐级提升并发数寻找饱和点
+    python -m benchmarks.loadtest --serve --ramp 1,2,4,8,16,32,64 --duration 15
+
+    # 压测已启动的服务（如 gunicorn + MySQL），用服务端的 JWT_SECRET_KEY 为样本用户签发令牌
+    JWT_SECRET_KEY=... python -m benchmarks.loadtest --url http://127.0.0.1:5001 --user-ids 1-200 --ramp 8,16,32
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from itertools import accumulate
+
+import requests
+
+from benchmarks.common import DEFAULT_DATASET, percentile
+
+# 会话类型及默认权重
+DEFAULT_MIX = {'browse': 40, 'watch': 35, 'like': 10, 'comment': 10, 'upload': 5}
+
+# 响应中出现这些关键字时计为锁冲突（MySQL 1205/1213、SQLite 写锁）
+LOCK_ERROR_MARKERS = ('deadlock', 'lock wait timeout', 'database is locked')
+
+# 饱和判定：吞吐量提升不足该比例，或错误率超过阈值
+SATURATION_GAIN = 0.10
+SATURATION_ERROR_RATE = 0.01
+
+
+class LoadStats:
+    """
+    压测统计（多线程共享）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.status = Counter()
+        self.errors = Counter()
+        self.lock_errors = 0
+        self.sessions = 0
+
+    def record(self, step, latency, status, body=None, error=None):
+        with self._lock:
+            self.latencies[step].append(latency)
+            self.status[status] += 1
+            if error is not None or status >= 400:
+                self.errors[step] += 1
+            text = (body or error or '').lower()
+            if any(marker in text for marker in LOCK_ERROR_MARKERS):
+                self.lock_errors += 1
+
+    def summary(self, elapsed):
+        with self._lock:
+            all_latencies = sorted(l for values in self.latencies.values() for l in values)
+            total = len(all_latencies)
+            errors = sum(self.errors.values())
+            steps = {}
+            for step, values in sorted(self.latencies.items()):
+                values = sorted(values)
+                steps[step] = {
+                    'requests': len(values),
+                    'errors': self.errors[step],
+                    'p50_ms': round(percentile(values, 50), 2),
+                    'p95_ms': round(percentile(values, 95), 2),
+                    'p99_ms': round(percentile(values, 99), 2),
+                }
+            return {
+                'requests': total,
+                'sessions': self.sessions,
+                'throughput_rps': round(total / elapsed, 1) if elapsed else 0.0,
+                'error_rate': round(errors / total, 4) if total else 0.0,
+                'lock_errors': self.lock_errors,
+                'p50_ms': round(percentile(all_latencies, 50), 2),
+                'p95_ms': round(percentile(all_latencies, 95), 2),
+                'p99_ms': round(percentile(all_latencies, 99), 2),
+                'status': dict(self.status),
+                'steps': steps,
+            }
+
+
+class SessionRunner:
+    """
+    单个虚拟用户：按权重随机选择会话脚本并依次执行其中的请求
+    """
+
+    def __init__(self, base_url, samples, mix, stats, rng):
+        self.base_url = base_url.rstrip('/')
+        self.samples = samples
+        self.stats = stats
+        self.rng = rng
+        self.http = requests.Session()
+        self.mix_names = list(mix)
+        self.mix_weights = list(accumulate(mix.values()))
+        self.user_id = rng.choice(samples['user_ids'])
+        self.http.headers['Authorization'] = f"Bearer {samples['tokens'][self.user_id]}"
+
+    def _request(self, step, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, timeout=30, **kwargs)
+            body = response.text if response.status_code >= 400 else None
+            self.stats.record(step, (time.perf_counter() - start) * 1000, response.status_code, body=body)
+            return response
+        except requests.RequestException as e:
+            self.stats.record(step, (time.perf_counter() - start) * 1000, 599, error=str(e))
+            return None
+
+    def _pick_video(self):
+        # 热门视频被更多人同时观看（前面的样本是播放量最高的视频）
+        return self.rng.choices(self.samples['video_ids'], cum_weights=self.samples['video_cum_weights'])[0]
+
+    def browse(self):
+        self._request('categories', 'GET', '/api/videos/categories')
+        self._request('list', 'GET', '/api/videos/list')
+
+    def watch(self, video_id=None):
+        video_id = video_id or self._pick_video()
+        self._request('detail', 'GET', f'/api/videos/{video_id}')
+        self._request('like_status', 'GET', f'/api/videos/{video_id}/like/status')
+        self._request('collect_status', 'GET', f'/api/videos/{video_id}/collect/status')
+        self._request('comments', 'GET', f'/api/videos/{video_id}/comments')
+        return video_id
+
+    def like(self):
+        video_id = self.watch()
+        self._request('toggle_like', 'POST', f'/api/videos/{video_id}/like')
+
+    def comment(self):
+        video_id = self.watch()
+        self._request('create_comment', 'POST', f'/api/videos/{video_id}/comments',
+                      json={'content': '压测评论'})
+
+    def upload(self):
+        self._request('upload', 'POST', '/api/videos/upload', data={
+            'title': '压测上传',
+            'description': '',
+            'category_id': self.rng.randint(1, 4),
+        }, files={
+            # 使用不会触发关键帧索引构建的格式，占位内容不是合法的 MP4
+            'video_file': ('loadtest.avi', io.BytesIO(b'\0' * 64 * 1024), 'video/x-msvideo'),
+            'cover_file': ('loadtest.jpg', io.BytesIO(b'\0' * 1024), 'image/jpeg'),
+        })
+
+    def run_once(self):
+        name = self.rng.choices(self.mix_names, cum_weights=self.mix_weights)[0]
+        getattr(self, name)()
+        with self.stats._lock:
+            self.stats.sessions += 1
+
+
+def run_stage(base_url, samples, mix, concurrency, duration, seed):
+    """
+    以固定并发数运行一个阶段
+    """
+    stats = LoadStats()
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        runner = SessionRunner(base_url, samples, mix, stats, random.Random(f'{seed}:{concurrency}:{index}'))
+        while time.perf_counter() < deadline:
+            runner.run_once()
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats.summary(time.perf_counter() - start)
+
+
+def start_local_server(db_path, args):
+    """
+    在后台线程中启动多线程 WSGI 服务器（连接 SQLite 合成数据库）
+    返回:
+        tuple: (服务地址, 压测样本)
+    """
+    from werkzeug.serving import make_server
+
+    from benchmarks.common import create_bench_app, ensure_dataset, load_samples
+
+    # 压测上传的文件写入数据库文件旁的临时目录，不污染 static 目录
+    upload_folder = os.path.join(os.path.dirname(os.path.abspath(db_path)), 'uploads')
+    app = create_bench_app(db_path, {'SQL_PROFILER_ENABLED': False, 'UPLOAD_FOLDER': upload_folder})
+    ensure_dataset(app, args.users, args.videos, args.interactions, args.seed)
+    samples = load_samples(app)
+    # 关闭逐请求的访问日志
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', args.port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', samples
+
+
+def mint_tokens(secret, user_ids):
+    """
+    用服务端的 JWT 密钥为样本用户签发访问令牌（--url 模式下无法得知样本用户的密码）
+    """
+    from types import SimpleNamespace
+
+    from flask import Flask
+
+    from utils.auth import init_auth, issue_token
+
+    app = Flask('loadtest')
+    app.config['JWT_SECRET_KEY'] = secret
+    init_auth(app)
+    with app.app_context():
+        return {
+            user_id: issue_token(SimpleNamespace(id=user_id, role='user', nickname=''))
+            for user_id in user_ids
+        }
+
+
+def discover_samples(base_url, user_ids, jwt_secret):
+    """
+    从已启动的服务获取压测样本（视频ID取自已发布视频列表）
+    """
+    response = requests.get(base_url.rstrip('/') + '/api/videos/list', timeout=60)
+    response.raise_for_status()
+    videos = sorted(response.json()['data'], key=lambda v: v.get('view_count', 0), reverse=True)
+    return {
+        'video_ids': [video['id'] for video in videos[:200]],
+        'user_ids': user_ids,
+        'tokens': mint_tokens(jwt_secret, user_ids),
+    }
+
+
+def parse_id_range(value):
+    """
+    解析用户ID范围，如 "1-200" 或 "1,5,9"
+    """
+    if '-' in value:
+        low, high = value.split('-', 1)
+        return list(range(int(low), int(high) + 1))
+    return [int(part) for part in value.split(',')]
+
+
+def print_stage(concurrency, result):
+    print(f'{concurrency:>6}{result["throughput_rps"]:>12.1f}{result["p50_ms"]:>10.1f}{result["p95_ms"]:>10.1f}'
+          f'{result["p99_ms"]:>10.1f}{result["error_rate"]:>10.2%}{result["lock_errors"]:>8}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='UniVideo 并发压测')
+    parser.add_argument('--url', help='压测已启动的服务地址')
+    parser.add_argument('--serve', action='store_true', help='在本进程内启动服务（SQLite 合成数据库）')
+    parser.add_argument('--db', default='benchmarks/results/bench.db', help='--serve 使用的 SQLite 数据库文件')
+    parser.add_argument('--port', type=int, default=0, help='--serve 监听端口（0 表示随机）')
+    parser.add_argument('--users', type=int, default=DEFAULT_DATASET['users'])
+    parser.add_argument('--videos', type=int, default=DEFAULT_DATASET['videos'])
+    parser.add_argument('--interactions', type=int, default=DEFAULT_DATASET['interactions'])
+    parser.add_argument('--seed', type=int, default=DEFAULT_DATASET['seed'])
+    parser.add_argument('--user-ids', default='1-100', help='--url 模式下使用的用户ID范围')
+    parser.add_argument('--jwt-secret', default=os.environ.get('JWT_SECRET_KEY'),
+                        help='--url 模式下签发令牌使用的密钥（默认读取环境变量 JWT_SECRET_KEY）')
+    parser.add_argument('--concurrency', type=int, default=8, help='并发客户端数')
+    parser.add_argument('--ramp', help='逐级提升的并发数（逗号分隔），如 1,2,4,8,16')
+    parser.add_argument('--duration', type=float, default=20, help='每个阶段的持续时间（秒）')
+    parser.add_argument('--mix', default=json.dumps(DEFAULT_MIX), help='会话权重 JSON')
+    parser.add_argument('--out', help='结果 JSON 文件')
+    args = parser.parse_args(argv)
+
+    if not args.url and not args.serve:
+        parser.error('需要指定 --url 或 --serve')
+    if args.url and not args.serve and not args.jwt_secret:
+        parser.error('--url 模式需要通过 --jwt-secret 或环境变量 JWT_SECRET_KEY 提供服务端的 JWT 密钥')
+
+    if args.serve:
+        base_url, samples = start_local_server(args.db, args)
+    else:
+        base_url = args.url
+        samples = discover_samples(base_url, parse_id_range(args.user_ids), args.jwt_secret)
+    if not samples['video_ids'] or not samples['user_ids']:
+        print('没有可用的视频或用户样本')
+        return 2
+    # 视频热度：按播放量排名的 Zipf 权重
+    samples['video_cum_weights'] = list(accumulate(1.0 / rank for rank in range(1, len(samples['video_ids']) + 1)))
+
+    mix = json.loads(args.mix)
+    stages = [int(c) for c in args.ramp.split(',')] if args.ramp else [args.concurrency]
+
+    print(f'压测目标: {base_url}，会话权重: {mix}')
+    print(f'{"并发":>6}{"吞吐量/s":>12}{"p50":>10}{"p95":>10}{"p99":>10}{"错误率":>10}{"锁冲突":>8}')
+    results = []
+    saturation = None
+    for concurrency in stages:
+        result = run_stage(base_url, samples, mix, concurrency, args.duration, args.seed)
+        result['concurrency'] = concurrency
+        print_stage(concurrency, result)
+        if results and saturation is None:
+            previous = results[-1]
+            gain = (result['throughput_rps'] - previous['throughput_rps']) / max(previous['throughput_rps'], 1e-9)
+            if gain < SATURATION_GAIN or result['error_rate'] > SATURATION_ERROR_RATE:
+                saturation = previous['concurrency']
+        results.append(result)
+
+    if len(stages) > 1:
+        if saturation is None:
+            print(f'\n在测试的并发范围内未达到饱和（最高 {stages[-1]}）')
+        else:
+            best = max(results, key=lambda r: r['throughput_rps'])
+            print(f'\n饱和点: 并发 {saturation}（峰值吞吐量 {best["throughput_rps"]}/s @ 并发 {best["concurrency"]}）')
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'target': base_url, 'mix': mix, 'saturation': saturation, 'stages': results},
+                      f, ensure_ascii=False, indent=2)
+        print(f'结果已保存: {args.out}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
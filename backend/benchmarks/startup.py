@@ -0,0 +1,191 @@
+"""
+启动耗时测试
+每次测量都在全新的子进程中进行，统计:
+    cold_start      : 导入 wsgi 模块（创建应用、加载蓝图和模型）的耗时
+    first_request   : 应用创建后第一个请求（首页列表）的延迟，分别测量不预热和预热两种情况
+    warmup          : 预热缓存和连接池本身的耗时
+    gunicorn        : （可选）从启动 gunicorn 到 worker 开始接受请求的耗时，以及就绪后第一个首页列表请求的延迟，
+                      分别测量不预热和预热
+
+使用方法（在 backend 目录下）:
+    python -m benchmarks.startup --db benchmarks/results/bench.db --repeat 5
+    python -m benchmarks.startup --gunicorn --workers 2
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 数据规模与 benchmarks.common.DEFAULT_DATASET 一致。
+# 子进程测量冷启动时不能提前导入 benchmarks.common（它会导入 app 模块），因此在 main 中再导入
+DEFAULT_DATASET = {'users': 500, 'videos': 2000, 'interactions': 50000, 'seed': 42}
+
+# 第一个请求访问的接口（首页列表）
+FIRST_REQUEST_PATH = '/api/videos/list'
+
+
+def child_main(mode):
+    """
+    子进程：执行一次测量并以 JSON 输出到标准输出
+    """
+    result = {}
+    start = time.perf_counter()
+    import wsgi
+    result['cold_start_ms'] = (time.perf_counter() - start) * 1000
+    app = wsgi.application
+
+    if mode == 'warm':
+        from utils.warmup import warm_caches, warm_pool
+        start = time.perf_counter()
+        warm_caches(app)
+        warm_pool(app)
+        result['warmup_ms'] = (time.perf_counter() - start) * 1000
+
+    client = app.test_client()
+    start = time.perf_counter()
+    response = client.get(FIRST_REQUEST_PATH)
+    result['first_request_ms'] = (time.perf_counter() - start) * 1000
+    result['status'] = response.status_code
+    response.close()
+
+    # 再次请求同一接口作为稳态参考
+    start = time.perf_counter()
+    client.get(FIRST_REQUEST_PATH).close()
+    result['steady_request_ms'] = (time.perf_counter() - start) * 1000
+    print(json.dumps(result))
+
+
+def _child_env(db_path, warmup=True):
+    env = dict(os.environ)
+    env.update({
+        'FLASK_ENV': 'production',
+        'DATABASE_URL': f'sqlite:///{os.path.abspath(db_path)}',
+        'SECRET_KEY': env.get('SECRET_KEY', 'startup-benchmark'),
+        'GUNICORN_WARMUP': '1' if warmup else '0',
+        'PYTHONWARNINGS': 'ignore',
+    })
+    env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    return env
+
+
+def measure_in_process(db_path, mode):
+    """
+    启动子进程执行一次测量
+    """
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.startup', '--child', mode],
+        cwd=BACKEND_DIR, env=_child_env(db_path), capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    if result['status'] != 200:
+        raise RuntimeError(f'首个请求返回 {result["status"]}')
+    return result
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def measure_gunicorn(db_path, warmup, workers, timeout=120):
+    """
+    启动 gunicorn，测量就绪耗时和就绪后第一个首页列表请求的延迟
+    返回:
+        dict: {'ready_ms': 启动到根路由首次响应, 'first_request_ms': 就绪后首个列表请求的延迟}
+    """
+    port = _free_port()
+    env = _child_env(db_path, warmup)
+    env.update({'GUNICORN_BIND': f'127.0.0.1:{port}', 'WEB_CONCURRENCY': str(workers)})
+    base_url = f'http://127.0.0.1:{port}'
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:application'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        # 根路由不访问数据库，能响应即表示 worker 已开始接受请求
+        while True:
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError(f'gunicorn 在 {timeout} 秒内没有就绪')
+            try:
+                with urllib.request.urlopen(f'{base_url}/', timeout=timeout):
+                    break
+            except OSError:
+                # 端口尚未监听
+                time.sleep(0.01)
+        ready_ms = (time.perf_counter() - start) * 1000
+
+        request_start = time.perf_counter()
+        with urllib.request.urlopen(f'{base_url}{FIRST_REQUEST_PATH}', timeout=timeout) as response:
+            response.read()
+        return {
+            'ready_ms': ready_ms,
+            'first_request_ms': (time.perf_counter() - request_start) * 1000,
+        }
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def _median(results, key):
+    values = [r[key] for r in results if key in r]
+    return round(statistics.median(values), 1) if values else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='UniVideo 启动耗时测试')
+    parser.add_argument('--child', choices=('cold', 'warm'), help=argparse.SUPPRESS)
+    parser.add_argument('--db', default='benchmarks/results/bench.db', help='SQLite 数据库文件')
+    parser.add_argument('--users', type=int, default=DEFAULT_DATASET['users'])
+    parser.add_argument('--videos', type=int, default=DEFAULT_DATASET['videos'])
+    parser.add_argument('--interactions', type=int, default=DEFAULT_DATASET['interactions'])
+    parser.add_argument('--seed', type=int, default=DEFAULT_DATASET['seed'])
+    parser.add_argument('--repeat', type=int, default=5, help='每种情况的测量次数（取中位数）')
+    parser.add_argument('--gunicorn', action='store_true', help='同时测量 gunicorn 启动到首个请求的耗时')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker 数')
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child_main(args.child)
+        return 0
+
+    from benchmarks.common import create_bench_app, ensure_dataset
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    ensure_dataset(create_bench_app(args.db), args.users, args.videos, args.interactions, args.seed)
+
+    report = {}
+    for mode in ('cold', 'warm'):
+        results = [measure_in_process(args.db, mode) for _ in range(args.repeat)]
+        report[mode] = {key: _median(results, key) for key in
+                        ('cold_start_ms', 'warmup_ms', 'first_request_ms', 'steady_request_ms')}
+
+    print(f'{"情况":<10}{"冷启动":>12}{"预热":>12}{"首个请求":>12}{"稳态请求":>12}  (ms，{args.repeat} 次中位数)')
+    for mode, result in report.items():
+        cells = ''.join(f'{"-" if result[k] is None else result[k]:>12}' for k in
+                        ('cold_start_ms', 'warmup_ms', 'first_request_ms', 'steady_request_ms'))
+        print(f'{"预热" if mode == "warm" else "不预热":<10}{cells}')
+
+    if args.gunicorn:
+        print(f'\ngunicorn（{args.workers} 个 worker）:')
+        for warmup in (False, True):
+            results = [measure_gunicorn(args.db, warmup, args.workers) for _ in range(args.repeat)]
+            print(f'  {"预热" if warmup else "不预热"}: 就绪 {_median(results, "ready_ms")} ms，'
+                  f'首个请求 {_median(results, "first_request_ms")} ms')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+gunicorn 配置文件（生产环境）
+启动方式（在 backend 目录下）:
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+所有参数均可通过环境变量覆盖:
+    GUNICORN_BIND       监听地址（默认 0.0.0.0:5001）
+    WEB_CONCURRENCY     worker 进程数（默认 CPU 核数 * 2 + 1）
+    GUNICORN_THREADS    每个 worker 的线程数（默认 4，使用 gthread worker）
+    GUNICORN_TIMEOUT    请求超时秒数（默认 60，上传大文件时需要调大）
+    GUNICORN_WARMUP     是否在启动时预热缓存和连接池（默认 1）
+
+启动流程:
+    1. master 进程 preload_app 导入 wsgi 模块，蓝图、模型、缓存模块只加载一次，
+       worker 通过 fork 以写时复制方式共享这些内存
+    2. when_ready: master 预热分类与首页缓存，随后关闭自己的数据库连接，并冻结 GC
+       （gc.freeze 后已有对象不再被垃圾回收扫描，避免写入对象头导致共享内存页被复制）
+    3. post_fork: worker 丢弃从 master 继承的连接池
+    4. post_worker_init: worker 预先建立连接池中的常驻连接后才开始接受请求
+    5. worker_exit: worker 退出前写回进程内累计的播放量、运营统计和独立访客草图，封存播放心跳日志分段
+"""
+import gc
+import multiprocessing
+import os
+import shutil
+import time
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5001')
+workers = int(os.environ.get('WEB_CONCURRENCY') or multiprocessing.cpu_count() * 2 + 1)
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS') or 4)
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 60)
+graceful_timeout = 30
+keepalive = 5
+
+# worker 处理一定数量请求后重启，防止内存缓慢增长（加随机抖动避免同时重启）
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS') or 5000)
+max_requests_jitter = max_requests // 10
+
+# 在 master 中加载应用，worker fork 后共享已加载的代码和数据
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+WARMUP_ENABLED = os.environ.get('GUNICORN_WARMUP', '1').lower() in ('1', 'true')
+
+
+def on_starting(server):
+    """
+    master 启动前清空 Prometheus 多进程指标目录（残留的旧 worker 数据会被重复汇总）
+    """
+    multiproc_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def when_ready(server):
+    """
+    master 加载应用完成、fork worker 之前：预热缓存，关闭数据库连接，冻结 GC
+    """
+    from app import app
+    from utils.warmup import dispose_engines, warm_caches
+
+    if WARMUP_ENABLED:
+        start = time.perf_counter()
+        try:
+            entries = warm_caches(app)
+            server.log.info('缓存预热完成: 首页列表 %d 项，耗时 %.1f ms',
+                            entries, (time.perf_counter() - start) * 1000)
+        except Exception as e:
+            # 数据库暂不可用时不阻止启动，缓存会在第一个请求时填充
+            server.log.warning('缓存预热失败: %s', e)
+    # master 不处理请求，预热用过的连接不能留给 worker 继承
+    dispose_engines(app, close=True)
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """
+    worker fork 之后：丢弃从 master 继承的连接池
+    """
+    from app import app
+    from utils.warmup import dispose_engines
+
+    dispose_engines(app, close=False)
+
+
+def post_worker_init(worker):
+    """
+    worker 初始化完成、开始接受请求之前：启动标题联想索引的后台重建线程（线程不会随 fork 继承），
+    并预先建立连接池中的常驻连接
+    """
+    from app import app
+    from utils.suggest import title_index
+
+    title_index.start_refresher(app)
+    if not WARMUP_ENABLED:
+        return
+    from utils.warmup import warm_pool
+
+    start = time.perf_counter()
+    try:
+        opened = warm_pool(app)
+        worker.log.info('worker %s 连接池预热完成: %d 个连接，耗时 %.1f ms',
+                        worker.pid, opened, (time.perf_counter() - start) * 1000)
+    except Exception as e:
+        worker.log.warning('worker %s 连接池预热失败: %s', worker.pid, e)
+
+
+def worker_exit(server, worker):
+    """
+    worker 退出前写回进程内累计的播放量、运营统计和独立访客草图（播放量先写回，其播放次数随运营统计一起写回），
+    并封存播放事件段文件。各步骤互不影响，某一步失败只记录日志，其余步骤照常执行
+    """
+    from app import app
+    from utils.analytics import analytics
+    from utils.playback import segment_writer
+    from utils.unique_viewers import viewer_sketches
+    from utils.view_counter import view_counter
+
+    with app.app_context():
+        for name, accumulator in (('播放量', view_counter), ('运营统计', analytics), ('独立访客草图', viewer_sketches)):
+            try:
+                if accumulator.pending():
+                    accumulator.flush()
+            except Exception as e:
+                worker.log.warning('worker %s 退出时%s写回失败: %s', worker.pid, name, e)
+    try:
+        segment_writer.seal()
+    except Exception as e:
+        worker.log.warning('worker %s 退出时播放事件段封存失败: %s', worker.pid, e)
+
+
+def child_exit(server, worker):
+    """
+    worker 退出后清理其 Prometheus 多进程指标（gauge 的 livesum 模式需要）
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
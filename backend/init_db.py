@@ -15,12 +15,23 @@
     cd backend
     python init_db.py
 
+【批量合成数据模式】（用于性能测试，复现生产规模数据量）
+    python init_db.py --bulk --users 20000 --videos 50000 --interactions 1000000 --seed 42
+
+    - 视频热度服从 Zipf 分布，点赞/收藏/评论集中在热门视频上
+    - 评论包含楼中楼回复（root_id/parent_id 结构与线上一致）
+    - 使用 Core executemany 批量写入，媒体文件为占位文件
+    - 相同 --seed 生成完全相同的数据
+    - 可配合 DATABASE_URL=sqlite:///bench.db 在本地 SQLite 上运行（自动建表）
+
 【注意事项】
 - 本脚本不负责创建数据库和表结构（由 univideo_db.sql 负责）
 - 如果数据库中已有数据，会跳过创建
 - 创建的测试账号仅用于开发测试，生产环境请删除
 ================================================================================
 """
+import argparse
+
 from app import app, db
 from models import User, Category
 
@@ -80,14 +91,71 @@ def create_sample_data():
         return True
 
 
+def create_bulk_data(args):
+    """
+    批量生成合成数据
+    参数:
+        args: 命令行参数（用户数、视频数、互动数、随机种子等）
+    """
+    from utils.synthetic import seed_bulk
+    
+    # 互动总数按 点赞 50% / 收藏 20% / 评论 30% 分配（可单独指定覆盖）
+    interactions = args.interactions
+    likes = args.likes if args.likes is not None else interactions * 5 // 10
+    collections = args.collections if args.collections is not None else interactions * 2 // 10
+    comments = args.comments if args.comments is not None else interactions - likes - collections
+    
+    with app.app_context():
+        # 建表（已存在的表会跳过），便于直接在空的 SQLite 文件上生成数据
+        db.create_all()
+        result = seed_bulk(
+            users=args.users,
+            videos=args.videos,
+            likes=likes,
+            collections=collections,
+            comments=comments,
+            seed=args.seed,
+            zipf_s=args.zipf,
+            batch_size=args.batch_size,
+        )
+    
+    print(f"✓ 合成数据生成完成，耗时 {result['elapsed_seconds']} 秒")
+    print(f"  用户 {result['users']}，视频 {result['videos']}，"
+          f"点赞 {result['likes']}，收藏 {result['collections']}，评论 {result['comments']}")
+    print(f"  批量用户的密码统一为: password123")
+
+
+def parse_args():
+    """
+    解析命令行参数
+    """
+    parser = argparse.ArgumentParser(description='UniVideo 示例数据初始化')
+    parser.add_argument('--bulk', action='store_true', help='批量生成合成数据（性能测试用）')
+    parser.add_argument('--users', type=int, default=1000, help='用户数量')
+    parser.add_argument('--videos', type=int, default=5000, help='视频数量')
+    parser.add_argument('--interactions', type=int, default=100000, help='互动总数（点赞+收藏+评论）')
+    parser.add_argument('--likes', type=int, help='点赞数量（覆盖按比例分配的值）')
+    parser.add_argument('--collections', type=int, help='收藏数量（覆盖按比例分配的值）')
+    parser.add_argument('--comments', type=int, help='评论数量（覆盖按比例分配的值）')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子（相同种子生成相同数据）')
+    parser.add_argument('--zipf', type=float, default=1.1, help='Zipf 分布指数')
+    parser.add_argument('--batch-size', type=int, default=20000, help='每批写入行数')
+    return parser.parse_args()
+
+
 if __name__ == '__main__':
+    args = parse_args()
+    
     print("=" * 50)
     print("UniVideo 示例数据初始化")
     print("=" * 50)
     print()
     
     try:
-        create_sample_data()
+        if args.bulk:
+            create_bulk_data(args)
+        else:
+            create_sample_data()
         print()
         print("✓ 初始化完成！现在可以运行 'python app.py' 启动服务器")
     except Exception as e:
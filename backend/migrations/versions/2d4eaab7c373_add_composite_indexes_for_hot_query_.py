@@ -0,0 +1,55 @@
+"""add composite indexes for hot query shapes
+
+基础表结构由 univideo_db.sql 创建，已有库先执行 `flask db stamp base` 再 `flask db upgrade`。
+- videos: 按状态(+分类/+上传者)筛选并按上传时间排序的首页、分类、作者主页、审核列表，以及个人中心的我的视频
+- comments: 按视频获取评论并按时间排序
+- likes/collections: 按视频统计点赞数、收藏数
+
+Revision ID: 2d4eaab7c373
+Revises: 
+Create Date: 2026-10-19 05:29:58.911275
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d4eaab7c373'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('videos', schema=None) as batch_op:
+        batch_op.create_index('idx_status_created', ['status', 'created_at'], unique=False)
+        batch_op.create_index('idx_status_category_created', ['status', 'category_id', 'created_at'], unique=False)
+        batch_op.create_index('idx_user_status_created', ['user_id', 'status', 'created_at'], unique=False)
+        batch_op.create_index('idx_user_created', ['user_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.create_index('idx_video_created', ['video_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('likes', schema=None) as batch_op:
+        batch_op.create_index('idx_likes_video', ['video_id'], unique=False)
+
+    with op.batch_alter_table('collections', schema=None) as batch_op:
+        batch_op.create_index('idx_collections_video', ['video_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('collections', schema=None) as batch_op:
+        batch_op.drop_index('idx_collections_video')
+
+    with op.batch_alter_table('likes', schema=None) as batch_op:
+        batch_op.drop_index('idx_likes_video')
+
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.drop_index('idx_video_created')
+
+    with op.batch_alter_table('videos', schema=None) as batch_op:
+        batch_op.drop_index('idx_user_created')
+        batch_op.drop_index('idx_user_status_created')
+        batch_op.drop_index('idx_status_category_created')
+        batch_op.drop_index('idx_status_created')
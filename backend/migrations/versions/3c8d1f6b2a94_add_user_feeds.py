@@ -0,0 +1,33 @@
+"""add user_feeds table
+
+- user_feeds: 每个用户按得分排列的首页推荐候选视频ID数组，由 `flask build-feeds` 离线生成
+
+Revision ID: 3c8d1f6b2a94
+Revises: 9a3e57d0c2f1
+Create Date: 2026-10-19 21:04:52.118730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c8d1f6b2a94'
+down_revision = '9a3e57d0c2f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user_feeds',
+        sa.Column('user_id', sa.Integer(), nullable=False, comment='用户ID'),
+        sa.Column('video_ids', sa.LargeBinary(), nullable=False, comment='候选视频ID数组'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True, comment='生成时间'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+
+
+def downgrade():
+    op.drop_table('user_feeds')
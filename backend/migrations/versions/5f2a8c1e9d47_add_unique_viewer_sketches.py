@@ -0,0 +1,38 @@
+"""add video unique viewer HyperLogLog sketches
+
+- video_viewer_sketches: 每个视频的访客 HyperLogLog 草图（压缩的寄存器数组），各进程写回时合并
+- videos.unique_viewers: 草图的估计值，随视频数据一起返回
+
+Revision ID: 5f2a8c1e9d47
+Revises: c41d7a92e6b0
+Create Date: 2026-10-19 17:48:36.912404
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f2a8c1e9d47'
+down_revision = 'c41d7a92e6b0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'video_viewer_sketches',
+        sa.Column('video_id', sa.Integer(), nullable=False, comment='视频ID'),
+        sa.Column('registers', sa.LargeBinary(), nullable=False, comment='HyperLogLog 草图（压缩）'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True, comment='更新时间'),
+        sa.ForeignKeyConstraint(['video_id'], ['videos.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('video_id'),
+    )
+    with op.batch_alter_table('videos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unique_viewers', sa.Integer(), nullable=False, server_default='0', comment='独立访客数（估计值）'))
+
+
+def downgrade():
+    with op.batch_alter_table('videos', schema=None) as batch_op:
+        batch_op.drop_column('unique_viewers')
+    op.drop_table('video_viewer_sketches')
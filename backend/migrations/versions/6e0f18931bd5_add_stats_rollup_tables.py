@@ -0,0 +1,43 @@
+"""add hourly / daily stats rollup tables
+
+- stats_hourly / stats_daily: 按 (指标, 时间桶, 分类) 汇总的运营指标，管理后台统计接口按时间范围读取；
+  上线后由写操作累加，上传、点赞、评论的历史数据可用 `flask backfill-analytics` 回填
+
+Revision ID: 6e0f18931bd5
+Revises: 8107dc5ecdf8
+Create Date: 2026-10-19 16:20:41.583920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e0f18931bd5'
+down_revision = '8107dc5ecdf8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'stats_hourly',
+        sa.Column('metric', sa.String(length=20), nullable=False, comment='指标名称'),
+        sa.Column('bucket', sa.DateTime(), nullable=False, comment='小时起点（UTC）'),
+        sa.Column('category_id', sa.Integer(), nullable=False, comment='视频分类ID'),
+        sa.Column('value', sa.BigInteger(), nullable=False, server_default='0', comment='累计值'),
+        sa.PrimaryKeyConstraint('metric', 'bucket', 'category_id'),
+    )
+    op.create_table(
+        'stats_daily',
+        sa.Column('metric', sa.String(length=20), nullable=False, comment='指标名称'),
+        sa.Column('bucket', sa.Date(), nullable=False, comment='日期（UTC）'),
+        sa.Column('category_id', sa.Integer(), nullable=False, comment='视频分类ID'),
+        sa.Column('value', sa.BigInteger(), nullable=False, server_default='0', comment='累计值'),
+        sa.PrimaryKeyConstraint('metric', 'bucket', 'category_id'),
+    )
+
+
+def downgrade():
+    op.drop_table('stats_daily')
+    op.drop_table('stats_hourly')
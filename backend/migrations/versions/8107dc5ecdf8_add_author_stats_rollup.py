@@ -0,0 +1,59 @@
+"""add author_stats rollup table
+
+- author_stats: 每位作者的已发布视频数、总播放量、总获赞、总收藏（及预留的关注数），
+  作者主页和个人中心按主键读取；升级时按现有数据回填，之后由写操作增量维护、
+  `flask recompute-author-stats` 每晚全量校正
+
+Revision ID: 8107dc5ecdf8
+Revises: b090ff939592
+Create Date: 2026-10-19 15:03:27.604311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8107dc5ecdf8'
+down_revision = 'b090ff939592'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'author_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False, comment='作者ID'),
+        sa.Column('published_videos', sa.Integer(), nullable=False, server_default='0', comment='已发布视频数'),
+        sa.Column('total_views', sa.BigInteger(), nullable=False, server_default='0', comment='已发布视频总播放量'),
+        sa.Column('total_likes', sa.Integer(), nullable=False, server_default='0', comment='已发布视频总获赞数'),
+        sa.Column('total_collections', sa.Integer(), nullable=False, server_default='0', comment='已发布视频总收藏数'),
+        sa.Column('followers_count', sa.Integer(), nullable=False, server_default='0', comment='粉丝数'),
+        sa.Column('following_count', sa.Integer(), nullable=False, server_default='0', comment='关注数'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True, comment='更新时间'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+
+    # 按现有数据回填（只统计已发布视频）
+    op.execute(
+        """
+        INSERT INTO author_stats (user_id, published_videos, total_views, total_likes, total_collections,
+                                  followers_count, following_count, updated_at)
+        SELECT v.user_id,
+               COUNT(*),
+               COALESCE(SUM(v.view_count), 0),
+               (SELECT COUNT(*) FROM likes l JOIN videos lv ON l.video_id = lv.id
+                 WHERE lv.user_id = v.user_id AND lv.status = 1),
+               (SELECT COUNT(*) FROM collections c JOIN videos cv ON c.video_id = cv.id
+                 WHERE cv.user_id = v.user_id AND cv.status = 1),
+               0, 0, CURRENT_TIMESTAMP
+          FROM videos v
+         WHERE v.status = 1
+         GROUP BY v.user_id
+        """
+    )
+
+
+def downgrade():
+    op.drop_table('author_stats')
@@ -0,0 +1,33 @@
+"""add video_related table
+
+- video_related: 每个视频按相似度排列的相关视频ID数组，由 `flask build-related` 离线构建
+
+Revision ID: 9a3e57d0c2f1
+Revises: 5f2a8c1e9d47
+Create Date: 2026-10-19 18:31:07.455218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a3e57d0c2f1'
+down_revision = '5f2a8c1e9d47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'video_related',
+        sa.Column('video_id', sa.Integer(), nullable=False, comment='视频ID'),
+        sa.Column('related_ids', sa.LargeBinary(), nullable=False, comment='相关视频ID数组'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True, comment='构建时间'),
+        sa.ForeignKeyConstraint(['video_id'], ['videos.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('video_id'),
+    )
+
+
+def downgrade():
+    op.drop_table('video_related')
@@ -0,0 +1,28 @@
+"""add collections (user_id, created_at, id) index for keyset pagination
+
+- collections: 我的收藏按收藏时间倒序游标分页（WHERE user_id = ? AND (created_at, id) < (?, ?)）
+
+Revision ID: b090ff939592
+Revises: 2d4eaab7c373
+Create Date: 2026-10-19 14:12:40.318524
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b090ff939592'
+down_revision = '2d4eaab7c373'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('collections', schema=None) as batch_op:
+        batch_op.create_index('idx_collections_user_created', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('collections', schema=None) as batch_op:
+        batch_op.drop_index('idx_collections_user_created')
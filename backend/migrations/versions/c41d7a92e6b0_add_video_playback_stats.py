@@ -0,0 +1,33 @@
+"""add video playback stats columns
+
+- videos.play_count / complete_count / watch_time_ms: 由播放心跳日志汇总累加（flask rollup-playback），
+  用于计算完播率和平均观看时长
+
+Revision ID: c41d7a92e6b0
+Revises: 6e0f18931bd5
+Create Date: 2026-10-19 17:02:15.240871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41d7a92e6b0'
+down_revision = '6e0f18931bd5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('videos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('play_count', sa.Integer(), nullable=False, server_default='0', comment='开始播放次数'))
+        batch_op.add_column(sa.Column('complete_count', sa.Integer(), nullable=False, server_default='0', comment='完整播放次数'))
+        batch_op.add_column(sa.Column('watch_time_ms', sa.BigInteger(), nullable=False, server_default='0', comment='累计观看时长（毫秒）'))
+
+
+def downgrade():
+    with op.batch_alter_table('videos', schema=None) as batch_op:
+        batch_op.drop_column('watch_time_ms')
+        batch_op.drop_column('complete_count')
+        batch_op.drop_column('play_count')
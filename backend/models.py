@@ -4,11 +4,14 @@
 严格对应 univideo_db.sql 表结构
 """
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 
-# 初始化 SQLAlchemy 实例
-db = SQLAlchemy()
+from utils.json_provider import author_fragment, category_fragment, isoformat
+from utils.passwords import password_hasher
+from utils.replica import RoutingSession
+
+# 初始化 SQLAlchemy 实例（会话按请求在主库/从库之间路由，见 utils/replica.py）
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 
 class User(db.Model):
@@ -41,11 +44,11 @@ class User(db.Model):
     
     def set_password(self, password):
         """
-        设置用户密码：将明文密码转换为哈希值存储
+        设置用户密码：将明文密码转换为哈希值存储（在密码哈希线程池中按 PASSWORD_HASH_METHOD 计算）
         参数:
             password: 明文密码字符串
         """
-        self.password = generate_password_hash(password)
+        self.password = password_hasher.hash(password)
     
     def check_password(self, password):
         """
@@ -55,7 +58,13 @@ class User(db.Model):
         返回:
             bool: 密码正确返回 True，否则返回 False
         """
-        return check_password_hash(self.password, password)
+        return password_hasher.verify(self.password, password)
+    
+    def password_needs_rehash(self):
+        """
+        检查存储的密码哈希是否使用了过时的算法或强度（登录成功后据此升级）
+        """
+        return password_hasher.needs_rehash(self.password)
     
     def is_admin(self):
         """
@@ -75,7 +84,7 @@ class User(db.Model):
             'nickname': self.nickname,
             'role': self.role,
             'avatar': self.avatar,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': isoformat(self.created_at)
         }
     
     def __repr__(self):
@@ -123,6 +132,9 @@ class Video(db.Model):
     STATUS_PUBLISHED = 1 # 已发布
     STATUS_REJECTED = 2  # 已驳回
     
+    # 封面、视频文件URL前缀（静态文件由后端 /static 提供）
+    STATIC_URL_PREFIX = 'http://localhost:5001/static/'
+    
     # 主键
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, comment='视频ID')
     # 视频信息
@@ -133,6 +145,12 @@ class Video(db.Model):
     # 审核状态：0=待审核, 1=已发布, 2=驳回（核心字段，实现先审后发）
     status = db.Column(db.SmallInteger, default=0, index=True, comment='状态: 0=待审核, 1=已发布, 2=驳回')
     view_count = db.Column(db.Integer, default=0, comment='播放量')
+    # 播放事件汇总（由 flask rollup-playback 从播放心跳日志累加，见 utils/playback.py）
+    play_count = db.Column(db.Integer, nullable=False, default=0, comment='开始播放次数')
+    complete_count = db.Column(db.Integer, nullable=False, default=0, comment='完整播放次数')
+    watch_time_ms = db.Column(db.BigInteger, nullable=False, default=0, comment='累计观看时长（毫秒）')
+    # 独立访客数估计值（HyperLogLog 草图写回时更新，见 utils/unique_viewers.py）
+    unique_viewers = db.Column(db.Integer, nullable=False, default=0, comment='独立访客数（估计值）')
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True, comment='上传时间')
     
     # 外键：关联用户表
@@ -140,6 +158,14 @@ class Video(db.Model):
     # 外键：关联分类表
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False, comment='分类ID')
     
+    # 联合索引：覆盖"按状态(+分类/+上传者)筛选、按上传时间排序"的查询，避免 filesort
+    __table_args__ = (
+        db.Index('idx_status_created', 'status', 'created_at'),
+        db.Index('idx_status_category_created', 'status', 'category_id', 'created_at'),
+        db.Index('idx_user_status_created', 'user_id', 'status', 'created_at'),
+        db.Index('idx_user_created', 'user_id', 'created_at'),
+    )
+    
     # 关系定义：一个视频可以有多条评论
     comments = db.relationship('Comment', backref='video', lazy='dynamic', cascade='all, delete-orphan')
     # 关系定义：一个视频可以被多个用户点赞
@@ -163,12 +189,83 @@ class Video(db.Model):
         """
         return self.likes.count()
     
-    def to_dict(self, include_author=True):
+    def playback_stats(self):
+        """
+        播放统计：完播率（完整播放次数 / 开始播放次数）和平均每次播放的观看秒数
+        返回:
+            tuple: (完播率, 平均观看秒数)，没有播放记录时均为 None
+        """
+        if not self.play_count:
+            return None, None
+        completion_rate = round(min(self.complete_count / self.play_count, 1.0), 4)
+        avg_watch_seconds = round((self.watch_time_ms or 0) / self.play_count / 1000, 1)
+        return completion_rate, avg_watch_seconds
+    
+    @staticmethod
+    def interaction_counts(video_ids):
+        """
+        批量统计一组视频的点赞数和收藏数（两条 GROUP BY 查询，代替逐个视频 COUNT）
+        参数:
+            video_ids: 视频ID列表
+        返回:
+            dict: 视频ID -> (点赞数, 收藏数)，没有互动的视频不在结果中
+        """
+        if not video_ids:
+            return {}
+        likes = dict(db.session.query(Like.video_id, db.func.count(Like.id))
+                     .filter(Like.video_id.in_(video_ids)).group_by(Like.video_id).all())
+        collections = dict(db.session.query(Collection.video_id, db.func.count(Collection.id))
+                           .filter(Collection.video_id.in_(video_ids)).group_by(Collection.video_id).all())
+        return {vid: (likes.get(vid, 0), collections.get(vid, 0)) for vid in set(likes) | set(collections)}
+    
+    @staticmethod
+    def bulk_to_dict(videos, include_author=True):
+        """
+        批量序列化视频列表（计数批量查询；作者、分类应由调用方预先 joinedload）
+        参数:
+            videos: 视频对象列表
+            include_author: 是否包含作者信息
+        返回:
+            list: 字典列表，顺序与 videos 一致
+        """
+        counts = Video.interaction_counts([video.id for video in videos])
+        return [video.to_dict(include_author=include_author, counts=counts.get(video.id, (0, 0)))
+                for video in videos]
+    
+    @staticmethod
+    def serialize_list(videos, include_author=True):
+        """
+        批量序列化视频列表（同 bulk_to_dict），并添加完整的封面和视频URL
+        参数:
+            videos: 视频对象列表
+            include_author: 是否包含作者信息
+        返回:
+            list: 字典列表，顺序与 videos 一致
+        """
+        video_list = Video.bulk_to_dict(videos, include_author=include_author)
+        for video, video_data in zip(videos, video_list):
+            video_data.update(video.media_urls())
+        return video_list
+    
+    def media_urls(self):
+        """
+        返回封面和视频文件的完整URL
+        """
+        return {
+            'cover_url': f"{self.STATIC_URL_PREFIX}{self.cover_path}",
+            'video_url': f"{self.STATIC_URL_PREFIX}{self.video_path}"
+        }
+    
+    def to_dict(self, include_author=True, counts=None):
         """
         将视频对象转换为字典格式
         参数:
             include_author: 是否包含作者信息
+            counts: 预先批量查询的 (点赞数, 收藏数)，不传时逐个查询
         """
+        likes_count, collections_count = counts if counts is not None else \
+            (self.get_likes_count(), self.get_collections_count())
+        completion_rate, avg_watch_seconds = self.playback_stats()
         data = {
             'id': self.id,
             'title': self.title,
@@ -177,20 +274,19 @@ class Video(db.Model):
             'video_path': self.video_path,
             'status': self.status,
             'view_count': self.view_count,
-            'likes_count': self.get_likes_count(),
-            'collections_count': self.get_collections_count(),
-            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'unique_viewers': self.unique_viewers or 0,
+            'likes_count': likes_count,
+            'collections_count': collections_count,
+            'completion_rate': completion_rate,
+            'avg_watch_seconds': avg_watch_seconds,
+            'created_at': isoformat(self.created_at),
             'category_id': self.category_id,
         }
         if include_author and self.author:
-            data['author'] = {
-                'id': self.author.id,
-                'username': self.author.username,
-                'nickname': self.author.nickname,
-                'avatar': self.author.avatar
-            }
+            author = self.author
+            data['author'] = author_fragment(author.id, author.username, author.nickname, author.avatar)
         if self.category:
-            data['category'] = self.category.to_dict()
+            data['category'] = category_fragment(self.category.id, self.category.name)
         return data
     
     def __repr__(self):
@@ -225,8 +321,10 @@ class Comment(db.Model):
     root_id = db.Column(db.Integer, db.ForeignKey('comments.id', ondelete='CASCADE'), comment='根评论ID')
     
     # 联合索引：优化查询某视频下某楼层的所有回复
+    # idx_video_created：优化按时间顺序获取某视频的评论列表
     __table_args__ = (
         db.Index('idx_video_root', 'video_id', 'root_id'),
+        db.Index('idx_video_created', 'video_id', 'created_at'),
     )
     
     # 关系定义：父评论关系（一对多）
@@ -249,19 +347,15 @@ class Comment(db.Model):
         data = {
             'id': self.id,
             'content': self.content,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'created_at': isoformat(self.created_at),
             'user_id': self.user_id,
             'video_id': self.video_id,
             'parent_id': self.parent_id,
             'root_id': self.root_id,
         }
         if include_author and self.author:
-            data['author'] = {
-                'id': self.author.id,
-                'username': self.author.username,
-                'nickname': self.author.nickname,
-                'avatar': self.author.avatar
-            }
+            author = self.author
+            data['author'] = author_fragment(author.id, author.username, author.nickname, author.avatar)
         if include_children:
             data['children'] = [child.to_dict(include_author=True) for child in self.children]
         return data
@@ -287,8 +381,10 @@ class Like(db.Model):
     video_id = db.Column(db.Integer, db.ForeignKey('videos.id', ondelete='CASCADE'), nullable=False, comment='视频ID')
     
     # 联合唯一约束：确保同一用户不能重复点赞同一视频
+    # idx_likes_video：按视频统计点赞数（唯一约束以 user_id 开头，无法用于按视频查询）
     __table_args__ = (
         db.UniqueConstraint('user_id', 'video_id', name='unique_like'),
+        db.Index('idx_likes_video', 'video_id'),
     )
     
     def to_dict(self):
@@ -299,7 +395,7 @@ class Like(db.Model):
             'id': self.id,
             'user_id': self.user_id,
             'video_id': self.video_id,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': isoformat(self.created_at)
         }
     
     def __repr__(self):
@@ -323,8 +419,12 @@ class Collection(db.Model):
     video_id = db.Column(db.Integer, db.ForeignKey('videos.id', ondelete='CASCADE'), nullable=False, comment='视频ID')
     
     # 联合唯一约束：确保同一用户不能重复收藏同一视频
+    # idx_collections_video：按视频统计收藏数
+    # idx_collections_user_created：我的收藏按收藏时间游标分页
     __table_args__ = (
         db.UniqueConstraint('user_id', 'video_id', name='unique_collection'),
+        db.Index('idx_collections_video', 'video_id'),
+        db.Index('idx_collections_user_created', 'user_id', 'created_at', 'id'),
     )
     
     def to_dict(self):
@@ -335,8 +435,135 @@ class Collection(db.Model):
             'id': self.id,
             'user_id': self.user_id,
             'video_id': self.video_id,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': isoformat(self.created_at)
         }
     
     def __repr__(self):
         return f'<Collection user_id={self.user_id} video_id={self.video_id}>'
+
+
+class AuthorStats(db.Model):
+    """
+    作者统计汇总模型：每位作者一行，作者主页和个人中心直接按主键读取
+    对应 SQL: author_stats 表
+    由上传、审核、删除、点赞、收藏、播放量写回等写操作增量维护（见 utils/author_stats.py），
+    每晚全量重算一次修正偏差；只统计已发布的视频
+    """
+    __tablename__ = 'author_stats'
+    
+    # 主键：作者ID
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True, comment='作者ID')
+    published_videos = db.Column(db.Integer, nullable=False, default=0, comment='已发布视频数')
+    total_views = db.Column(db.BigInteger, nullable=False, default=0, comment='已发布视频总播放量')
+    total_likes = db.Column(db.Integer, nullable=False, default=0, comment='已发布视频总获赞数')
+    total_collections = db.Column(db.Integer, nullable=False, default=0, comment='已发布视频总收藏数')
+    # 预留：关注功能上线后维护
+    followers_count = db.Column(db.Integer, nullable=False, default=0, comment='粉丝数')
+    following_count = db.Column(db.Integer, nullable=False, default=0, comment='关注数')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='更新时间')
+    
+    # 计数字段
+    COUNTER_COLUMNS = ('published_videos', 'total_views', 'total_likes', 'total_collections',
+                       'followers_count', 'following_count')
+    
+    def to_dict(self):
+        """
+        将统计数据转换为字典格式
+        """
+        return {column: getattr(self, column) or 0 for column in self.COUNTER_COLUMNS}
+    
+    @classmethod
+    def empty_dict(cls):
+        """
+        没有统计行（从未发布过视频）时的默认值
+        """
+        return {column: 0 for column in cls.COUNTER_COLUMNS}
+    
+    def __repr__(self):
+        return f'<AuthorStats user_id={self.user_id}>'
+
+
+class StatsHourly(db.Model):
+    """
+    按小时汇总的运营指标（上传、审核、播放、点赞、评论等），管理后台统计图表按时间范围直接读取
+    对应 SQL: stats_hourly 表
+    每个 (指标, 小时, 分类) 一行，由写操作在进程内累加后批量写回（见 utils/analytics.py）；时间为 UTC
+    """
+    __tablename__ = 'stats_hourly'
+    
+    # 联合主键：按 (指标, 时间) 范围查询
+    metric = db.Column(db.String(20), primary_key=True, comment='指标名称')
+    bucket = db.Column(db.DateTime, primary_key=True, comment='小时起点（UTC）')
+    category_id = db.Column(db.Integer, primary_key=True, comment='视频分类ID')
+    value = db.Column(db.BigInteger, nullable=False, default=0, comment='累计值')
+    
+    def __repr__(self):
+        return f'<StatsHourly {self.metric} {self.bucket} category={self.category_id}>'
+
+
+class StatsDaily(db.Model):
+    """
+    按天汇总的运营指标，结构与 StatsHourly 相同，用于较长时间范围的查询
+    对应 SQL: stats_daily 表
+    """
+    __tablename__ = 'stats_daily'
+    
+    # 联合主键：按 (指标, 日期) 范围查询
+    metric = db.Column(db.String(20), primary_key=True, comment='指标名称')
+    bucket = db.Column(db.Date, primary_key=True, comment='日期（UTC）')
+    category_id = db.Column(db.Integer, primary_key=True, comment='视频分类ID')
+    value = db.Column(db.BigInteger, nullable=False, default=0, comment='累计值')
+    
+    def __repr__(self):
+        return f'<StatsDaily {self.metric} {self.bucket} category={self.category_id}>'
+
+
+class VideoViewerSketch(db.Model):
+    """
+    视频访客 HyperLogLog 草图：每个视频一行，保存压缩后的寄存器数组
+    对应 SQL: video_viewer_sketches 表
+    各进程定期把本进程的草图与该行合并后写回，并把估计值同步到 videos.unique_viewers
+    """
+    __tablename__ = 'video_viewer_sketches'
+    
+    # 主键：视频ID
+    video_id = db.Column(db.Integer, db.ForeignKey('videos.id', ondelete='CASCADE'), primary_key=True, comment='视频ID')
+    registers = db.Column(db.LargeBinary, nullable=False, comment='HyperLogLog 草图（压缩）')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='更新时间')
+    
+    def __repr__(self):
+        return f'<VideoViewerSketch video_id={self.video_id}>'
+
+
+class VideoRelated(db.Model):
+    """
+    相关视频列表：每个视频一行，保存按相似度从高到低排列的相关视频ID（小端 uint32 数组）
+    对应 SQL: video_related 表
+    由 flask build-related 根据点赞、收藏的共现关系离线构建（见 utils/related.py）
+    """
+    __tablename__ = 'video_related'
+    
+    # 主键：视频ID
+    video_id = db.Column(db.Integer, db.ForeignKey('videos.id', ondelete='CASCADE'), primary_key=True, comment='视频ID')
+    related_ids = db.Column(db.LargeBinary, nullable=False, comment='相关视频ID数组')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, comment='构建时间')
+    
+    def __repr__(self):
+        return f'<VideoRelated video_id={self.video_id}>'
+
+
+class UserFeed(db.Model):
+    """
+    首页推荐候选列表：每个用户一行，保存按得分从高到低排列的视频ID（小端 uint32 数组）
+    对应 SQL: user_feeds 表
+    由 flask build-feeds 根据点赞、收藏和分类偏好离线生成（见 utils/personal_feed.py）
+    """
+    __tablename__ = 'user_feeds'
+    
+    # 主键：用户ID
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True, comment='用户ID')
+    video_ids = db.Column(db.LargeBinary, nullable=False, comment='候选视频ID数组')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, comment='生成时间')
+    
+    def __repr__(self):
+        return f'<UserFeed user_id={self.user_id}>'
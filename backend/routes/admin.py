@@ -1,16 +1,37 @@
 """
 管理员路由模块
-提供视频审核、管理等功能API接口
+提供视频审核、管理等功能API接口（均需要管理员令牌）
 """
+from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify, current_app
-from models import db, Video
+from sqlalchemy.orm import joinedload
+from models import db, Category, Video
+from utils import author_stats, seek_index
+from utils.analytics import GRANULARITY_MAX_DAYS, METRICS, analytics, hour_start, query_series
+from utils.auth import admin_required
+from utils.cache import invalidate_feed, invalidate_video
+from utils.pagination import InvalidCursor, keyset_page, parse_page_args, split_page
+from utils.replica import read_only
+from utils.suggest import title_index
+from utils.unique_viewers import viewer_sketches
+from utils.view_counter import view_counter
 import os
 
 # 创建管理员蓝图
 admin_bp = Blueprint('admin', __name__)
 
+# 批量审核单次最多处理的视频数
+BULK_AUDIT_MAX_IDS = 500
+
+# 审核动作 -> 目标状态
+AUDIT_ACTIONS = {
+    'approve': Video.STATUS_PUBLISHED,
+    'reject': Video.STATUS_REJECTED,
+}
+
 
 @admin_bp.route('/manage/list', methods=['GET'])
+@admin_required
 def get_video_list():
     """
     获取视频管理列表接口（升级版）
@@ -58,33 +79,47 @@ def get_video_list():
 
 
 @admin_bp.route('/audit/list', methods=['GET'])
+@admin_required
 def get_audit_list():
     """
-    获取待审核视频列表接口（保留兼容）
-    查询所有 status=0 (待审核) 的视频
-    按上传时间正序排列（先传的先审）
-    返回: 待审核视频列表
+    获取待审核视频列表接口（游标分页）
+    查询 status=0 (待审核) 的视频，按 (上传时间, ID) 正序排列（先传的先审）
+    参数:
+        - cursor (可选): 上一页返回的 next_cursor，不传表示第一页
+        - limit (可选): 每页条数，默认 20，最大 50
+    返回: 一页待审核视频，total 只在第一页返回
     """
     try:
-        # 查询所有待审核视频，按上传时间正序排列（先传的先审）
-        pending_videos = Video.query.filter_by(
-            status=Video.STATUS_PENDING  # status=0
-        ).order_by(
-            Video.created_at.asc()  # 按上传时间升序排列
-        ).all()
+        cursor, limit = parse_page_args(request.args)
         
-        # 将视频对象列表转换为字典列表
-        video_list = [video.to_dict(include_author=True) for video in pending_videos]
+        # 待审核视频按上传时间正序取一页（idx_status_created 索引）
+        query = Video.query.options(
+            joinedload(Video.author),
+            joinedload(Video.category)
+        ).filter(Video.status == Video.STATUS_PENDING)
+        rows = keyset_page(query, Video.created_at, Video.id, cursor, limit, ascending=True)
+        pending_videos, next_cursor = split_page(rows, limit, lambda v: (v.created_at, v.id))
+        
+        total = None
+        if cursor is None:
+            total = Video.query.filter(Video.status == Video.STATUS_PENDING).count()
         
         return jsonify({
             'code': 200,
             'msg': '获取成功',
             'data': {
-                'total': len(video_list),
-                'list': video_list
+                'total': total,
+                'list': Video.bulk_to_dict(pending_videos, include_author=True),
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
             }
         }), 200
     
+    except InvalidCursor as e:
+        return jsonify({
+            'code': 400,
+            'msg': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'code': 500,
@@ -93,6 +128,7 @@ def get_audit_list():
 
 
 @admin_bp.route('/audit/<int:video_id>', methods=['POST'])
+@admin_required
 def audit_video(video_id):
     """
     视频审核接口
@@ -121,8 +157,9 @@ def audit_video(video_id):
                 'msg': 'action 参数无效，仅支持 "approve" 或 "reject"'
             }), 400
         
-        # 查找视频
-        video = Video.query.get(video_id)
+        # 查找并锁定视频（SELECT ... FOR UPDATE），并发审核同一视频时后到的请求读到更新后的状态，
+        # 不会重复通过并重复计入作者统计
+        video = Video.query.filter_by(id=video_id).with_for_update().populate_existing().first()
         
         if not video:
             return jsonify({
@@ -145,6 +182,7 @@ def audit_video(video_id):
         # 根据 action 设置视频状态
         if action == 'approve':
             video.status = Video.STATUS_PUBLISHED  # 通过审核
+            author_stats.on_video_published(video)
             result_msg = '审核通过，视频已发布'
         else:  # action == 'reject'
             video.status = Video.STATUS_REJECTED   # 驳回
@@ -152,6 +190,13 @@ def audit_video(video_id):
         
         # 保存更改到数据库
         db.session.commit()
+        invalidate_video(video_id)
+        analytics.record('approvals' if action == 'approve' else 'rejections', video.category_id)
+        
+        # 审核通过后视频出现在首页，刷新首页缓存
+        if video.status == Video.STATUS_PUBLISHED:
+            invalidate_feed()
+            title_index.add(video.id, video.title, video.view_count or 0)
         
         return jsonify({
             'code': 200,
@@ -172,7 +217,124 @@ def audit_video(video_id):
         }), 500
 
 
+@admin_bp.route('/audit/batch', methods=['POST'])
+@admin_required
+def audit_videos_batch():
+    """
+    批量审核接口
+    接收JSON: {action: "approve" | "reject", video_ids: [1, 2, ...]}（最多 BULK_AUDIT_MAX_IDS 个）
+    逻辑:
+        1. 锁定并读取这批视频的当前状态（SELECT ... FOR UPDATE）
+        2. 对其中待审核的视频执行一条 UPDATE ... WHERE id IN (...) AND status = 0
+        3. 通过审核的视频按作者汇总计入作者统计，与状态更新在同一事务中提交
+    返回: 更新数量和每个视频的处理结果
+        result: approved / rejected（本次已处理）、not_found（视频不存在）、skipped（不是待审核状态，status 为当前状态）
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        action = data.get('action')
+        video_ids = data.get('video_ids')
+        
+        # 验证参数
+        if action not in AUDIT_ACTIONS:
+            return jsonify({
+                'code': 400,
+                'msg': 'action 参数无效，仅支持 "approve" 或 "reject"'
+            }), 400
+        if not isinstance(video_ids, list) or not video_ids:
+            return jsonify({
+                'code': 400,
+                'msg': '缺少必填字段：video_ids'
+            }), 400
+        if not all(isinstance(vid, int) and not isinstance(vid, bool) for vid in video_ids):
+            return jsonify({
+                'code': 400,
+                'msg': 'video_ids 必须是视频ID（整数）列表'
+            }), 400
+        
+        # 去重并保持请求中的顺序
+        video_ids = list(dict.fromkeys(video_ids))
+        if len(video_ids) > BULK_AUDIT_MAX_IDS:
+            return jsonify({
+                'code': 400,
+                'msg': f'单次最多审核 {BULK_AUDIT_MAX_IDS} 个视频'
+            }), 400
+        
+        # 锁定这批视频，读取当前状态（以及计入作者统计所需的字段）
+        rows = db.session.query(
+            Video.id, Video.status, Video.user_id, Video.view_count, Video.category_id, Video.title
+        ).filter(Video.id.in_(video_ids)).with_for_update().all()
+        found = {row.id: row for row in rows}
+        pending = [row for row in rows if row.status == Video.STATUS_PENDING]
+        pending_ids = [row.id for row in pending]
+        
+        new_status = AUDIT_ACTIONS[action]
+        if pending_ids:
+            updated = Video.query.filter(
+                Video.id.in_(pending_ids),
+                Video.status == Video.STATUS_PENDING
+            ).update({Video.status: new_status}, synchronize_session=False)
+            
+            # 行已锁定，更新数应与待审核数一致；不一致说明状态在读取后被并发修改
+            if updated != len(pending_ids):
+                db.session.rollback()
+                return jsonify({
+                    'code': 409,
+                    'msg': '部分视频的审核状态已被修改，请刷新后重试'
+                }), 409
+            
+            if new_status == Video.STATUS_PUBLISHED:
+                author_stats.on_videos_published(pending)
+        
+        db.session.commit()
+        
+        # 清除缓存：已处理视频的详情；通过审核时首页列表
+        for vid in pending_ids:
+            invalidate_video(vid)
+        
+        # 计入运营统计
+        metric = 'approvals' if action == 'approve' else 'rejections'
+        for row in pending:
+            analytics.add(metric, row.category_id)
+        analytics.maybe_flush()
+        if pending_ids and new_status == Video.STATUS_PUBLISHED:
+            invalidate_feed()
+            for row in pending:
+                title_index.add(row.id, row.title, row.view_count or 0)
+        
+        # 逐个视频的处理结果（顺序与请求一致）
+        result_name = 'approved' if action == 'approve' else 'rejected'
+        results = []
+        for vid in video_ids:
+            row = found.get(vid)
+            if row is None:
+                results.append({'video_id': vid, 'result': 'not_found', 'status': None})
+            elif row.status == Video.STATUS_PENDING:
+                results.append({'video_id': vid, 'result': result_name, 'status': new_status})
+            else:
+                results.append({'video_id': vid, 'result': 'skipped', 'status': row.status})
+        
+        return jsonify({
+            'code': 200,
+            'msg': f'批量审核完成，共处理 {len(pending_ids)} 个视频',
+            'data': {
+                'action': action,
+                'updated': len(pending_ids),
+                'results': results
+            }
+        }), 200
+    
+    except Exception as e:
+        # 发生异常时回滚事务
+        db.session.rollback()
+        return jsonify({
+            'code': 500,
+            'msg': f'服务器错误: {str(e)}'
+        }), 500
+
+
 @admin_bp.route('/manage/video/<int:video_id>', methods=['DELETE'])
+@admin_required
 def delete_video(video_id):
     """
     删除视频接口
@@ -207,6 +369,11 @@ def delete_video(video_id):
                 if os.path.exists(video_file_path):
                     os.remove(video_file_path)
                     deleted_files.append(video.video_path)
+                # 同时删除关键帧索引 sidecar 文件和构建失败标记
+                for index_path in (seek_index.sidecar_path(video_file_path),
+                                   seek_index.failure_path(video_file_path)):
+                    if os.path.exists(index_path):
+                        os.remove(index_path)
             
             # 删除封面文件
             if video.cover_path:
@@ -221,9 +388,16 @@ def delete_video(video_id):
             # 文件删除失败不影响数据库记录删除，记录日志即可
             print(f'删除物理文件失败: {str(file_err)}')
         
-        # 从数据库删除视频记录
+        # 从数据库删除视频记录（已发布视频同时从作者统计中扣除）
+        if video.status == Video.STATUS_PUBLISHED:
+            author_stats.on_video_unpublished(video)
         db.session.delete(video)
         db.session.commit()
+        invalidate_feed()
+        invalidate_video(video_id)
+        view_counter.forget(video_id)
+        viewer_sketches.forget(video_id)
+        title_index.remove(video_id)
         
         return jsonify({
             'code': 200,
@@ -242,3 +416,90 @@ def delete_video(video_id):
             'code': 500,
             'msg': f'服务器错误: {str(e)}'
         }), 500
+
+
+@admin_bp.route('/analytics', methods=['GET'])
+@admin_required
+@read_only
+def get_analytics():
+    """
+    运营统计接口（读取按小时 / 按天汇总表，不扫描明细表）
+    参数:
+        - metric (必填): uploads / approvals / rejections / views / likes / comments
+        - granularity (可选): day（默认）或 hour
+        - days (可选): 查询最近多少天（含今天），默认 day 粒度 30 天、hour 粒度 1 天；
+          最多 day 粒度 366 天、hour 粒度 31 天
+        - category_id (可选): 只查询该分类
+    返回: 连续的时间桶（UTC）、各分类的数值序列和每个时间桶的合计
+    说明: 各进程未写回的增量（最多一个写回间隔）不包含在结果中
+    """
+    try:
+        metric = request.args.get('metric')
+        granularity = request.args.get('granularity', 'day')
+        category_id = request.args.get('category_id', type=int)
+        
+        # 验证参数
+        if metric not in METRICS:
+            return jsonify({
+                'code': 400,
+                'msg': f'metric 参数无效，仅支持 {", ".join(METRICS)}'
+            }), 400
+        if granularity not in GRANULARITY_MAX_DAYS:
+            return jsonify({
+                'code': 400,
+                'msg': 'granularity 参数无效，仅支持 "day" 或 "hour"'
+            }), 400
+        
+        max_days = GRANULARITY_MAX_DAYS[granularity]
+        days = request.args.get('days', 30 if granularity == 'day' else 1, type=int)
+        if days < 1 or days > max_days:
+            return jsonify({
+                'code': 400,
+                'msg': f'days 参数需要在 1-{max_days} 之间'
+            }), 400
+        
+        # 时间范围：截止到当前时间桶（含）
+        now = datetime.utcnow()
+        if granularity == 'day':
+            end = now.date()
+            start = end - timedelta(days=days - 1)
+        else:
+            end = hour_start(now)
+            start = end - timedelta(hours=days * 24 - 1)
+        
+        buckets, series = query_series(metric, granularity, start, end, category_id)
+        
+        # 分类名称（分类表很小，一次读取）
+        category_names = dict(db.session.query(Category.id, Category.name).all())
+        
+        totals = [0] * len(buckets)
+        series_list = []
+        for cid in sorted(series):
+            values = series[cid]
+            for i, value in enumerate(values):
+                totals[i] += value
+            series_list.append({
+                'category_id': cid,
+                'category_name': category_names.get(cid, '未知分类'),
+                'values': values,
+                'total': sum(values)
+            })
+        
+        return jsonify({
+            'code': 200,
+            'msg': '获取成功',
+            'data': {
+                'metric': metric,
+                'granularity': granularity,
+                'buckets': [bucket.isoformat() for bucket in buckets],
+                'series': series_list,
+                'totals': totals,
+                'total': sum(totals)
+            }
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'code': 500,
+            'msg': f'服务器错误: {str(e)}'
+        }), 500
@@ -4,6 +4,20 @@
 """
 from flask import Blueprint, request, jsonify
 from models import db, User
+from utils.auth import current_user, issue_token, login_required
+from utils.metrics import record_rejection
+from utils.passwords import HasherBusy
+
+
+def _hasher_busy():
+    """
+    密码哈希线程池排队已满时的响应
+    """
+    record_rejection(request.endpoint, 'password_busy')
+    return jsonify({
+        'code': 503,
+        'msg': '登录人数较多，请稍后再试'
+    }), 503, {'Retry-After': '1'}
 
 # 创建认证蓝图
 auth_bp = Blueprint('auth', __name__)
@@ -77,6 +91,9 @@ def register():
             }
         }), 201
     
+    except HasherBusy:
+        db.session.rollback()
+        return _hasher_busy()
     except Exception as e:
         # 发生异常时回滚事务
         db.session.rollback()
@@ -91,7 +108,7 @@ def login():
     """
     用户登录接口
     接收JSON: {username, password}
-    返回: 用户信息（简化版，不使用JWT Token）
+    返回: 用户信息和访问令牌 token（之后的请求通过 Authorization: Bearer <token> 携带）
     """
     try:
         # 获取请求数据
@@ -117,18 +134,29 @@ def login():
                 'msg': '用户名或密码错误'
             }), 401
         
-        # 验证密码
+        # 验证密码（在密码哈希线程池中执行）
         if not user.check_password(password):
             return jsonify({
                 'code': 401,
                 'msg': '用户名或密码错误'
             }), 401
         
-        # 登录成功，返回用户信息
+        # 哈希算法或强度已调整（PASSWORD_HASH_METHOD）：用本次登录的明文密码升级存储的哈希
+        # 升级失败不影响登录，下次登录再试
+        if user.password_needs_rehash():
+            try:
+                user.set_password(password)
+                db.session.commit()
+            except Exception as rehash_err:
+                db.session.rollback()
+                print(f'升级密码哈希失败: {str(rehash_err)}')
+        
+        # 登录成功，签发访问令牌并返回用户信息
         return jsonify({
             'code': 200,
             'msg': '登录成功',
             'data': {
+                'token': issue_token(user),
                 'id': user.id,
                 'username': user.username,
                 'nickname': user.nickname,
@@ -137,6 +165,8 @@ def login():
             }
         }), 200
     
+    except HasherBusy:
+        return _hasher_busy()
     except Exception as e:
         return jsonify({
             'code': 500,
@@ -145,23 +175,15 @@ def login():
 
 
 @auth_bp.route('/me', methods=['GET'])
+@login_required
 def get_current_user():
     """
     获取当前登录用户信息接口
-    （简化版：通过请求头中的 user_id 获取）
+    （通过请求头中的访问令牌识别用户）
     """
     try:
-        # 从请求头获取 user_id（前端 localStorage 存储）
-        user_id = request.headers.get('X-User-Id')
-        
-        if not user_id:
-            return jsonify({
-                'code': 401,
-                'msg': '未登录或登录已过期'
-            }), 401
-        
-        # 查找用户
-        user = User.query.get(user_id)
+        # 查找用户（令牌只包含基本信息，完整资料从数据库读取）
+        user = User.query.get(current_user().id)
         
         if not user:
             return jsonify({
@@ -0,0 +1,198 @@
+"""
+健康检查路由模块
+提供存活检查（liveness）、就绪检查（readiness）和数据库连接池统计接口，
+供负载均衡、容器编排（如 Kubernetes 探针）和运维监控使用
+"""
+import threading
+import time
+
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import text
+
+from models import db
+from utils import pool_monitor
+from utils.replica import REPLICA_BIND, replica_health
+
+# 创建健康检查蓝图
+health_bp = Blueprint('health', __name__)
+
+# 数据库探测结果缓存（进程内）：避免每次探针请求都向数据库发送 SELECT 1
+_ping_lock = threading.Lock()
+_ping_state = {'ok': None, 'error': None, 'checked_at': 0.0}
+
+
+def _engine_items():
+    """
+    返回 (引擎名, 引擎) 列表，默认库名为 'default'
+    """
+    return [(bind_key or 'default', engine) for bind_key, engine in db.engines.items()]
+
+
+def _recent_checkout(interval):
+    """
+    判断最近 interval 秒内默认库是否有成功借出的连接
+    （开启 pre_ping 时借出连接前已检测过连接可用性，相当于一次探测）
+    """
+    stats = pool_monitor.pool_stats.get('default')
+    return stats is not None and stats.last_checkout_at is not None \
+        and time.time() - stats.last_checkout_at < interval
+
+
+def check_database(interval):
+    """
+    检查数据库是否可用（结果缓存 interval 秒）
+    参数:
+        interval: 探测结果的缓存时间（秒）
+    返回:
+        tuple: (是否可用, 错误信息, 结果来源 'cached'/'traffic'/'ping')
+    """
+    now = time.time()
+    with _ping_lock:
+        if _ping_state['ok'] is not None and now - _ping_state['checked_at'] < interval:
+            return _ping_state['ok'], _ping_state['error'], 'cached'
+
+    # 最近有正常的业务请求借出过连接，说明数据库可用，无需再探测
+    if _ping_state['ok'] and _recent_checkout(interval):
+        source, ok, error = 'traffic', True, None
+    else:
+        source = 'ping'
+        try:
+            with db.engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+            ok, error = True, None
+        except Exception as e:
+            ok, error = False, str(e)
+
+    with _ping_lock:
+        _ping_state.update(ok=ok, error=error, checked_at=now)
+    return ok, error, source
+
+
+def collect_pool_stats():
+    """
+    汇总所有引擎的连接池统计
+    返回:
+        list[dict]: 每个引擎的实时状态、累计计数以及最近 1 分钟获取连接等待时间分位数
+    """
+    result = []
+    for name, engine in _engine_items():
+        status = pool_monitor.pool_status(engine)
+        stats = pool_monitor.pool_stats.get(name)
+        if stats is not None:
+            snapshot = stats.snapshot()
+            status.update({
+                'checkouts': snapshot['checkouts'],
+                'checkins': snapshot['checkins'],
+                'timeouts': snapshot['timeouts'],
+                'wait_avg_ms': snapshot['wait_avg_ms'],
+                'wait_max_ms': snapshot['wait_max_ms'],
+                'wait_p50_ms': round(stats.wait_percentile(50) * 1000, 3),
+                'wait_p95_ms': round(stats.wait_percentile(95) * 1000, 3),
+                'wait_p99_ms': round(stats.wait_percentile(99) * 1000, 3),
+            })
+        status['name'] = name
+        result.append(status)
+    return result
+
+
+@health_bp.route('', methods=['GET'])
+def health_check():
+    """
+    健康检查接口（保留兼容）：返回服务状态和数据库连接情况
+    数据库探测结果与就绪检查共用缓存
+    """
+    ok, error, _ = check_database(current_app.config.get('HEALTH_DB_PING_INTERVAL', 5))
+    return jsonify({
+        'status': 'healthy',
+        'service': 'UniVideo Backend',
+        'database': 'connected' if ok else f'error: {error}',
+        'version': '1.0.0'
+    })
+
+
+@health_bp.route('/live', methods=['GET'])
+def liveness():
+    """
+    存活检查接口：只表示进程能处理请求，不访问数据库
+    （数据库故障时重启进程无济于事，存活检查不应因此失败）
+    """
+    return jsonify({
+        'code': 200,
+        'msg': 'alive'
+    }), 200
+
+
+@health_bp.route('/ready', methods=['GET'])
+def readiness():
+    """
+    就绪检查接口：数据库可用且连接池未饱和时返回 200，否则返回 503
+    未就绪时负载均衡应暂停向本实例转发流量
+    判定条件:
+        - 数据库探测成功（结果缓存 HEALTH_DB_PING_INTERVAL 秒）
+        - 连接池使用率低于 HEALTH_MAX_POOL_SATURATION
+        - 最近 1 分钟获取连接等待时间 p95 低于 HEALTH_MAX_POOL_WAIT_MS
+    """
+    config = current_app.config
+    max_saturation = config.get('HEALTH_MAX_POOL_SATURATION', 0.9)
+    max_wait_ms = config.get('HEALTH_MAX_POOL_WAIT_MS', 1000)
+
+    reasons = []
+    ok, error, source = check_database(config.get('HEALTH_DB_PING_INTERVAL', 5))
+    if not ok:
+        reasons.append(f'数据库不可用: {error}')
+
+    pools = []
+    for name, engine in _engine_items():
+        status = pool_monitor.pool_status(engine)
+        stats = pool_monitor.pool_stats.get(name)
+        wait_p95_ms = round(stats.wait_percentile(95) * 1000, 3) if stats else 0.0
+        pools.append({
+            'name': name,
+            'checked_out': status['checked_out'],
+            'capacity': status['capacity'],
+            'saturation': status['saturation'],
+            'wait_p95_ms': wait_p95_ms,
+        })
+        if status['saturation'] is not None and status['saturation'] >= max_saturation:
+            reasons.append(f'连接池 {name} 使用率 {status["saturation"]:.0%}')
+        if wait_p95_ms >= max_wait_ms:
+            reasons.append(f'连接池 {name} 等待时间 p95 {wait_p95_ms:.0f}ms')
+
+    ready = not reasons
+    code = 200 if ready else 503
+    data = {
+        'database': {'ok': ok, 'source': source},
+        'pools': pools
+    }
+    # 从库不可用时只读请求会回退到主库，不影响就绪状态，仅在结果中展示
+    if REPLICA_BIND in db.engines:
+        data['replica'] = replica_health.snapshot()
+    return jsonify({
+        'code': code,
+        'msg': 'ready' if ready else '；'.join(reasons),
+        'data': data
+    }), code
+
+
+@health_bp.route('/pool', methods=['GET'])
+def pool_statistics():
+    """
+    数据库连接池统计接口
+    返回每个引擎的连接池大小、借出数、溢出数、使用率、借出/归还次数、
+    获取连接超时次数以及等待时间（平均、最大、最近 1 分钟分位数）
+    参数:
+        - include_config (可选): 为 1 时同时返回连接池配置
+    """
+    data = {'pools': collect_pool_stats()}
+    if request.args.get('include_config') == '1':
+        options = current_app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+        data['config'] = {
+            key: options[key]
+            for key in ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_pre_ping')
+            if key in options
+        }
+    return jsonify({
+        'code': 200,
+        'msg': '获取成功',
+        'data': data
+    }), 200
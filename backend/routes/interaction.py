@@ -3,17 +3,23 @@
 提供评论、点赞等用户互动功能API接口
 """
 from flask import Blueprint, request, jsonify
-from models import db, Comment, Like, Collection, Video, User
+from models import db, Comment, Like, Collection, Video
+from utils import author_stats
+from utils.analytics import analytics
+from utils.auth import current_user, login_required
+from utils.cache import invalidate_video
+from utils.replica import read_only
 
 # 创建互动蓝图
 interaction_bp = Blueprint('interaction', __name__)
 
 
 @interaction_bp.route('/videos/<int:video_id>/comments', methods=['POST'])
+@login_required
 def create_comment(video_id):
     """
-    发表评论接口
-    接收JSON: {user_id, content, parent_id(可选)}
+    发表评论接口（需要登录，评论者为令牌中的用户）
+    接收JSON: {content, parent_id(可选)}
     Root ID 计算逻辑：
     - 一级评论：root_id = None
     - 回复评论：root_id = 父评论的root_id 或 父评论的id（如果父评论是一级评论）
@@ -24,13 +30,13 @@ def create_comment(video_id):
         data = request.get_json()
         
         # 验证必填字段
-        if not data or not data.get('user_id') or not data.get('content'):
+        if not data or not data.get('content'):
             return jsonify({
                 'code': 400,
-                'msg': '缺少必填字段：user_id、content'
+                'msg': '缺少必填字段：content'
             }), 400
         
-        user_id = data.get('user_id')
+        user_id = current_user().id
         content = data.get('content').strip()
         parent_id = data.get('parent_id')  # 可选，回复时传入
         
@@ -49,14 +55,6 @@ def create_comment(video_id):
                 'msg': '视频不存在'
             }), 404
         
-        # 验证用户是否存在
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({
-                'code': 404,
-                'msg': '用户不存在'
-            }), 404
-        
         # 计算 root_id
         root_id = None
         if parent_id:
@@ -95,6 +93,7 @@ def create_comment(video_id):
         # 保存到数据库
         db.session.add(new_comment)
         db.session.commit()
+        analytics.record('comments', video.category_id)
         
         return jsonify({
             'code': 200,
@@ -112,25 +111,15 @@ def create_comment(video_id):
 
 
 @interaction_bp.route('/videos/<int:video_id>/collect', methods=['POST'])
+@login_required
 def toggle_collect(video_id):
     """
-    收藏/取消收藏接口
-    接收JSON: {user_id}
+    收藏/取消收藏接口（需要登录，操作者为令牌中的用户）
     逻辑：如果已收藏则取消，未收藏则添加
     返回: 当前收藏状态和视频最新收藏总数
     """
     try:
-        # 获取请求数据
-        data = request.get_json()
-        
-        # 验证必填字段
-        if not data or not data.get('user_id'):
-            return jsonify({
-                'code': 400,
-                'msg': '缺少必填字段：user_id'
-            }), 400
-        
-        user_id = data.get('user_id')
+        user_id = current_user().id
         
         # 验证视频是否存在
         video = Video.query.get(video_id)
@@ -140,14 +129,6 @@ def toggle_collect(video_id):
                 'msg': '视频不存在'
             }), 404
         
-        # 验证用户是否存在
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({
-                'code': 404,
-                'msg': '用户不存在'
-            }), 404
-        
         # 检查是否已存在收藏记录
         existing_collection = Collection.query.filter_by(
             user_id=user_id,
@@ -157,6 +138,7 @@ def toggle_collect(video_id):
         if existing_collection:
             # 已存在收藏记录，取消收藏
             db.session.delete(existing_collection)
+            author_stats.on_collect_toggled(video, -1)
             db.session.commit()
             collected = False
             msg = '取消收藏成功'
@@ -167,10 +149,14 @@ def toggle_collect(video_id):
                 video_id=video_id
             )
             db.session.add(new_collection)
+            author_stats.on_collect_toggled(video, 1)
             db.session.commit()
             collected = True
             msg = '收藏成功'
         
+        # 点赞/收藏数变化，清除视频详情缓存
+        invalidate_video(video_id)
+
         # 获取视频最新收藏总数
         collections_count = video.get_collections_count()
         
@@ -193,21 +179,15 @@ def toggle_collect(video_id):
 
 
 @interaction_bp.route('/videos/<int:video_id>/collect/status', methods=['GET'])
+@login_required
+@read_only
 def get_collect_status(video_id):
     """
-    获取用户对视频的收藏状态
-    参数: user_id (查询参数)
+    获取当前登录用户对视频的收藏状态
     返回: 当前用户是否已收藏该视频
     """
     try:
-        # 获取查询参数
-        user_id = request.args.get('user_id')
-        
-        if not user_id:
-            return jsonify({
-                'code': 400,
-                'msg': '缺少参数：user_id'
-            }), 400
+        user_id = current_user().id
         
         # 验证视频是否存在
         video = Video.query.get(video_id)
@@ -239,21 +219,15 @@ def get_collect_status(video_id):
 
 
 @interaction_bp.route('/videos/<int:video_id>/like/status', methods=['GET'])
+@login_required
+@read_only
 def get_like_status(video_id):
     """
-    获取用户对视频的点赞状态
-    参数: user_id (查询参数)
+    获取当前登录用户对视频的点赞状态
     返回: 当前用户是否已点赞该视频
     """
     try:
-        # 获取查询参数
-        user_id = request.args.get('user_id')
-        
-        if not user_id:
-            return jsonify({
-                'code': 400,
-                'msg': '缺少参数：user_id'
-            }), 400
+        user_id = current_user().id
         
         # 验证视频是否存在
         video = Video.query.get(video_id)
@@ -285,6 +259,7 @@ def get_like_status(video_id):
 
 
 @interaction_bp.route('/videos/<int:video_id>/comments', methods=['GET'])
+@read_only
 def get_comments(video_id):
     """
     获取视频评论列表接口
@@ -327,25 +302,15 @@ def get_comments(video_id):
 
 
 @interaction_bp.route('/videos/<int:video_id>/like', methods=['POST'])
+@login_required
 def toggle_like(video_id):
     """
-    点赞/取消点赞接口
-    接收JSON: {user_id}
+    点赞/取消点赞接口（需要登录，操作者为令牌中的用户）
     逻辑：如果已点赞则取消，未点赞则添加
     返回: 当前点赞状态和视频最新点赞总数
     """
     try:
-        # 获取请求数据
-        data = request.get_json()
-        
-        # 验证必填字段
-        if not data or not data.get('user_id'):
-            return jsonify({
-                'code': 400,
-                'msg': '缺少必填字段：user_id'
-            }), 400
-        
-        user_id = data.get('user_id')
+        user_id = current_user().id
         
         # 验证视频是否存在
         video = Video.query.get(video_id)
@@ -355,14 +320,6 @@ def toggle_like(video_id):
                 'msg': '视频不存在'
             }), 404
         
-        # 验证用户是否存在
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({
-                'code': 404,
-                'msg': '用户不存在'
-            }), 404
-        
         # 检查是否已存在点赞记录
         existing_like = Like.query.filter_by(
             user_id=user_id,
@@ -372,6 +329,7 @@ def toggle_like(video_id):
         if existing_like:
             # 已存在点赞记录，取消点赞
             db.session.delete(existing_like)
+            author_stats.on_like_toggled(video, -1)
             db.session.commit()
             liked = False
             msg = '取消点赞成功'
@@ -382,10 +340,15 @@ def toggle_like(video_id):
                 video_id=video_id
             )
             db.session.add(new_like)
+            author_stats.on_like_toggled(video, 1)
             db.session.commit()
+            analytics.record('likes', video.category_id)
             liked = True
             msg = '点赞成功'
         
+        # 点赞/收藏数变化，清除视频详情缓存
+        invalidate_video(video_id)
+
         # 获取视频最新点赞总数
         likes_count = video.get_likes_count()
         
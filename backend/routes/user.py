@@ -3,8 +3,16 @@
 提供用户信息管理、收藏列表、发布视频列表等API接口
 """
 from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy.orm import joinedload
 from werkzeug.utils import secure_filename
-from models import db, User, Video
+from models import db, User, Video, Collection
+from utils.auth import current_user, login_required
+from utils.author_stats import get_author_stats
+from utils.json_provider import isoformat
+from utils.metrics import observe_upload, record_rejection
+from utils.pagination import InvalidCursor, keyset_page, parse_page_args, split_page
+from utils.passwords import HasherBusy
+from utils.replica import read_only
 import os
 import uuid
 
@@ -28,35 +36,29 @@ def allowed_avatar_file(filename):
 
 
 @user_bp.route('/me', methods=['GET'])
+@login_required
+@read_only
 def get_current_user():
     """
     获取当前登录用户的详细信息
-    参数: user_id (查询参数 - 前端需传入已登录用户ID)
-    返回: 用户详细信息（含头像URL、昵称等）
+    返回: 用户详细信息（含头像URL、昵称等）及作者统计 stats
     """
     try:
-        # 获取查询参数中的user_id
-        user_id = request.args.get('user_id')
-        
-        if not user_id:
-            return jsonify({
-                'code': 400,
-                'msg': '缺少参数：user_id'
-            }), 400
-        
-        # 查询用户
-        user = User.query.get(user_id)
+        # 查询用户（令牌只包含基本信息，完整资料从数据库读取）
+        user = User.query.get(current_user().id)
         if not user:
             return jsonify({
                 'code': 404,
                 'msg': '用户不存在'
             }), 404
         
-        # 返回用户信息
+        # 返回用户信息，附带作者统计（author_stats 主键读取）
+        user_data = user.to_dict()
+        user_data['stats'] = get_author_stats(user.id)
         return jsonify({
             'code': 200,
             'msg': '获取成功',
-            'data': user.to_dict()
+            'data': user_data
         }), 200
     
     except Exception as e:
@@ -67,28 +69,19 @@ def get_current_user():
 
 
 @user_bp.route('/me', methods=['PUT'])
+@login_required
 def update_current_user():
     """
     修改当前用户资料
     接收表单数据:
-        - user_id: 用户ID (必填)
         - nickname: 新昵称 (可选)
         - password: 新密码 (可选)
         - avatar: 头像文件 (可选)
     返回: 更新后的用户信息
     """
     try:
-        # 获取用户ID（支持表单和JSON两种方式）
-        user_id = request.form.get('user_id') or (request.get_json() or {}).get('user_id')
-        
-        if not user_id:
-            return jsonify({
-                'code': 400,
-                'msg': '缺少必填字段：user_id'
-            }), 400
-        
         # 查询用户
-        user = User.query.get(user_id)
+        user = User.query.get(current_user().id)
         if not user:
             return jsonify({
                 'code': 404,
@@ -138,6 +131,7 @@ def update_current_user():
                 
                 # 保存文件
                 avatar_file.save(avatar_path)
+                observe_upload('avatar', os.path.getsize(avatar_path))
                 
                 # 更新数据库中的头像路径（存储相对路径，不包含/static/前缀）
                 user.avatar = f"avatars/{new_filename}"
@@ -151,6 +145,14 @@ def update_current_user():
             'data': user.to_dict()
         }), 200
     
+    except HasherBusy:
+        # 修改密码时密码哈希线程池排队已满
+        db.session.rollback()
+        record_rejection(request.endpoint, 'password_busy')
+        return jsonify({
+            'code': 503,
+            'msg': '服务器繁忙，请稍后再试'
+        }), 503, {'Retry-After': '1'}
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -159,54 +161,51 @@ def update_current_user():
         }), 500
 
 
+def _invalid_cursor(e):
+    return jsonify({
+        'code': 400,
+        'msg': str(e)
+    }), 400
+
+
 @user_bp.route('/me/videos', methods=['GET'])
+@login_required
+@read_only
 def get_my_videos():
     """
-    获取当前用户发布的视频列表
-    参数: user_id (查询参数)
-    返回: 用户上传的所有视频（含各种状态）
+    获取当前用户发布的视频列表（游标分页，按上传时间倒序）
+    参数:
+        - cursor (可选): 上一页返回的 next_cursor，不传表示第一页
+        - limit (可选): 每页条数，默认 20，最大 50
+    返回: 用户上传的视频（含各种状态），total 只在第一页返回
     """
     try:
-        # 获取用户ID
-        user_id = request.args.get('user_id')
-        
-        if not user_id:
-            return jsonify({
-                'code': 400,
-                'msg': '缺少参数：user_id'
-            }), 400
-        
-        # 验证用户是否存在
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({
-                'code': 404,
-                'msg': '用户不存在'
-            }), 404
+        user_id = current_user().id
+        cursor, limit = parse_page_args(request.args)
         
-        # 查询用户发布的视频，按时间倒序
-        videos = Video.query.filter_by(user_id=user_id).order_by(
-            Video.created_at.desc()
-        ).all()
+        # 按 (上传时间, ID) 倒序取一页（idx_user_created 索引）
+        query = Video.query.options(
+            joinedload(Video.category)
+        ).filter(Video.user_id == user_id)
+        rows = keyset_page(query, Video.created_at, Video.id, cursor, limit)
+        videos, next_cursor = split_page(rows, limit, lambda v: (v.created_at, v.id))
         
-        # 转换为字典列表，并添加完整的URL
-        video_list = []
-        for video in videos:
-            video_data = video.to_dict(include_author=False)
-            # 添加完整的封面和视频URL
-            video_data['cover_url'] = f"http://localhost:5001/static/{video.cover_path}"
-            video_data['video_url'] = f"http://localhost:5001/static/{video.video_path}"
-            video_list.append(video_data)
+        # 总数只在第一页统计（翻页时客户端沿用第一页的值）
+        total = Video.query.filter(Video.user_id == user_id).count() if cursor is None else None
         
         return jsonify({
             'code': 200,
             'msg': '获取成功',
             'data': {
-                'total': len(video_list),
-                'list': video_list
+                'total': total,
+                'list': Video.serialize_list(videos, include_author=False),
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
             }
         }), 200
     
+    except InvalidCursor as e:
+        return _invalid_cursor(e)
     except Exception as e:
         return jsonify({
             'code': 500,
@@ -215,54 +214,60 @@ def get_my_videos():
 
 
 @user_bp.route('/me/collections', methods=['GET'])
+@login_required
+@read_only
 def get_my_collections():
     """
-    获取当前用户收藏的视频列表
-    参数: user_id (查询参数)
-    返回: 用户收藏的所有已发布视频
+    获取当前用户收藏的视频列表（游标分页，按收藏时间倒序）
+    参数:
+        - cursor (可选): 上一页返回的 next_cursor，不传表示第一页
+        - limit (可选): 每页条数，默认 20，最大 50
+    返回: 用户收藏的已发布视频（含收藏时间 collected_at），total 只在第一页返回
     """
     try:
-        # 获取用户ID
-        user_id = request.args.get('user_id')
-        
-        if not user_id:
-            return jsonify({
-                'code': 400,
-                'msg': '缺少参数：user_id'
-            }), 400
+        user_id = current_user().id
+        cursor, limit = parse_page_args(request.args)
         
-        # 验证用户是否存在
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({
-                'code': 404,
-                'msg': '用户不存在'
-            }), 404
-        
-        # 通过 favorites 关系获取收藏的视频
+        # 从收藏表按 (收藏时间, 收藏ID) 倒序取一页（idx_collections_user_created 索引），关联视频及作者、分类
         # 只返回已发布的视频
-        collected_videos = user.favorites.filter(
+        query = db.session.query(Video, Collection.created_at, Collection.id).join(
+            Collection, Collection.video_id == Video.id
+        ).options(
+            joinedload(Video.author),
+            joinedload(Video.category)
+        ).filter(
+            Collection.user_id == user_id,
             Video.status == Video.STATUS_PUBLISHED
-        ).order_by(Video.created_at.desc()).all()
+        )
+        rows = keyset_page(query, Collection.created_at, Collection.id, cursor, limit)
+        rows, next_cursor = split_page(rows, limit, lambda row: (row[1], row[2]))
         
-        # 转换为字典列表，并添加完整的URL
-        video_list = []
-        for video in collected_videos:
-            video_data = video.to_dict(include_author=True)
-            # 添加完整的封面和视频URL
-            video_data['cover_url'] = f"http://localhost:5001/static/{video.cover_path}"
-            video_data['video_url'] = f"http://localhost:5001/static/{video.video_path}"
-            video_list.append(video_data)
+        video_list = Video.serialize_list([row[0] for row in rows], include_author=True)
+        for video_data, row in zip(video_list, rows):
+            video_data['collected_at'] = isoformat(row[1])
+        
+        total = None
+        if cursor is None:
+            total = Collection.query.join(
+                Video, Collection.video_id == Video.id
+            ).filter(
+                Collection.user_id == user_id,
+                Video.status == Video.STATUS_PUBLISHED
+            ).count()
         
         return jsonify({
             'code': 200,
             'msg': '获取成功',
             'data': {
-                'total': len(video_list),
-                'list': video_list
+                'total': total,
+                'list': video_list,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
             }
         }), 200
     
+    except InvalidCursor as e:
+        return _invalid_cursor(e)
     except Exception as e:
         return jsonify({
             'code': 500,
@@ -271,13 +276,19 @@ def get_my_collections():
 
 
 @user_bp.route('/<int:user_id>', methods=['GET'])
+@read_only
 def get_user_info(user_id):
     """
     获取指定用户的信息和视频列表（作者主页）
-    参数: user_id (路径参数)
-    返回: 用户信息和已发布的视频列表
+    参数:
+        - user_id (路径参数)
+        - cursor (可选): 视频列表上一页返回的 next_cursor，不传表示第一页
+        - limit (可选): 每页条数，默认 20，最大 50
+    返回: 用户信息、作者统计和一页已发布的视频（total 只在第一页返回）
     """
     try:
+        cursor, limit = parse_page_args(request.args)
+        
         # 查询用户
         user = User.query.get(user_id)
         if not user:
@@ -286,33 +297,37 @@ def get_user_info(user_id):
                 'msg': '用户不存在'
             }), 404
         
-        # 查询用户发布的已发布状态的视频，按时间倒序
-        videos = Video.query.filter_by(
-            user_id=user_id, 
-            status=Video.STATUS_PUBLISHED
-        ).order_by(Video.created_at.desc()).all()
+        # 查询用户发布的已发布状态的视频，按 (上传时间, ID) 倒序取一页（idx_user_status_created 索引）
+        query = Video.query.options(
+            joinedload(Video.category)
+        ).filter(
+            Video.user_id == user_id,
+            Video.status == Video.STATUS_PUBLISHED
+        )
+        rows = keyset_page(query, Video.created_at, Video.id, cursor, limit)
+        videos, next_cursor = split_page(rows, limit, lambda v: (v.created_at, v.id))
         
-        # 转换为字典列表，并添加完整的URL
-        video_list = []
-        for video in videos:
-            video_data = video.to_dict(include_author=False)
-            # 添加完整的封面和视频URL
-            video_data['cover_url'] = f"http://localhost:5001/static/{video.cover_path}"
-            video_data['video_url'] = f"http://localhost:5001/static/{video.video_path}"
-            video_list.append(video_data)
+        # 作者统计从汇总表按主键读取，已发布视频总数直接取 published_videos
+        stats = get_author_stats(user_id)
+        total = stats['published_videos'] if cursor is None else None
         
         return jsonify({
             'code': 200,
             'msg': '获取成功',
             'data': {
                 'user': user.to_dict(),
+                'stats': stats,
                 'videos': {
-                    'total': len(video_list),
-                    'list': video_list
+                    'total': total,
+                    'list': Video.serialize_list(videos, include_author=False),
+                    'next_cursor': next_cursor,
+                    'has_more': next_cursor is not None
                 }
             }
         }), 200
     
+    except InvalidCursor as e:
+        return _invalid_cursor(e)
     except Exception as e:
         return jsonify({
             'code': 500,
@@ -2,17 +2,33 @@
 视频路由模块
 提供视频上传、列表查询、详情获取等API接口
 """
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, send_file
+import math
 import os
 import uuid
 from datetime import datetime
-from models import db, Video, Category, User
+from sqlalchemy.orm import joinedload
+from models import db, User, Video, Category, UserFeed, VideoRelated
+from utils import author_stats, playback, seek_index, suggest
+from utils.analytics import analytics
+from utils.auth import current_user, login_required, token_identity
+from utils.metrics import observe_upload
+from utils.cache import category_cache, detail_cache, detail_flight, feed_cache, invalidate_feed, related_cache
+from utils.compression import PrecompressedBody
+from utils.pagination import (DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, decode_cursor, keyset_page,
+                              split_page)
+from utils.related import unpack_ids
+from utils.replica import read_only
+from utils.suggest import title_index
+from utils.unique_viewers import viewer_key, viewer_sketches
+from utils.view_counter import view_counter
 
 # 创建视频蓝图
 video_bp = Blueprint('video', __name__)
 
 
 @video_bp.route('/categories', methods=['GET'])
+@read_only
 def get_categories():
     """
     获取所有视频分类
@@ -20,11 +36,15 @@ def get_categories():
     返回: [{"id": 1, "name": "校园生活"}, ...]
     """
     try:
-        categories = Category.query.all()
+        # 分类几乎不变化，使用进程内缓存
+        data = category_cache.get('all')
+        if data is None:
+            data = [category.to_dict() for category in Category.query.all()]
+            category_cache.set('all', data)
         return jsonify({
             'code': 200,
             'msg': '获取分类成功',
-            'data': [category.to_dict() for category in categories]
+            'data': data
         }), 200
     
     except Exception as e:
@@ -35,25 +55,28 @@ def get_categories():
 
 
 @video_bp.route('/upload', methods=['POST'])
+@login_required
 def upload_video():
     """
-    视频上传接口（核心功能）
+    视频上传接口（核心功能，需要登录，上传者为令牌中的用户）
     接收 multipart/form-data 数据
-    参数: user_id, title, description, category_id, video_file, cover_file
+    参数: title, description, category_id, video_file, cover_file
     返回: 上传成功信息
     """
     try:
+        # 当前登录用户（角色来自令牌）
+        user = current_user()
+        
         # 获取表单数据
-        user_id = request.form.get('user_id')
         title = request.form.get('title')
         description = request.form.get('description', '')
         category_id = request.form.get('category_id')
         
         # 验证必填字段
-        if not all([user_id, title, category_id]):
+        if not all([title, category_id]):
             return jsonify({
                 'code': 400,
-                'msg': '缺少必填字段：user_id、title、category_id'
+                'msg': '缺少必填字段：title、category_id'
             }), 400
         
         # 验证文件是否存在
@@ -73,9 +96,8 @@ def upload_video():
                 'msg': '文件不能为空'
             }), 400
         
-        # 验证用户是否存在
-        user = User.query.get(user_id)
-        if not user:
+        # 验证用户是否存在（令牌在有效期内，账号可能已被删除，视频不能挂在不存在的用户下）
+        if not User.query.get(user.id):
             return jsonify({
                 'code': 404,
                 'msg': '用户不存在'
@@ -122,13 +144,24 @@ def upload_video():
         video_file.save(video_save_path)
         cover_file.save(cover_save_path)
         
+        # 记录上传字节数（Prometheus 上传吞吐量指标）
+        observe_upload('video', os.path.getsize(video_save_path))
+        observe_upload('cover', os.path.getsize(cover_save_path))
+        
+        # 预先计算关键帧索引（sidecar 文件），失败不影响上传
+        if seek_index.is_supported(video_filename):
+            try:
+                seek_index.write_seek_index(video_save_path)
+            except Exception as index_err:
+                print(f'构建关键帧索引失败: {str(index_err)}')
+        
         # 数据库存储的相对路径
         video_db_path = f"videos/{video_filename}"
         cover_db_path = f"covers/{cover_filename}"
         
         # 根据用户角色决定视频状态
         # 管理员上传直接发布，普通用户需要审核
-        if user.role == 'admin':
+        if user.is_admin:
             video_status = Video.STATUS_PUBLISHED  # 1 = 已发布
             status_msg = '视频上传成功，已直接发布'
         else:
@@ -137,7 +170,7 @@ def upload_video():
         
         # 创建视频记录
         new_video = Video(
-            user_id=int(user_id),
+            user_id=user.id,
             category_id=int(category_id),
             title=title,
             description=description,
@@ -148,7 +181,15 @@ def upload_video():
         
         # 写入数据库
         db.session.add(new_video)
+        if video_status == Video.STATUS_PUBLISHED:
+            author_stats.increment(user.id, published_videos=1)
         db.session.commit()
+        analytics.record('uploads', new_video.category_id)
+        
+        # 管理员上传直接发布，首页列表需要刷新
+        if video_status == Video.STATUS_PUBLISHED:
+            invalidate_feed()
+            title_index.add(new_video.id, new_video.title)
         
         return jsonify({
             'code': 200,
@@ -157,7 +198,7 @@ def upload_video():
                 'id': new_video.id,
                 'title': new_video.title,
                 'status': new_video.status,
-                'is_admin': user.role == 'admin'  # 返回是否为管理员，供前端使用
+                'is_admin': user.is_admin  # 返回是否为管理员，供前端使用
             }
         }), 201
     
@@ -171,27 +212,36 @@ def upload_video():
 
 
 @video_bp.route('/list', methods=['GET'])
+@read_only
 def get_video_list():
     """
     获取视频列表（仅已发布状态）
     参数: 
     - keyword (可选，搜索关键词，模糊查询标题)
     - category_id (可选，用于分类筛选)
+    - mode (可选): personal 时返回个性化推荐（分页，见 _get_personal_feed，忽略 keyword / category_id）
     返回: 视频列表（包含作者昵称、分类名、封面URL）
     """
+    if request.args.get('mode') == 'personal':
+        return _get_personal_feed()
+    
     try:
         # 获取搜索关键词和分类筛选参数
         keyword = request.args.get('keyword', '').strip()
         category_id = request.args.get('category_id', '').strip()
         
-        # 基础查询：只查询 status=1 (已发布) 的视频
-        query = Video.query.filter_by(status=Video.STATUS_PUBLISHED)
+        # 基础查询：只查询 status=1 (已发布) 的视频，预先加载作者和分类
+        query = Video.query.options(
+            joinedload(Video.author),
+            joinedload(Video.category)
+        ).filter_by(status=Video.STATUS_PUBLISHED)
         
         # 如果提供了搜索关键词，则进行模糊搜索
         if keyword:
             query = query.filter(Video.title.like(f'%{keyword}%'))
         
         # 如果提供了分类ID且不是 'all'，则按分类筛选
+        category_id_int = None
         if category_id and category_id != 'all':
             try:
                 category_id_int = int(category_id)
@@ -200,24 +250,103 @@ def get_video_list():
                 # 如果 category_id 无法转换为整数，忽略此筛选
                 pass
         
+        # 不带搜索关键词的公共列表走缓存，命中时直接返回序列化（并按需压缩）好的响应体
+        cache_key = None
+        if not keyword:
+            cache_key = category_id_int if category_id_int is not None else 'all'
+            body = feed_cache.get(cache_key)
+            if body is not None:
+                return body.to_response()
+        
         # 按上传时间倒序排列
         videos = query.order_by(Video.created_at.desc()).all()
         
-        # 构建返回数据，包含完整的 URL
-        video_list = []
-        for video in videos:
-            video_data = video.to_dict(include_author=True)
-            # 添加完整的封面和视频URL
-            video_data['cover_url'] = f"http://localhost:5001/static/{video.cover_path}"
-            video_data['video_url'] = f"http://localhost:5001/static/{video.video_path}"
-            video_list.append(video_data)
+        # 构建返回数据（点赞、收藏数批量查询），包含完整的 URL
+        response = jsonify({
+            'code': 200,
+            'msg': '获取视频列表成功',
+            'data': Video.serialize_list(videos)
+        })
+        if cache_key is not None:
+            body = PrecompressedBody(response.get_data())
+            feed_cache.set(cache_key, body)
+            return body.to_response()
+        return response, 200
+    
+    except Exception as e:
+        return jsonify({
+            'code': 500,
+            'msg': f'服务器错误: {str(e)}'
+        }), 500
+
+
+def _get_personal_feed():
+    """
+    个性化首页推荐（游标分页）
+    参数:
+    - cursor (可选): 上一页返回的 next_cursor，不传表示第一页
+    - limit (可选): 每页条数，默认 20，最大 50
+    逻辑:
+    - 登录用户有离线生成的候选列表（flask build-feeds，见 utils/personal_feed.py）时，按主键读取ID数组，
+      游标为数组下标，截取一页后批量查询视频（生成后已下架的视频跳过）
+    - 未登录或没有候选列表（新用户、没有点赞收藏记录）时回退到全站最新视频（按上传时间倒序的游标分页）
+    返回: list、next_cursor、has_more，以及 personalized（是否为个性化结果）
+    """
+    try:
+        cursor = request.args.get('cursor') or None
+        limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        
+        # 纯数字游标是候选列表下标，其余是全站列表的时间游标；翻页期间不在两种来源间切换
+        feed_ids = None
+        user_id = token_identity()
+        if user_id is not None and (cursor is None or cursor.isdigit()):
+            entry = UserFeed.query.get(user_id)
+            if entry:
+                feed_ids = unpack_ids(entry.video_ids)
+        
+        if feed_ids:
+            offset = int(cursor) if cursor else 0
+            page_ids = feed_ids[offset:offset + limit]
+            found = {
+                v.id: v for v in Video.query.options(
+                    joinedload(Video.author),
+                    joinedload(Video.category)
+                ).filter(
+                    Video.id.in_(page_ids),
+                    Video.status == Video.STATUS_PUBLISHED
+                ).all()
+            } if page_ids else {}
+            videos = [found[vid] for vid in page_ids if vid in found]
+            next_cursor = str(offset + limit) if offset + limit < len(feed_ids) else None
+            personalized = True
+        else:
+            # 候选列表下标游标（列表已被删除）从全站第一页开始
+            cursor = decode_cursor(cursor) if cursor and not cursor.isdigit() else None
+            query = Video.query.options(
+                joinedload(Video.author),
+                joinedload(Video.category)
+            ).filter(Video.status == Video.STATUS_PUBLISHED)
+            rows = keyset_page(query, Video.created_at, Video.id, cursor, limit)
+            videos, next_cursor = split_page(rows, limit, lambda v: (v.created_at, v.id))
+            personalized = False
         
         return jsonify({
             'code': 200,
             'msg': '获取视频列表成功',
-            'data': video_list
+            'data': {
+                'list': Video.serialize_list(videos),
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None,
+                'personalized': personalized
+            }
         }), 200
     
+    except InvalidCursor as e:
+        return jsonify({
+            'code': 400,
+            'msg': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'code': 500,
@@ -225,20 +354,57 @@ def get_video_list():
         }), 500
 
 
+# 详情响应体中播放量的占位符（缓存的是以占位符切分的前后两段，读取时拼入实时播放量）
+# 每个进程随机生成且不出现在任何响应中，标题、简介等用户输入无法构造出相同的字符串
+_VIEW_COUNT_MARKER = f'__view_count_{uuid.uuid4().hex}__'
+
+
+def _load_video_detail(id):
+    """
+    查询视频详情并序列化为缓存条目
+    返回:
+        tuple: (占位符之前的字节, 占位符之后的字节, 数据库中的播放量)，视频不存在时返回 None
+    """
+    video = Video.query.get(id)
+    if not video:
+        return None
+    
+    # 构建返回数据
+    video_data = video.to_dict(include_author=True)
+    video_data.update(video.media_urls())
+    video_data['view_count'] = _VIEW_COUNT_MARKER
+    
+    body = current_app.json.dumps({
+        'code': 200,
+        'msg': '获取视频详情成功',
+        'data': video_data
+    }) + '\n'
+    head, tail = body.split(f'"{_VIEW_COUNT_MARKER}"', 1)
+    entry = (head.encode('utf-8'), tail.encode('utf-8'), video.view_count or 0)
+    
+    view_counter.seed(id, video.view_count)
+    detail_cache.set(id, entry)
+    return entry
+
+
 @video_bp.route('/<int:id>', methods=['GET'])
 def get_video_detail(id):
     """
     获取视频详情
     参数: id (视频ID)
     逻辑: 
-    - 每次请求将 view_count +1
+    - 每次请求将 view_count +1（进程内累加，批量写回数据库，见 utils/view_counter.py）
+    - 访客（登录用户或 IP）计入该视频的 HyperLogLog 草图，定期写回为 unique_viewers（见 utils/unique_viewers.py）
+    - 序列化后的详情按视频ID缓存，并发未命中时只有一个请求查询数据库；
+      点赞/收藏、审核、删除时清除缓存，播放量在读取时填入实时值
     - TODO: status=0 的视频仅允许上传者本人或管理员查看（权限判断）
     """
     try:
-        # 查询视频
-        video = Video.query.get(id)
+        entry = detail_cache.get(id)
+        if entry is None:
+            entry = detail_flight.do(id, lambda: _load_video_detail(id))
         
-        if not video:
+        if entry is None:
             return jsonify({
                 'code': 404,
                 'msg': '视频不存在'
@@ -258,23 +424,286 @@ def get_video_detail(id):
         #         }), 403
         
         # 每次访问，播放量 +1
-        video.view_count += 1
-        db.session.commit()
+        head, tail, db_view_count = entry
+        view_count = view_counter.hit(id, db_view_count)
+        view_counter.maybe_flush()
+        viewer_sketches.add(id, viewer_key())
+        viewer_sketches.maybe_flush()
         
-        # 构建返回数据
-        video_data = video.to_dict(include_author=True)
-        video_data['cover_url'] = f"http://localhost:5001/static/{video.cover_path}"
-        video_data['video_url'] = f"http://localhost:5001/static/{video.video_path}"
+        body = head + str(view_count).encode('ascii') + tail
+        return current_app.response_class(body, mimetype='application/json'), 200
+    
+    except Exception as e:
+        # 发生异常时回滚事务
+        db.session.rollback()
+        return jsonify({
+            'code': 500,
+            'msg': f'服务器错误: {str(e)}'
+        }), 500
+
+
+@video_bp.route('/suggest', methods=['GET'])
+def suggest_titles():
+    """
+    搜索框标题联想
+    参数:
+    - q: 输入的前缀（忽略大小写和多余空白）
+    - limit (可选): 条数，默认 8，最大 10
+    逻辑: 查询进程内的标题前缀索引（见 utils/suggest.py），按播放量从高到低返回，不访问数据库
+    返回: 以 q 开头的已发布视频标题列表 [{id, title}]
+    """
+    try:
+        prefix = request.args.get('q', '')
+        limit = request.args.get('limit', suggest.DEFAULT_LIMIT, type=int)
+        limit = max(1, min(limit, suggest.MAX_LIMIT))
+        
+        # 确保本进程的后台重建线程已启动（gunicorn 下已在 worker 初始化时启动），请求线程不做重建
+        title_index.start_refresher(current_app._get_current_object())
         
         return jsonify({
             'code': 200,
-            'msg': '获取视频详情成功',
-            'data': video_data
+            'msg': '获取成功',
+            'data': title_index.suggest(prefix, limit)
         }), 200
     
     except Exception as e:
-        # 发生异常时回滚事务
-        db.session.rollback()
+        return jsonify({
+            'code': 500,
+            'msg': f'服务器错误: {str(e)}'
+        }), 500
+
+
+# 相关视频默认 / 最大条数
+RELATED_DEFAULT_LIMIT = 10
+RELATED_MAX_LIMIT = 20
+
+
+@video_bp.route('/<int:id>/related', methods=['GET'])
+@read_only
+def get_related_videos(id):
+    """
+    获取相关视频
+    参数:
+    - id (视频ID)
+    - limit (可选): 条数，默认 10，最大 20
+    逻辑:
+    - 优先使用离线构建的相关视频列表（根据点赞、收藏的共现关系，见 utils/related.py），按主键读取
+    - 没有相关列表（新视频、互动很少）或已发布的不足 limit 条时，用同分类最新发布的视频补足
+    返回: 相关视频列表及来源 source（related / category / mixed）
+    """
+    try:
+        limit = request.args.get('limit', RELATED_DEFAULT_LIMIT, type=int)
+        limit = max(1, min(limit, RELATED_MAX_LIMIT))
+        
+        cache_key = (id, limit)
+        data = related_cache.get(cache_key)
+        if data is not None:
+            return jsonify({
+                'code': 200,
+                'msg': '获取相关视频成功',
+                'data': data
+            }), 200
+        
+        video = Video.query.get(id)
+        if not video:
+            return jsonify({
+                'code': 404,
+                'msg': '视频不存在'
+            }), 404
+        
+        # 离线相关列表（多取一些，跳过已下架的视频）
+        videos = []
+        entry = VideoRelated.query.get(id)
+        related_ids = unpack_ids(entry.related_ids)[:limit * 2] if entry else []
+        if related_ids:
+            found = {
+                v.id: v for v in Video.query.options(
+                    joinedload(Video.author),
+                    joinedload(Video.category)
+                ).filter(
+                    Video.id.in_(related_ids),
+                    Video.status == Video.STATUS_PUBLISHED
+                ).all()
+            }
+            videos = [found[vid] for vid in related_ids if vid in found][:limit]
+        from_related = len(videos)
+        
+        # 冷启动：同分类最新发布的视频补足（idx_status_category_created 索引）
+        if len(videos) < limit:
+            exclude = [id] + [v.id for v in videos]
+            videos += Video.query.options(
+                joinedload(Video.author),
+                joinedload(Video.category)
+            ).filter(
+                Video.status == Video.STATUS_PUBLISHED,
+                Video.category_id == video.category_id,
+                Video.id.notin_(exclude)
+            ).order_by(Video.created_at.desc()).limit(limit - len(videos)).all()
+        
+        if from_related == len(videos):
+            source = 'related'
+        elif from_related == 0:
+            source = 'category'
+        else:
+            source = 'mixed'
+        
+        data = {
+            'list': Video.serialize_list(videos),
+            'source': source
+        }
+        related_cache.set(cache_key, data)
+        
+        return jsonify({
+            'code': 200,
+            'msg': '获取相关视频成功',
+            'data': data
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'code': 500,
+            'msg': f'服务器错误: {str(e)}'
+        }), 500
+
+
+@video_bp.route('/<int:id>/seek-index', methods=['GET'])
+def get_seek_index(id):
+    """
+    获取视频关键帧索引（用于快速拖动进度条）
+    参数:
+    - t (可选，秒): 传入时返回不晚于该时间的最近关键帧及其字节偏移（JSON）
+    返回:
+    - 不传 t: 二进制 sidecar 文件（格式见 utils/seek_index.py）
+    - 传入 t: {"time_ms": 关键帧时间, "offset": 字节偏移}
+    """
+    try:
+        t = request.args.get('t', type=float)
+        if t is not None and not math.isfinite(t):
+            return jsonify({
+                'code': 400,
+                'msg': '参数 t 必须是有限的数值'
+            }), 400
+        
+        video = Video.query.get(id)
+        if not video:
+            return jsonify({
+                'code': 404,
+                'msg': '视频不存在'
+            }), 404
+        
+        if not seek_index.is_supported(video.video_path):
+            return jsonify({
+                'code': 404,
+                'msg': '该视频格式不支持关键帧索引'
+            }), 404
+        
+        video_file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], video.video_path)
+        index_path = seek_index.sidecar_path(video_file_path)
+        
+        # 旧视频没有 sidecar 文件时按需补建（之前构建失败过的文件不再重复解析）
+        if not os.path.exists(index_path):
+            if not os.path.exists(video_file_path):
+                return jsonify({
+                    'code': 404,
+                    'msg': '视频文件不存在'
+                }), 404
+            failure = seek_index.read_failure(video_file_path)
+            if failure is not None:
+                return jsonify({
+                    'code': 404,
+                    'msg': f'无法构建关键帧索引: {failure}'
+                }), 404
+            try:
+                seek_index.write_seek_index(video_file_path)
+            except seek_index.SeekIndexError as index_err:
+                return jsonify({
+                    'code': 404,
+                    'msg': f'无法构建关键帧索引: {str(index_err)}'
+                }), 404
+        
+        if t is None:
+            # 直接返回二进制索引，内容只随视频文件变化，允许浏览器缓存
+            return send_file(
+                index_path,
+                mimetype='application/octet-stream',
+                max_age=86400
+            )
+        
+        with open(index_path, 'rb') as f:
+            entry = seek_index.lookup(f.read(), max(int(t * 1000), 0))
+        
+        if entry is None:
+            return jsonify({
+                'code': 404,
+                'msg': '关键帧索引为空'
+            }), 404
+        
+        return jsonify({
+            'code': 200,
+            'msg': '获取关键帧成功',
+            'data': {
+                'time_ms': entry[0],
+                'offset': entry[1]
+            }
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'code': 500,
+            'msg': f'服务器错误: {str(e)}'
+        }), 500
+
+
+@video_bp.route('/playback', methods=['POST'])
+@login_required(optional=True)
+def report_playback():
+    """
+    播放心跳上报接口（可不登录，按用户 / IP 限流）
+    接收JSON: {events: [{video_id, type, watched, position}, ...]}（最多 20 条）
+        - type: start（开始播放）/ progress（播放中定期上报）/ complete（播放结束）
+        - watched: 距上次上报实际观看的秒数（每个视频每次上报合计最多计入 60 秒）
+        - position: 当前播放位置（秒）
+    逻辑: 只接受已发布视频的事件（按主键批量查询一次），打包成定长二进制记录追加到日志分段文件后立即返回，
+          由 flask rollup-playback 定期汇总到视频的观看时长和完播统计（见 utils/playback.py）
+    返回: 接受的事件数（格式不合法、视频不存在或未发布的事件被忽略）
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        events = data.get('events')
+        
+        if not isinstance(events, list) or not events:
+            return jsonify({
+                'code': 400,
+                'msg': '缺少必填字段：events'
+            }), 400
+        if len(events) > playback.MAX_EVENTS_PER_REQUEST:
+            return jsonify({
+                'code': 400,
+                'msg': f'单次最多上报 {playback.MAX_EVENTS_PER_REQUEST} 条事件'
+            }), 400
+        
+        # 只统计已发布的视频
+        video_ids = playback.event_video_ids(events)
+        published = {
+            vid for (vid,) in Video.query.with_entities(Video.id).filter(
+                Video.id.in_(video_ids),
+                Video.status == Video.STATUS_PUBLISHED
+            )
+        } if video_ids else set()
+        
+        user = current_user()
+        records, accepted = playback.pack_events(events, user.id if user else None, published)
+        playback.segment_writer.append(records)
+        
+        return jsonify({
+            'code': 200,
+            'msg': '上报成功',
+            'data': {
+                'accepted': accepted
+            }
+        }), 202
+    
+    except Exception as e:
         return jsonify({
             'code': 500,
             'msg': f'服务器错误: {str(e)}'
@@ -0,0 +1,4 @@
+"""
+工具模块
+包含路由之外的通用组件（视频元数据处理、缓存、监控等）
+"""
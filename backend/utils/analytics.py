@@ -0,0 +1,276 @@
+"""
+运营统计模块
+上传、审核、播放、点赞、评论等事件按 (指标, 小时, 分类) 在进程内累加，达到批量大小或时间间隔后
+一次性写回 stats_hourly / stats_daily 两张汇总表（INSERT ... ON DUPLICATE KEY UPDATE value = value + n），
+管理后台的统计图表按 (指标, 时间范围) 读取汇总表，不再扫描 videos / likes / comments 全表。
+
+写操作在提交成功后才记录事件（事务回滚的操作不计入）；同一小时、同一分类的事件合并成一行写回，
+避免每次点赞都更新同一热点行。未写回的增量在进程退出时写回，进程崩溃时最多丢失一个写回间隔的数据。
+
+指标:
+    uploads     上传视频数
+    approvals   审核通过数（管理员上传直接发布的不计入）
+    rejections  审核驳回数
+    views       播放次数（随播放量批量写回一起记录）
+    likes       新增点赞数（取消点赞不扣减）
+    comments    新增评论数
+
+历史数据回填（上传、点赞、评论可由现有数据重新统计，其余指标从上线后开始累计）:
+    flask backfill-analytics
+"""
+import atexit
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+
+from utils.upsert import accumulate_stmt, replace_stmt
+
+METRICS = ('uploads', 'approvals', 'rejections', 'views', 'likes', 'comments')
+
+# 时间粒度 -> 单次查询最多覆盖的天数
+GRANULARITY_MAX_DAYS = {
+    'hour': 31,
+    'day': 366,
+}
+
+
+def hour_start(at):
+    """
+    时间所在小时的起点
+    """
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+class AnalyticsRecorder:
+    """
+    进程内运营指标累加器（线程安全）
+    参数:
+        flush_interval: 距上次写回超过该秒数时写回
+        flush_batch: 未写回的 (指标, 小时, 分类) 组合达到该数量时写回
+    """
+
+    def __init__(self, flush_interval=10, flush_batch=1000):
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # (指标, 小时起点, 分类ID) -> 未写回的增量
+        self._pending = {}
+        self._last_flush = time.monotonic()
+
+    def record(self, metric, category_id, amount=1, at=None):
+        """
+        记录事件并在需要时写回（由请求线程顺带执行，写回失败不影响当前请求）
+        参数:
+            metric: 指标名称（METRICS 之一）
+            category_id: 视频分类ID
+            amount: 增量
+            at: 事件时间（UTC），默认当前时间
+        """
+        self.add(metric, category_id, amount, at)
+        self.maybe_flush()
+
+    def add(self, metric, category_id, amount=1, at=None):
+        """
+        只累加不写回（批量记录时由调用方最后统一调用 maybe_flush）
+        """
+        if not amount or category_id is None:
+            return
+        key = (metric, hour_start(at or datetime.utcnow()), category_id)
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + amount
+
+    def pending(self):
+        """
+        返回未写回的 (指标, 小时, 分类) 组合数
+        """
+        with self._lock:
+            return len(self._pending)
+
+    def should_flush(self):
+        return bool(self._pending) and (
+            len(self._pending) >= self.flush_batch
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        )
+
+    def maybe_flush(self):
+        """
+        达到批量大小或时间间隔时写回（已有线程在写回时直接返回）
+        """
+        if self.should_flush() and self._flush_lock.acquire(blocking=False):
+            try:
+                self._flush()
+            except Exception as e:
+                print(f'运营统计写回失败: {e}')
+            finally:
+                self._flush_lock.release()
+
+    def flush(self):
+        """
+        立即写回所有未写回的增量（需要应用上下文）
+        返回:
+            int: 写回的小时汇总行数
+        """
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self):
+        from models import db, StatsDaily, StatsHourly
+
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not batch:
+            return 0
+
+        # 同一天的小时增量先合并，每个 (指标, 日期, 分类) 只写一行
+        daily = Counter()
+        for (metric, hour, category_id), amount in batch.items():
+            daily[(metric, hour.date(), category_id)] += amount
+
+        dialect_name = db.engine.dialect.name
+        key_columns = ['metric', 'bucket', 'category_id']
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(
+                    accumulate_stmt(dialect_name, StatsHourly.__table__, key_columns, ['value']),
+                    [{'metric': m, 'bucket': b, 'category_id': c, 'value': v} for (m, b, c), v in batch.items()],
+                )
+                conn.execute(
+                    accumulate_stmt(dialect_name, StatsDaily.__table__, key_columns, ['value']),
+                    [{'metric': m, 'bucket': b, 'category_id': c, 'value': v} for (m, b, c), v in daily.items()],
+                )
+        except Exception:
+            # 写回失败时把增量合并回去，下次再试
+            with self._lock:
+                for key, amount in batch.items():
+                    self._pending[key] = self._pending.get(key, 0) + amount
+            raise
+        return len(batch)
+
+
+analytics = AnalyticsRecorder()
+
+
+def query_series(metric, granularity, start, end, category_id=None):
+    """
+    读取一个指标在时间范围内的汇总数据
+    参数:
+        metric: 指标名称
+        granularity: 'hour' 或 'day'
+        start: 起始时间桶（含），小时起点或日期
+        end: 结束时间桶（含）
+        category_id: 只查询该分类（可选）
+    返回:
+        tuple: (时间桶列表（连续，没有数据的时间桶补 0）, {分类ID: 与时间桶对应的数值列表})
+    """
+    from models import db, StatsDaily, StatsHourly
+
+    model = StatsHourly if granularity == 'hour' else StatsDaily
+    step = timedelta(hours=1) if granularity == 'hour' else timedelta(days=1)
+
+    buckets = []
+    bucket = start
+    while bucket <= end:
+        buckets.append(bucket)
+        bucket += step
+    index = {bucket: i for i, bucket in enumerate(buckets)}
+
+    query = db.session.query(model.bucket, model.category_id, model.value).filter(
+        model.metric == metric,
+        model.bucket >= start,
+        model.bucket <= end,
+    )
+    if category_id is not None:
+        query = query.filter(model.category_id == category_id)
+
+    series = {}
+    for bucket, row_category_id, value in query:
+        i = index.get(bucket)
+        if i is None:
+            continue
+        values = series.setdefault(row_category_id, [0] * len(buckets))
+        values[i] += value
+    return buckets, series
+
+
+def backfill_analytics():
+    """
+    由现有数据重新统计可回填的指标（上传、点赞、评论），覆盖汇总表中这些指标的所有数据
+    点赞、评论按当前仍存在的记录统计（已取消的点赞、已删除的评论不计入）
+    返回:
+        dict: 指标 -> 写入的小时汇总行数
+    """
+    from models import db, Comment, Like, StatsDaily, StatsHourly, Video
+
+    videos = Video.__table__
+    sources = {
+        'uploads': select(videos.c.created_at, videos.c.category_id),
+    }
+    for metric, model in (('likes', Like), ('comments', Comment)):
+        table = model.__table__
+        sources[metric] = select(table.c.created_at, videos.c.category_id).select_from(
+            table.join(videos, table.c.video_id == videos.c.id)
+        )
+
+    key_columns = ['metric', 'bucket', 'category_id']
+    written = {}
+    with db.engine.begin() as conn:
+        for metric, source in sources.items():
+            hourly = Counter()
+            daily = Counter()
+            # 流式读取，按小时、天在内存中聚合（与数据库无关，不依赖各数据库的日期函数）
+            for created_at, category_id in conn.execute(source.execution_options(yield_per=10000)):
+                if created_at is None or category_id is None:
+                    continue
+                hour = hour_start(created_at)
+                hourly[(hour, category_id)] += 1
+                daily[(hour.date(), category_id)] += 1
+
+            for model, counts in ((StatsHourly, hourly), (StatsDaily, daily)):
+                table = model.__table__
+                conn.execute(delete(table).where(table.c.metric == metric))
+                if counts:
+                    conn.execute(
+                        replace_stmt(conn.dialect.name, table, key_columns, ['value']),
+                        [{'metric': metric, 'bucket': b, 'category_id': c, 'value': v}
+                         for (b, c), v in counts.items()],
+                    )
+            written[metric] = len(hourly)
+    return written
+
+
+def init_analytics(app):
+    """
+    在应用工厂中配置运营统计写回，进程退出时写回剩余增量，并注册回填命令:
+        flask backfill-analytics
+    配置项:
+        ANALYTICS_FLUSH_INTERVAL: 写回间隔（秒）
+        ANALYTICS_FLUSH_BATCH: 写回批量大小
+    """
+    analytics.flush_interval = app.config.get('ANALYTICS_FLUSH_INTERVAL', analytics.flush_interval)
+    analytics.flush_batch = app.config.get('ANALYTICS_FLUSH_BATCH', analytics.flush_batch)
+
+    def flush_on_exit():
+        if not analytics.pending():
+            return
+        try:
+            with app.app_context():
+                analytics.flush()
+        except Exception as e:
+            print(f'运营统计写回失败: {e}')
+
+    atexit.register(flush_on_exit)
+
+    @app.cli.command('backfill-analytics')
+    def backfill_analytics_command():
+        """由现有数据回填运营统计（上传、点赞、评论）"""
+        start = time.perf_counter()
+        written = backfill_analytics()
+        summary = '，'.join(f'{metric} {count} 行' for metric, count in written.items())
+        print(f'运营统计回填完成: {summary}，耗时 {time.perf_counter() - start:.2f} 秒')
+
+    return flush_on_exit
@@ -0,0 +1,154 @@
+"""
+身份认证模块
+登录接口签发 JWT 访问令牌（Flask-JWT-Extended），令牌中携带用户ID、角色和昵称，
+需要登录的接口通过 @login_required / @admin_required 校验签名后直接从令牌中取得当前用户，
+不再信任请求参数中的 user_id，也不再为了确认用户存在而逐请求查询 users 表。
+
+前端在请求头中携带令牌:
+    Authorization: Bearer <access_token>
+
+注意：令牌是无状态的，修改角色、昵称后需要重新登录才会体现在令牌中；
+签发后无法单独吊销，有效期由 JWT_ACCESS_TOKEN_EXPIRES 控制。
+"""
+import functools
+from dataclasses import dataclass
+
+from flask import g, jsonify, request
+from flask_jwt_extended import (
+    JWTManager,
+    create_access_token,
+    decode_token,
+    get_jwt,
+    verify_jwt_in_request,
+)
+
+jwt = JWTManager()
+
+
+@dataclass(frozen=True)
+class TokenUser:
+    """
+    令牌中的当前用户信息（不是数据库对象）
+    """
+    id: int
+    role: str
+    nickname: str
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+
+def issue_token(user):
+    """
+    为用户签发访问令牌（需要应用上下文）
+    参数:
+        user: User 对象（或具有 id、role、nickname 属性的对象）
+    返回:
+        str: JWT 访问令牌
+    """
+    return create_access_token(
+        identity=str(user.id),
+        additional_claims={'role': user.role, 'nickname': user.nickname},
+    )
+
+
+def _user_from_claims(claims):
+    return TokenUser(
+        id=int(claims['sub']),
+        role=claims.get('role', 'user'),
+        nickname=claims.get('nickname', ''),
+    )
+
+
+def current_user():
+    """
+    返回当前请求的登录用户（TokenUser），未登录时返回 None
+    """
+    return g.get('current_user')
+
+
+def login_required(view=None, optional=False):
+    """
+    登录校验装饰器：校验 Authorization 头中的令牌，并把当前用户保存到 g.current_user
+    参数:
+        optional: 为 True 时允许未携带令牌的请求（g.current_user 为 None），携带了无效令牌仍返回 401
+    """
+    if view is None:
+        return functools.partial(login_required, optional=optional)
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        verify_jwt_in_request(optional=optional)
+        claims = get_jwt()
+        g.current_user = _user_from_claims(claims) if claims else None
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def admin_required(view):
+    """
+    管理员校验装饰器：令牌有效且角色为 admin
+    """
+    @functools.wraps(view)
+    @login_required
+    def wrapper(*args, **kwargs):
+        if not g.current_user.is_admin:
+            return jsonify({
+                'code': 403,
+                'msg': '需要管理员权限'
+            }), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def token_identity():
+    """
+    在装饰器之外读取当前请求令牌中的用户ID（用于限流、读写分离识别客户端）
+    令牌缺失或无效时返回 None，不抛出异常；结果缓存在请求内
+    """
+    if '_token_identity' in g:
+        return g._token_identity
+    user = g.get('current_user')
+    identity = user.id if user is not None else None
+    if identity is None:
+        header = request.headers.get('Authorization', '')
+        if header.startswith('Bearer '):
+            try:
+                identity = int(decode_token(header[7:])['sub'])
+            except Exception:
+                identity = None
+    g._token_identity = identity
+    return identity
+
+
+def _error(status, msg):
+    return jsonify({
+        'code': status,
+        'msg': msg
+    }), status
+
+
+@jwt.unauthorized_loader
+def _missing_token(reason):
+    return _error(401, '未登录或登录已过期')
+
+
+@jwt.invalid_token_loader
+def _invalid_token(reason):
+    return _error(401, '登录凭证无效，请重新登录')
+
+
+@jwt.expired_token_loader
+def _expired_token(jwt_header, jwt_payload):
+    return _error(401, '登录已过期，请重新登录')
+
+
+def init_auth(app):
+    """
+    在应用工厂中初始化 JWT
+    配置项:
+        JWT_SECRET_KEY: 令牌签名密钥
+        JWT_ACCESS_TOKEN_EXPIRES: 访问令牌有效期
+    """
+    jwt.init_app(app)
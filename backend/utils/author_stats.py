@@ -0,0 +1,222 @@
+"""
+作者统计汇总维护模块
+author_stats 表保存每位作者已发布视频的数量、总播放量、总获赞和总收藏，作者主页和个人中心按主键读取，
+不再在请求中对作者的所有视频求和、逐个视频统计点赞数。
+
+增量维护（与业务写操作在同一事务中提交）:
+    上传（管理员直接发布）/ 审核通过  -> on_video_published
+    批量审核通过                      -> on_videos_published
+    删除已发布视频                    -> on_video_unpublished
+    点赞 / 收藏切换                   -> on_like_toggled / on_collect_toggled
+    播放量批量写回                    -> views_update_stmt（见 utils/view_counter.py）
+
+全量重算:
+    flask recompute-author-stats
+    以三条 GROUP BY 聚合查询算出所有作者的统计值，再批量覆盖写入（建议每晚由 cron 执行），
+    修正增量维护的偏差（如多进程未写回的播放量、重算期间并发写入造成的差异）
+"""
+import time
+from datetime import datetime
+
+from sqlalchemy import bindparam, func, select, update
+
+from utils.upsert import increment_stmt, replace_stmt
+
+# 全量重算时每批写入的行数
+RECOMPUTE_BATCH_SIZE = 1000
+
+
+def _dialect_name():
+    from models import db
+
+    return db.engine.dialect.name
+
+
+def increment(user_id, **deltas):
+    """
+    在当前会话的事务中累加作者统计（行不存在时插入），随业务写操作一起提交
+    参数:
+        user_id: 作者ID
+        deltas: 计数列 -> 增量
+    """
+    from models import db, AuthorStats
+
+    deltas = {column: delta for column, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    db.session.execute(increment_stmt(
+        _dialect_name(), AuthorStats.__table__, {'user_id': user_id}, deltas,
+        extra={'updated_at': datetime.utcnow()},
+    ))
+
+
+def _video_totals(video):
+    """
+    一个视频对作者统计的贡献
+    """
+    return {
+        'published_videos': 1,
+        'total_views': video.view_count or 0,
+        'total_likes': video.get_likes_count(),
+        'total_collections': video.get_collections_count(),
+    }
+
+
+def on_video_published(video):
+    """
+    视频变为已发布状态（管理员上传或审核通过）
+    """
+    increment(video.user_id, **_video_totals(video))
+
+
+def on_videos_published(videos):
+    """
+    一批视频同时变为已发布状态（批量审核），按作者汇总后每位作者累加一次
+    参数:
+        videos: 含 id、user_id、view_count 属性的对象列表（模型对象或查询行）
+    """
+    from models import Video
+
+    counts = Video.interaction_counts([video.id for video in videos])
+    totals = {}
+    for video in videos:
+        likes, collections = counts.get(video.id, (0, 0))
+        author = totals.setdefault(video.user_id, dict.fromkeys(
+            ('published_videos', 'total_views', 'total_likes', 'total_collections'), 0))
+        author['published_videos'] += 1
+        author['total_views'] += video.view_count or 0
+        author['total_likes'] += likes
+        author['total_collections'] += collections
+    for user_id, deltas in totals.items():
+        increment(user_id, **deltas)
+
+
+def on_video_unpublished(video):
+    """
+    已发布的视频被删除
+    """
+    increment(video.user_id, **{column: -value for column, value in _video_totals(video).items()})
+
+
+def on_like_toggled(video, delta):
+    """
+    点赞 / 取消点赞（只统计已发布视频）
+    """
+    from models import Video
+
+    if video.status == Video.STATUS_PUBLISHED:
+        increment(video.user_id, total_likes=delta)
+
+
+def on_collect_toggled(video, delta):
+    """
+    收藏 / 取消收藏（只统计已发布视频）
+    """
+    from models import Video
+
+    if video.status == Video.STATUS_PUBLISHED:
+        increment(video.user_id, total_collections=delta)
+
+
+def views_update_stmt():
+    """
+    播放量写回时同步累加作者总播放量的语句（executemany 参数: video_id, delta）
+    只更新已有统计行（作者的视频发布时已创建该行），未发布的视频不计入
+    """
+    from models import AuthorStats, Video
+
+    stats = AuthorStats.__table__
+    videos = Video.__table__
+    author_id = select(videos.c.user_id).where(
+        videos.c.id == bindparam('video_id'),
+        videos.c.status == Video.STATUS_PUBLISHED,
+    ).scalar_subquery()
+    return (
+        update(stats)
+        .where(stats.c.user_id == author_id)
+        .values(total_views=stats.c.total_views + bindparam('delta'))
+    )
+
+
+def get_author_stats(user_id):
+    """
+    读取作者统计（主键查询）
+    返回:
+        dict: 各计数字段，没有统计行时全部为 0
+    """
+    from models import AuthorStats
+
+    stats = AuthorStats.query.get(user_id)
+    return stats.to_dict() if stats is not None else AuthorStats.empty_dict()
+
+
+def recompute_author_stats():
+    """
+    全量重算所有作者的统计并覆盖写入（关注数字段保持不变）
+    返回:
+        int: 写入的作者数
+    """
+    from models import db, AuthorStats, Collection, Like, Video
+
+    videos = Video.__table__
+    published = videos.c.status == Video.STATUS_PUBLISHED
+    now = datetime.utcnow()
+
+    rows = {}
+
+    def row(user_id):
+        if user_id not in rows:
+            rows[user_id] = {
+                'user_id': user_id,
+                'published_videos': 0,
+                'total_views': 0,
+                'total_likes': 0,
+                'total_collections': 0,
+                'followers_count': 0,
+                'following_count': 0,
+                'updated_at': now,
+            }
+        return rows[user_id]
+
+    with db.engine.begin() as conn:
+        for user_id, count, views in conn.execute(
+            select(videos.c.user_id, func.count(), func.coalesce(func.sum(videos.c.view_count), 0))
+            .where(published).group_by(videos.c.user_id)
+        ):
+            row(user_id).update(published_videos=count, total_views=int(views))
+
+        for model, column in ((Like, 'total_likes'), (Collection, 'total_collections')):
+            table = model.__table__
+            for user_id, count in conn.execute(
+                select(videos.c.user_id, func.count())
+                .select_from(table.join(videos, table.c.video_id == videos.c.id))
+                .where(published).group_by(videos.c.user_id)
+            ):
+                row(user_id)[column] = count
+
+        # 已有统计行但不再有已发布视频的作者清零
+        stats = AuthorStats.__table__
+        for user_id in conn.execute(select(stats.c.user_id)).scalars():
+            row(user_id)
+
+        stmt = replace_stmt(
+            conn.dialect.name, stats, ['user_id'],
+            ['published_videos', 'total_views', 'total_likes', 'total_collections', 'updated_at'],
+        )
+        values = list(rows.values())
+        for start in range(0, len(values), RECOMPUTE_BATCH_SIZE):
+            conn.execute(stmt, values[start:start + RECOMPUTE_BATCH_SIZE])
+    return len(rows)
+
+
+def init_author_stats(app):
+    """
+    在应用工厂中注册全量重算命令:
+        flask recompute-author-stats
+    """
+    @app.cli.command('recompute-author-stats')
+    def recompute_author_stats_command():
+        """全量重算作者统计（author_stats），建议每晚执行"""
+        start = time.perf_counter()
+        count = recompute_author_stats()
+        print(f'作者统计重算完成: {count} 位作者，耗时 {time.perf_counter() - start:.2f} 秒')
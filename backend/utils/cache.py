@@ -0,0 +1,174 @@
+"""
+进程内缓存模块
+提供带过期时间和容量上限的线程安全缓存（命中/未命中次数上报到 Prometheus 指标），
+以及合并同一 key 并发回源请求的 SingleFlight。
+
+注意：缓存位于每个 worker 进程内，写操作只会让处理该请求的进程立即失效，
+其他进程依赖较短的过期时间（TTL）收敛，因此只缓存允许短暂不一致的公共数据。
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from utils.metrics import record_cache
+
+# 未命中时的哨兵值（缓存值本身可能为 None）
+MISSING = object()
+
+
+class TTLCache:
+    """
+    带过期时间的 LRU 缓存
+    参数:
+        name: 缓存名称（用于指标标签）
+        ttl: 过期时间（秒）
+        maxsize: 最大条目数，超出时淘汰最久未使用的条目
+    """
+
+    def __init__(self, name, ttl, maxsize=1024):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        # key -> (过期时间, 值)
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        """
+        读取缓存，过期或不存在时返回 default
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(key)
+                value = entry[1]
+            else:
+                if entry is not None:
+                    del self._data[key]
+                value = MISSING
+        record_cache(self.name, value is not MISSING)
+        return default if value is MISSING else value
+
+    def set(self, key, value, ttl=None):
+        """
+        写入缓存
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """
+        删除指定条目
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class _Call:
+    """
+    SingleFlight 中一次进行中的回源调用
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    合并并发回源：同一 key 同时只有一个线程执行加载函数，其余线程等待并共享其结果（或异常）
+    用于热点数据缓存失效时，避免大量并发请求同时查询数据库
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """
+        执行（或等待）key 对应的加载函数
+        参数:
+            key: 合并的键
+            fn: 无参加载函数
+        返回:
+            加载函数的返回值
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+
+# ==================== 应用共享的缓存实例 ====================
+
+# 视频分类（几乎不变化）
+category_cache = TTLCache('categories', ttl=300, maxsize=1)
+
+# 首页公共视频列表（按分类筛选，不含搜索关键词），值为 PrecompressedBody（序列化后的响应体及其压缩结果）
+feed_cache = TTLCache('feed', ttl=10, maxsize=64)
+
+# 视频详情（按视频ID），值为序列化后的响应体（播放量在读取时填入，见 routes/video.py）
+detail_cache = TTLCache('video_detail', ttl=30, maxsize=2048)
+detail_flight = SingleFlight()
+
+# 相关视频（按 (视频ID, 条数)），值为响应数据；相关列表由离线任务更新，只依赖过期时间收敛
+related_cache = TTLCache('related', ttl=60, maxsize=2048)
+
+
+def configure_caches(app):
+    """
+    根据应用配置调整缓存过期时间
+    """
+    category_cache.ttl = app.config.get('CATEGORY_CACHE_TTL', category_cache.ttl)
+    feed_cache.ttl = app.config.get('FEED_CACHE_TTL', feed_cache.ttl)
+    detail_cache.ttl = app.config.get('DETAIL_CACHE_TTL', detail_cache.ttl)
+    related_cache.ttl = app.config.get('RELATED_CACHE_TTL', related_cache.ttl)
+
+
+def invalidate_feed():
+    """
+    已发布视频集合发生变化（审核通过、管理员直接发布、删除）时清空首页缓存
+    """
+    feed_cache.clear()
+
+
+def invalidate_video(video_id):
+    """
+    视频的点赞/收藏数、审核状态发生变化或视频被删除时清除其详情缓存
+    """
+    detail_cache.delete(video_id)
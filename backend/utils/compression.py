@@ -0,0 +1,129 @@
+"""
+响应压缩模块
+按请求头 Accept-Encoding 协商压缩算法（安装了 brotli 时优先 br，其次 gzip），
+对超过最小长度的 JSON / 文本响应进行压缩。
+
+可缓存的响应（如首页列表）以 PrecompressedBody 形式存入缓存，
+每种编码只在第一次被请求时压缩一次，之后命中缓存的请求直接返回压缩好的字节。
+
+注意：文件下载（send_file，direct_passthrough）和流式响应不压缩；
+如果前面的反向代理（如 nginx gzip on）已经负责压缩，可将 COMPRESS_ENABLED 设为 0。
+"""
+import gzip
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli 为可选依赖
+    brotli = None
+
+# 默认参与压缩的响应类型
+DEFAULT_MIMETYPES = frozenset((
+    'application/json',
+    'text/html',
+    'text/plain',
+    'text/css',
+    'application/javascript',
+))
+
+
+def supported_encodings():
+    """
+    返回服务端支持的压缩算法（按优先级排序）
+    """
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(data, encoding, config):
+    """
+    按指定算法压缩数据
+    参数:
+        data: 原始字节
+        encoding: 'br' 或 'gzip'
+        config: 应用配置（读取压缩级别）
+    """
+    if encoding == 'br':
+        return brotli.compress(data, quality=config.get('COMPRESS_BR_LEVEL', 5))
+    # mtime=0：同样的内容得到同样的压缩结果
+    return gzip.compress(data, compresslevel=config.get('COMPRESS_LEVEL', 6), mtime=0)
+
+
+def negotiate(size):
+    """
+    为当前请求选择压缩算法
+    参数:
+        size: 响应体字节数
+    返回:
+        str | None: 'br' / 'gzip'，不需要压缩时返回 None
+    """
+    config = current_app.config
+    if not config.get('COMPRESS_ENABLED', True) or size < config.get('COMPRESS_MIN_SIZE', 1024):
+        return None
+    return request.accept_encodings.best_match(supported_encodings())
+
+
+def _add_vary(response):
+    response.vary.add('Accept-Encoding')
+
+
+class PrecompressedBody:
+    """
+    缓存用的响应体：保存原始字节，各压缩编码在第一次被请求时生成并保存
+    （并发情况下同一编码可能被压缩不止一次，结果相同，不影响正确性）
+    """
+
+    def __init__(self, data, mimetype='application/json'):
+        self.data = data
+        self.mimetype = mimetype
+        self._encoded = {}
+
+    def encoded(self, encoding, config):
+        body = self._encoded.get(encoding)
+        if body is None:
+            body = compress(self.data, encoding, config)
+            self._encoded[encoding] = body
+        return body
+
+    def to_response(self, status=200):
+        """
+        按当前请求协商的编码生成响应
+        """
+        encoding = negotiate(len(self.data))
+        if encoding is None:
+            response = current_app.response_class(self.data, status=status, mimetype=self.mimetype)
+        else:
+            response = current_app.response_class(
+                self.encoded(encoding, current_app.config), status=status, mimetype=self.mimetype)
+            response.headers['Content-Encoding'] = encoding
+        _add_vary(response)
+        return response
+
+
+def init_compression(app):
+    """
+    在应用工厂中启用响应压缩
+    配置项:
+        COMPRESS_ENABLED: 是否启用
+        COMPRESS_MIN_SIZE: 最小压缩长度（字节），过小的响应压缩收益低于开销
+        COMPRESS_LEVEL: gzip 压缩级别 (1-9)
+        COMPRESS_BR_LEVEL: brotli 压缩级别 (0-11)
+        COMPRESS_MIMETYPES: 参与压缩的响应类型
+    """
+    mimetypes = frozenset(app.config.get('COMPRESS_MIMETYPES') or DEFAULT_MIMETYPES)
+
+    @app.after_request
+    def compress_response(response):
+        if response.direct_passthrough or response.is_streamed \
+                or 'Content-Encoding' in response.headers \
+                or response.mimetype not in mimetypes \
+                or not 200 <= response.status_code < 300:
+            return response
+        data = response.get_data()
+        _add_vary(response)
+        encoding = negotiate(len(data))
+        if encoding is None:
+            return response
+        response.set_data(compress(data, encoding, app.config))
+        response.headers['Content-Encoding'] = encoding
+        return response
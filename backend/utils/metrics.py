@@ -0,0 +1,198 @@
+"""
+Prometheus 指标模块
+通过 /metrics 接口以 Prometheus 文本格式暴露以下指标:
+- 按蓝图、路由统计的请求延迟直方图、状态码计数和进行中请求数
+- 数据库连接池借出数、溢出连接数和获取连接等待时间
+- 上传字节数（用 rate() 计算吞吐量）
+- 被限流、上传并发上限、过载保护、密码哈希排队上限拒绝的请求数
+- 各缓存的命中/未命中次数（用于计算命中率）
+
+多进程部署（gunicorn 预 fork 多个 worker）时，需要在启动前设置环境变量
+PROMETHEUS_MULTIPROC_DIR 指向一个空目录，各 worker 的指标写入该目录下的
+mmap 文件，/metrics 由 MultiProcessCollector 汇总所有进程的数据。
+"""
+import os
+import time
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from models import db
+from utils import pool_monitor
+
+# 请求延迟直方图的分桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 获取数据库连接等待时间的分桶（秒）
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+# ==================== HTTP 请求指标 ====================
+
+REQUEST_LATENCY = Histogram(
+    'univideo_http_request_duration_seconds',
+    '请求处理耗时',
+    ['blueprint', 'endpoint', 'method'],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_COUNT = Counter(
+    'univideo_http_requests_total',
+    '请求总数（按状态码）',
+    ['blueprint', 'endpoint', 'method', 'status'],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'univideo_http_requests_in_flight',
+    '正在处理的请求数',
+    ['blueprint'],
+    multiprocess_mode='livesum',
+)
+
+# ==================== 数据库连接池指标 ====================
+
+POOL_CHECKED_OUT = Gauge(
+    'univideo_db_pool_checked_out',
+    '当前借出的数据库连接数',
+    ['engine'],
+    multiprocess_mode='livesum',
+)
+POOL_OVERFLOW = Gauge(
+    'univideo_db_pool_overflow',
+    '当前使用的溢出连接数',
+    ['engine'],
+    multiprocess_mode='livesum',
+)
+POOL_CHECKOUTS = Counter(
+    'univideo_db_pool_checkouts_total',
+    '数据库连接借出次数',
+    ['engine'],
+)
+POOL_WAIT = Histogram(
+    'univideo_db_pool_wait_seconds',
+    '从连接池获取连接的等待时间',
+    ['engine'],
+    buckets=POOL_WAIT_BUCKETS,
+)
+
+# ==================== 业务指标 ====================
+
+UPLOAD_BYTES = Counter(
+    'univideo_upload_bytes_total',
+    '上传文件的字节数',
+    ['kind'],
+)
+REQUESTS_REJECTED = Counter(
+    'univideo_requests_rejected_total',
+    '被准入控制拒绝的请求数（reason=rate_limit/upload_busy/load_shed/password_busy）',
+    ['endpoint', 'reason'],
+)
+CACHE_REQUESTS = Counter(
+    'univideo_cache_requests_total',
+    '缓存访问次数（result=hit/miss）',
+    ['cache', 'result'],
+)
+
+
+def observe_upload(kind, nbytes):
+    """
+    记录上传字节数
+    参数:
+        kind: 文件类型（video/cover/avatar）
+        nbytes: 字节数
+    """
+    UPLOAD_BYTES.labels(kind=kind).inc(nbytes)
+
+
+def record_rejection(endpoint, reason):
+    """
+    记录一次被准入控制拒绝的请求
+    参数:
+        endpoint: 接口名称
+        reason: 拒绝原因（rate_limit / upload_busy / load_shed / password_busy）
+    """
+    REQUESTS_REJECTED.labels(endpoint=endpoint, reason=reason).inc()
+
+
+def record_cache(cache, hit):
+    """
+    记录一次缓存访问
+    参数:
+        cache: 缓存名称
+        hit: 是否命中
+    """
+    CACHE_REQUESTS.labels(cache=cache, result='hit' if hit else 'miss').inc()
+
+
+@pool_monitor.on_wait
+def _observe_pool_wait(name, seconds):
+    POOL_WAIT.labels(engine=name).observe(seconds)
+
+
+@pool_monitor.on_state_change
+def _observe_pool_state(name, stats, checkout):
+    if checkout:
+        POOL_CHECKOUTS.labels(engine=name).inc()
+    POOL_CHECKED_OUT.labels(engine=name).set(stats.checked_out)
+    POOL_OVERFLOW.labels(engine=name).set(stats.overflow)
+
+
+def _request_labels():
+    """
+    获取当前请求的标签（未匹配路由统一归为 unmatched，避免标签基数失控）
+    """
+    return request.blueprint or 'app', request.endpoint or 'unmatched', request.method
+
+
+def _collect():
+    """
+    生成指标文本（多进程模式下汇总所有 worker 的数据）
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def init_metrics(app):
+    """
+    在应用工厂中启用 Prometheus 指标
+    """
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            pool_monitor.instrument_engine(engine, bind_key or 'default')
+
+    @app.before_request
+    def start_request_metrics():
+        g._metrics_start = time.perf_counter()
+        g._metrics_blueprint = request.blueprint or 'app'
+        REQUESTS_IN_FLIGHT.labels(blueprint=g._metrics_blueprint).inc()
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.get('_metrics_start')
+        if start is not None:
+            blueprint, endpoint, method = _request_labels()
+            REQUEST_LATENCY.labels(blueprint, endpoint, method).observe(time.perf_counter() - start)
+            REQUEST_COUNT.labels(blueprint, endpoint, method, str(response.status_code)).inc()
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        blueprint = g.pop('_metrics_blueprint', None)
+        if blueprint is not None:
+            REQUESTS_IN_FLIGHT.labels(blueprint=blueprint).dec()
+
+    @app.route('/metrics')
+    def metrics():
+        """
+        Prometheus 指标接口
+        """
+        return Response(_collect(), mimetype=CONTENT_TYPE_LATEST)
+
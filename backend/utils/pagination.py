@@ -0,0 +1,109 @@
+"""
+游标分页（keyset pagination）模块
+列表按 (时间, ID) 倒序排列，游标记录上一页最后一行的 (时间, ID)，
+下一页查询条件为 "时间 < 游标时间，或时间相同且 ID < 游标ID"（正序列表反之），配合 (筛选列, 时间, ID) 联合索引，
+无论翻到第几页都只扫描一页的索引范围（OFFSET 分页越往后越慢，且翻页期间有新数据插入时会重复或遗漏）。
+
+游标对客户端是不透明的字符串，客户端只需原样传回上一页响应中的 next_cursor。
+"""
+import base64
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+# 默认每页条数与上限
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+
+class InvalidCursor(ValueError):
+    """
+    游标格式错误（调用方应返回 400）
+    """
+
+
+def encode_cursor(created_at, row_id):
+    """
+    生成游标
+    参数:
+        created_at: 当前页最后一行的时间
+        row_id: 当前页最后一行的ID
+    """
+    raw = f'{created_at.isoformat()}|{row_id}'.encode('ascii')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    解析游标
+    返回:
+        tuple: (时间, ID)
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('ascii')
+        created_at, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f'无效的分页游标: {cursor}') from e
+
+
+def parse_page_args(args):
+    """
+    从查询参数中读取分页参数
+    参数:
+        args: request.args（cursor 可选，limit 默认 DEFAULT_PAGE_SIZE，最大 MAX_PAGE_SIZE）
+    返回:
+        tuple: (游标 (时间, ID) 或 None, 每页条数)
+    """
+    cursor = args.get('cursor') or None
+    limit = args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    return (decode_cursor(cursor) if cursor else None), limit
+
+
+def keyset_page(query, created_col, id_col, cursor, limit, ascending=False):
+    """
+    对查询应用排序和游标条件，多取一行用于判断是否还有下一页
+    参数:
+        query: SQLAlchemy 查询
+        created_col: 排序时间列
+        id_col: 排序ID列（时间相同时的次序）
+        cursor: decode_cursor 的结果或 None
+        limit: 每页条数
+        ascending: 是否按时间正序（默认倒序，最新的在前）
+    返回:
+        list: 最多 limit + 1 行，交给 split_page 处理
+    """
+    if cursor is not None:
+        created_at, row_id = cursor
+        if ascending:
+            query = query.filter(or_(
+                created_col > created_at,
+                and_(created_col == created_at, id_col > row_id),
+            ))
+        else:
+            query = query.filter(or_(
+                created_col < created_at,
+                and_(created_col == created_at, id_col < row_id),
+            ))
+    if ascending:
+        query = query.order_by(created_col.asc(), id_col.asc())
+    else:
+        query = query.order_by(created_col.desc(), id_col.desc())
+    return query.limit(limit + 1).all()
+
+
+def split_page(rows, limit, key):
+    """
+    截取一页并生成下一页游标
+    参数:
+        rows: keyset_page 的结果
+        limit: 每页条数
+        key: 从行中取出 (时间, ID) 的函数
+    返回:
+        tuple: (本页的行, 下一页游标或 None)
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
@@ -0,0 +1,137 @@
+"""
+密码哈希模块
+密码哈希（pbkdf2 / scrypt）是刻意设计的 CPU 密集型计算，登录高峰时会占满所有 worker 的 CPU。
+这里把哈希计算和校验放到有并发上限的线程池中执行:
+
+- 同时计算的哈希数不超过 PASSWORD_HASH_WORKERS（默认等于 CPU 核数），
+  hashlib 计算期间释放 GIL，其他请求线程（列表、详情等）仍能获得 CPU
+- 排队等待的哈希任务超过 PASSWORD_HASH_MAX_PENDING 时直接抛出 HasherBusy，由接口返回 503，
+  而不是让请求线程无限期堆积
+- 哈希算法和强度由 PASSWORD_HASH_METHOD 配置（Werkzeug 格式，如 'pbkdf2:sha256:600000'、'scrypt:32768:8:1'），
+  登录成功时如果数据库中的哈希使用了其他算法或强度，会用当前配置重新计算并保存
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+# 默认哈希算法（与 Werkzeug 2.3 的默认值一致，升级配置前已有的哈希不需要重算）
+DEFAULT_METHOD = f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}'
+
+
+class HasherBusy(Exception):
+    """
+    排队的哈希任务过多（调用方应返回 503）
+    """
+
+
+def normalize_method(method):
+    """
+    将配置的算法名补全为哈希值中保存的形式（与 Werkzeug 的默认参数一致）
+    例如 'pbkdf2' -> 'pbkdf2:sha256:600000'，'scrypt' -> 'scrypt:32768:8:1'
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+        return f'scrypt:{n}:{r}:{p}'
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    raise ValueError(f'不支持的密码哈希算法: {method}')
+
+
+class PasswordHasher:
+    """
+    在有界线程池中执行密码哈希（线程安全）
+    参数:
+        method: 哈希算法（Werkzeug 格式）
+        max_workers: 同时计算的哈希数（None 表示 CPU 核数）
+        max_pending: 允许排队和计算中的任务总数上限
+        timeout: 等待结果的最长时间（秒）
+    """
+
+    def __init__(self, method=DEFAULT_METHOD, max_workers=None, max_pending=64, timeout=10):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.configure(method, max_workers, max_pending, timeout)
+
+    def configure(self, method, max_workers=None, max_pending=64, timeout=10):
+        self.method = normalize_method(method)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max(max_pending, self.max_workers)
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _get_executor(self):
+        # 线程池在第一次使用时创建；gunicorn preload 时 fork 出的 worker 不会继承父进程的线程，需要重新创建
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='password-hash')
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # 任务仍会在后台完成并释放名额，当前请求按繁忙处理
+            raise HasherBusy() from None
+
+    def hash(self, password):
+        """
+        按当前配置的算法计算密码哈希
+        """
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """
+        校验密码是否与哈希值匹配
+        """
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """
+        哈希值使用的算法或强度与当前配置不同时返回 True
+        """
+        return password_hash.split('$', 1)[0] != self.method
+
+
+password_hasher = PasswordHasher()
+
+
+def init_passwords(app):
+    """
+    在应用工厂中配置密码哈希
+    配置项:
+        PASSWORD_HASH_METHOD: 哈希算法和强度（Werkzeug 格式）
+        PASSWORD_HASH_WORKERS: 同时计算的哈希数（0 表示 CPU 核数）
+        PASSWORD_HASH_MAX_PENDING: 排队和计算中的哈希任务上限，超过时返回 503
+        PASSWORD_HASH_TIMEOUT: 等待哈希结果的最长时间（秒）
+    """
+    password_hasher.configure(
+        app.config.get('PASSWORD_HASH_METHOD') or DEFAULT_METHOD,
+        max_workers=app.config.get('PASSWORD_HASH_WORKERS') or None,
+        max_pending=app.config.get('PASSWORD_HASH_MAX_PENDING', 64),
+        timeout=app.config.get('PASSWORD_HASH_TIMEOUT', 10),
+    )
@@ -0,0 +1,389 @@
+"""
+播放事件日志模块
+前端播放器定期上报播放心跳（start / progress / complete），接口把事件打包成定长二进制记录，
+追加写入本进程的日志分段文件后立即返回，不访问数据库。
+汇总任务读取已封存的分段文件，用 NumPy 按视频聚合后批量累加到 videos 表的播放统计字段，再删除分段文件:
+    flask rollup-playback   （建议由 cron 每几分钟执行一次）
+
+记录格式（小端，每条 24 字节）:
+    ts          uint32  事件时间（UTC 秒）
+    video_id    uint32  视频ID
+    user_id     uint32  用户ID（未登录为 0）
+    kind        uint8   事件类型: 1=start, 2=progress, 3=complete
+    (3 字节填充)
+    watched_ms  uint32  距上次上报实际观看的毫秒数（单条上限 MAX_WATCHED_MS）
+    position_ms uint32  当前播放位置（毫秒）
+
+分段文件:
+    每个进程写自己的文件 playback-<pid>-<创建时间毫秒>.open，超过大小上限或时间上限后重命名为 .seg（封存）并关闭，
+    时间上限由打开分段时启动的定时器保证，空闲的 worker 不会一直占着最后一个分段；
+    汇总任务只处理 .seg 文件，以及写入进程已退出的 .open 文件。
+    写入进程在 .open 文件打开期间持有该文件的排他 flock（先在临时文件名上加锁再改名为 .open），进程退出时由内核释放；
+    汇总任务能拿到锁才说明写入进程已退出。不用 PID 判断：汇总任务可能运行在另一个 PID 命名空间（边车容器、宿主机）中，
+    看到的 PID 与 worker 不一致。
+    Windows（开发环境，没有 fcntl）不加锁: 仍被打开的文件不能改名，汇总任务改名成功即说明写入进程已关闭该文件。
+    汇总结果提交后才删除分段文件；提交成功、删除前进程崩溃时，这些分段会在下次汇总时被重复计入。
+"""
+import atexit
+import glob
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# 定长记录格式（见模块说明）
+RECORD = struct.Struct('<IIIB3xII')
+
+# 事件类型
+EVENT_TYPES = {
+    'start': 1,
+    'progress': 2,
+    'complete': 3,
+}
+
+# 单条事件计入的观看时长上限（毫秒）：前端每 15 秒上报一次，超出部分视为异常客户端上报
+MAX_WATCHED_MS = 60 * 1000
+
+# 播放位置上限（毫秒）
+MAX_POSITION_MS = 12 * 60 * 60 * 1000
+
+# 单次上报的最大事件数
+MAX_EVENTS_PER_REQUEST = 20
+
+# uint32 上限
+_UINT32_MAX = 2 ** 32 - 1
+
+
+def record_dtype():
+    """
+    与 RECORD 对应的 NumPy 结构化类型（汇总时整段文件直接映射为数组）
+    """
+    import numpy as np
+
+    return np.dtype([
+        ('ts', '<u4'),
+        ('video_id', '<u4'),
+        ('user_id', '<u4'),
+        ('kind', 'u1'),
+        ('pad', 'V3'),
+        ('watched_ms', '<u4'),
+        ('position_ms', '<u4'),
+    ])
+
+
+def _millis(value):
+    """
+    把以秒为单位的数值转换为毫秒（非法值返回 None）
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    if value != value or value < 0:  # NaN 或负数
+        return None
+    return min(int(value * 1000), _UINT32_MAX)
+
+
+def event_video_ids(events):
+    """
+    取出一批事件中格式合法的视频ID（用于校验视频是否存在且已发布）
+    """
+    ids = set()
+    for event in events:
+        if isinstance(event, dict):
+            video_id = event.get('video_id')
+            if isinstance(video_id, int) and not isinstance(video_id, bool) and 0 < video_id <= _UINT32_MAX:
+                ids.add(video_id)
+    return ids
+
+
+def pack_events(events, user_id, allowed_ids, now=None):
+    """
+    校验并打包一批播放事件
+    参数:
+        events: 事件列表，每个事件为 {video_id, type, watched(秒, 可选), position(秒, 可选)}
+        user_id: 当前用户ID（未登录为 None）
+        allowed_ids: 可以上报的视频ID集合（已发布的视频）
+        now: 事件时间（UTC 秒），默认当前时间
+    返回:
+        tuple: (打包后的字节串, 接受的事件数)，格式不合法、视频未发布的事件被忽略；
+               同一视频在一次上报中最多计入一次 start 和一次 complete，观看时长合计不超过 MAX_WATCHED_MS
+    """
+    ts = int(now if now is not None else time.time())
+    uid = user_id or 0
+    chunks = []
+    counted = set()   # 已计入的 (视频ID, start / complete)
+    watched_total = {}  # 视频ID -> 本次已计入的观看时长
+    for event in events:
+        if not isinstance(event, dict):
+            continue
+        video_id = event.get('video_id')
+        kind = EVENT_TYPES.get(event.get('type'))
+        if kind is None or video_id not in allowed_ids or isinstance(video_id, bool):
+            continue
+        watched_ms = _millis(event.get('watched', 0))
+        position_ms = _millis(event.get('position', 0))
+        if watched_ms is None or position_ms is None:
+            continue
+        if kind != EVENT_TYPES['progress']:
+            if (video_id, kind) in counted:
+                continue
+            counted.add((video_id, kind))
+        used = watched_total.get(video_id, 0)
+        watched_ms = min(watched_ms, MAX_WATCHED_MS - used)
+        watched_total[video_id] = used + watched_ms
+        chunks.append(RECORD.pack(ts, video_id, uid, kind, watched_ms, min(position_ms, MAX_POSITION_MS)))
+    return b''.join(chunks), len(chunks)
+
+
+class SegmentWriter:
+    """
+    进程内分段文件写入器（线程安全）
+    参数:
+        directory: 分段文件目录
+        max_bytes: 单个分段的大小上限，超过后封存
+        max_age: 单个分段的时间上限（秒），超过后封存
+    """
+
+    def __init__(self, directory=None, max_bytes=16 * 1024 * 1024, max_age=300):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._fd = None
+        self._path = None
+        self._pid = None
+        self._size = 0
+        self._opened_at = 0.0
+        self._timer = None
+
+    def append(self, data):
+        """
+        追加一批已打包的记录（一次 write 系统调用，O_APPEND 保证整批写在文件末尾）
+        """
+        if not data:
+            return
+        with self._lock:
+            if self._fd is not None and self._pid != os.getpid():
+                # fork 后继承了父进程的文件描述符，子进程关闭自己的副本（否则父进程退出后锁不会释放），改写自己的文件
+                try:
+                    os.close(self._fd)
+                except OSError:
+                    pass
+                self._fd = None
+            if self._fd is None:
+                self._open()
+            os.write(self._fd, data)
+            self._size += len(data)
+            if self._size >= self.max_bytes or time.monotonic() - self._opened_at >= self.max_age:
+                self._seal()
+
+    def seal(self):
+        """
+        封存当前分段（进程退出时调用）
+        """
+        with self._lock:
+            if self._fd is not None and self._pid == os.getpid():
+                self._seal()
+
+    def _seal_if_stale(self, path):
+        """
+        定时器回调：分段 path 仍在写且已超过时间上限时封存（期间已被封存或换了新分段时不处理）
+        """
+        with self._lock:
+            if self._fd is not None and self._path == path and self._pid == os.getpid():
+                self._seal()
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._pid = os.getpid()
+        name = f'playback-{self._pid}-{int(time.time() * 1000)}'
+        path = os.path.join(self.directory, name + '.open')
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND
+        if fcntl is None:
+            # Windows: 打开期间其他进程无法改名该文件
+            fd = os.open(path, flags, 0o644)
+        else:
+            # 先在汇总任务不会处理的临时文件名上加锁，再改名为 .open，汇总任务看到 .open 文件时锁一定已被持有
+            pending = os.path.join(self.directory, name + '.new')
+            fd = os.open(pending, flags, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                os.replace(pending, path)
+            except OSError:
+                os.close(fd)
+                raise
+        self._fd = fd
+        self._path = path
+        self._size = 0
+        self._opened_at = time.monotonic()
+        # 到达时间上限时即使没有新的写入也封存（守护线程，不阻止进程退出）
+        self._timer = threading.Timer(self.max_age, self._seal_if_stale, args=(path,))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _seal(self):
+        # 先清空状态：改名失败时下一次写入也会打开新的分段，不会继续使用已关闭的描述符
+        fd, path = self._fd, self._path
+        self._fd = None
+        self._path = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        try:
+            if fcntl is None:
+                # Windows 不能改名仍打开着的文件，先关闭（关闭后汇总任务可能抢先封存，此时文件已不存在）
+                os.close(fd)
+                fd = None
+                try:
+                    os.replace(path, path[:-len('.open')] + '.seg')
+                except FileNotFoundError:
+                    pass
+            else:
+                # 持有锁时改名，汇总任务不会同时处理该文件
+                os.replace(path, path[:-len('.open')] + '.seg')
+        except OSError as e:
+            print(f'播放事件分段封存失败: {e}')
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+
+segment_writer = SegmentWriter()
+
+
+def _seal_abandoned(path):
+    """
+    写入进程已退出（能拿到排他锁）时把 .open 文件封存为 .seg
+    返回:
+        bool: 是否已封存
+    """
+    sealed = path[:-len('.open')] + '.seg'
+    if fcntl is None:
+        # Windows: 写入进程仍打开着的文件改名失败
+        try:
+            os.replace(path, sealed)
+            return True
+        except OSError:
+            return False
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        # 写入进程刚好自己封存了
+        return False
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        os.replace(path, sealed)
+        return True
+    except FileNotFoundError:
+        return False
+    finally:
+        os.close(fd)
+
+
+def _collect_segments(directory):
+    """
+    列出可以汇总的分段文件：已封存的 .seg，以及写入进程已退出的 .open（先封存）
+    """
+    for path in glob.glob(os.path.join(directory, 'playback-*.open')):
+        _seal_abandoned(path)
+    return sorted(glob.glob(os.path.join(directory, 'playback-*.seg')))
+
+
+def aggregate_records(records):
+    """
+    按视频聚合播放记录
+    参数:
+        records: record_dtype() 结构化数组
+    返回:
+        list: [{video_id, plays, completes, watch_ms}]
+    """
+    import numpy as np
+
+    if len(records) == 0:
+        return []
+    video_ids, inverse = np.unique(records['video_id'], return_inverse=True)
+    kinds = records['kind']
+    plays = np.bincount(inverse, weights=(kinds == EVENT_TYPES['start']), minlength=len(video_ids))
+    completes = np.bincount(inverse, weights=(kinds == EVENT_TYPES['complete']), minlength=len(video_ids))
+    watch_ms = np.bincount(inverse, weights=records['watched_ms'].astype(np.float64), minlength=len(video_ids))
+    return [
+        {'video_id': int(vid), 'plays': int(p), 'completes': int(c), 'watch_ms': int(w)}
+        for vid, p, c, w in zip(video_ids, plays, completes, watch_ms)
+    ]
+
+
+def rollup_segments(directory):
+    """
+    汇总分段文件并累加到 videos 表（不存在的视频忽略），提交后删除已汇总的分段
+    参数:
+        directory: 分段文件目录
+    返回:
+        tuple: (分段文件数, 记录数, 视频数)
+    """
+    import numpy as np
+    from sqlalchemy import bindparam, update
+
+    from models import db, Video
+
+    paths = _collect_segments(directory)
+    if not paths:
+        return 0, 0, 0
+
+    dtype = record_dtype()
+    arrays = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = f.read()
+        # 末尾不完整的记录（写入中途进程崩溃）丢弃
+        usable = len(data) - len(data) % dtype.itemsize
+        arrays.append(np.frombuffer(data, dtype=dtype, count=usable // dtype.itemsize))
+    records = np.concatenate(arrays)
+    totals = aggregate_records(records)
+
+    if totals:
+        table = Video.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam('video_id'))
+            .values(
+                play_count=table.c.play_count + bindparam('plays'),
+                complete_count=table.c.complete_count + bindparam('completes'),
+                watch_time_ms=table.c.watch_time_ms + bindparam('watch_ms'),
+            )
+        )
+        with db.engine.begin() as conn:
+            conn.execute(stmt, totals)
+
+    for path in paths:
+        os.remove(path)
+    return len(paths), len(records), len(totals)
+
+
+def init_playback(app):
+    """
+    在应用工厂中配置分段文件写入器，进程退出时封存当前分段，并注册汇总命令:
+        flask rollup-playback
+    配置项:
+        PLAYBACK_LOG_DIR: 分段文件目录
+        PLAYBACK_SEGMENT_MAX_BYTES: 单个分段的大小上限
+        PLAYBACK_SEGMENT_MAX_SECONDS: 单个分段的时间上限（秒）
+    """
+    segment_writer.directory = app.config['PLAYBACK_LOG_DIR']
+    segment_writer.max_bytes = app.config.get('PLAYBACK_SEGMENT_MAX_BYTES', segment_writer.max_bytes)
+    segment_writer.max_age = app.config.get('PLAYBACK_SEGMENT_MAX_SECONDS', segment_writer.max_age)
+    atexit.register(segment_writer.seal)
+
+    @app.cli.command('rollup-playback')
+    def rollup_playback_command():
+        """汇总播放事件分段文件，累加到视频的观看时长和完播统计"""
+        start = time.perf_counter()
+        files, records, videos = rollup_segments(app.config['PLAYBACK_LOG_DIR'])
+        print(f'播放事件汇总完成: {files} 个分段，{records} 条记录，{videos} 个视频，'
+              f'耗时 {time.perf_counter() - start:.2f} 秒')
@@ -0,0 +1,227 @@
+"""
+数据库连接池监控模块
+记录连接池的借出/归还次数、当前借出数、溢出连接数以及获取连接的等待时间，
+供 Prometheus 指标、健康检查等功能读取。
+
+等待时间通过给连接池类派生一个计时子类实现：
+engine.dispose() 重建连接池时会沿用同一个类，因此进程 fork 后依然有效。
+"""
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+# 最近等待样本的保留数量（用于计算分位数）
+RECENT_WAIT_SAMPLES = 1024
+
+
+class PoolStats:
+    """
+    单个连接池的统计数据（进程内，线程安全）
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.timeouts = 0
+        self.checked_out = 0
+        self.overflow = 0
+        self.size = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.last_checkout_at = None
+        # (时间戳, 等待秒数)
+        self._recent_waits = deque(maxlen=RECENT_WAIT_SAMPLES)
+
+    def record_wait(self, seconds, timed_out=False):
+        """
+        记录一次获取连接的等待时间
+        """
+        now = time.time()
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self._recent_waits.append((now, seconds))
+            if timed_out:
+                self.timeouts += 1
+
+    def record_state(self, pool, checkout):
+        """
+        在借出/归还连接时刷新计数和当前状态
+        """
+        with self._lock:
+            if checkout:
+                self.checkouts += 1
+                self.last_checkout_at = time.time()
+            else:
+                self.checkins += 1
+            self.checked_out = _call(pool, 'checkedout')
+            self.overflow = max(_call(pool, 'overflow'), 0)
+            self.size = _call(pool, 'size')
+
+    def wait_percentile(self, percentile, window=60):
+        """
+        计算最近 window 秒内获取连接等待时间的分位数
+        参数:
+            percentile: 分位数 (0-100)
+            window: 统计窗口（秒）
+        返回:
+            float: 等待秒数，没有样本时返回 0
+        """
+        cutoff = time.time() - window
+        with self._lock:
+            waits = sorted(wait for ts, wait in self._recent_waits if ts >= cutoff)
+        if not waits:
+            return 0.0
+        index = min(len(waits) - 1, int(len(waits) * percentile / 100))
+        return waits[index]
+
+    def snapshot(self):
+        """
+        返回统计数据快照（字典）
+        """
+        with self._lock:
+            avg_wait = self.wait_total / self.checkouts if self.checkouts else 0.0
+            return {
+                'name': self.name,
+                'size': self.size,
+                'checked_out': self.checked_out,
+                'overflow': self.overflow,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'timeouts': self.timeouts,
+                'wait_avg_ms': round(avg_wait * 1000, 3),
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+            }
+
+
+# 引擎名 -> PoolStats
+pool_stats = {}
+
+# 等待时间订阅者：callback(name, seconds)
+_wait_listeners = []
+# 状态变化订阅者：callback(name, stats, checkout)
+_state_listeners = []
+
+
+def on_wait(callback):
+    """
+    订阅连接等待事件
+    """
+    _wait_listeners.append(callback)
+    return callback
+
+
+def on_state_change(callback):
+    """
+    订阅连接借出/归还事件
+    """
+    _state_listeners.append(callback)
+    return callback
+
+
+def _call(pool, method):
+    """
+    调用连接池的统计方法（部分连接池类型没有 overflow/size 等方法）
+    """
+    func = getattr(pool, method, None)
+    try:
+        return func() if func else 0
+    except Exception:
+        return 0
+
+
+def pool_status(engine):
+    """
+    读取连接池的实时状态
+    参数:
+        engine: SQLAlchemy 引擎
+    返回:
+        dict: 常驻连接数、最大溢出数、当前借出数、溢出数、容量和使用率
+              （不限制容量的连接池 capacity 和 saturation 为 None）
+    """
+    pool = engine.pool
+    size = _call(pool, 'size')
+    max_overflow = getattr(pool, '_max_overflow', None)
+    checked_out = _call(pool, 'checkedout')
+    capacity = None
+    if size and max_overflow is not None and max_overflow >= 0:
+        capacity = size + max_overflow
+    return {
+        'pool_class': type(pool).__name__.replace('Timed', '', 1),
+        'size': size,
+        'max_overflow': max_overflow,
+        'checked_out': checked_out,
+        'overflow': max(_call(pool, 'overflow'), 0),
+        'capacity': capacity,
+        'saturation': round(checked_out / capacity, 3) if capacity else None,
+    }
+
+
+_timed_classes = {}
+
+
+def _timed_pool_class(pool_class, stats):
+    """
+    为连接池类派生一个在 _do_get 中计时的子类
+    """
+    key = (pool_class, stats.name)
+    if key in _timed_classes:
+        return _timed_classes[key]
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = pool_class._do_get(self)
+        except PoolTimeoutError:
+            _notify_wait(stats, time.perf_counter() - start, timed_out=True)
+            raise
+        _notify_wait(stats, time.perf_counter() - start)
+        return conn
+
+    timed_class = type(f'Timed{pool_class.__name__}', (pool_class,), {
+        '_do_get': _do_get,
+        '_univideo_timed': True,
+    })
+    _timed_classes[key] = timed_class
+    return timed_class
+
+
+def _notify_wait(stats, seconds, timed_out=False):
+    stats.record_wait(seconds, timed_out)
+    for callback in _wait_listeners:
+        callback(stats.name, seconds)
+
+
+def instrument_engine(engine, name='default'):
+    """
+    为引擎的连接池挂载监控（重复调用不会重复挂载）
+    参数:
+        engine: SQLAlchemy 引擎
+        name: 引擎名称（默认库为 'default'，其他为 bind 名称）
+    返回:
+        PoolStats: 该连接池的统计对象
+    """
+    if name in pool_stats and getattr(engine.pool, '_univideo_timed', False):
+        return pool_stats[name]
+
+    stats = pool_stats.setdefault(name, PoolStats(name))
+    engine.pool.__class__ = _timed_pool_class(type(engine.pool), stats)
+
+    @event.listens_for(engine, 'checkout')
+    def _on_checkout(dbapi_conn, conn_record, conn_proxy):
+        stats.record_state(engine.pool, checkout=True)
+        for callback in _state_listeners:
+            callback(name, stats, True)
+
+    @event.listens_for(engine, 'checkin')
+    def _on_checkin(dbapi_conn, conn_record):
+        stats.record_state(engine.pool, checkout=False)
+        for callback in _state_listeners:
+            callback(name, stats, False)
+
+    return stats
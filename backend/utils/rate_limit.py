@@ -0,0 +1,304 @@
+"""
+准入控制模块
+在请求进入业务逻辑之前拒绝超出承载能力的请求，保护数据库连接池和磁盘:
+
+- 限流：令牌桶算法，按接口配置额度（如 '20/minute'）。登录用户按用户ID计数；未登录请求按IP计数。
+  登录用户另有一个按IP共享的兜底额度（接口额度 × RATE_LIMIT_IP_MULTIPLIER），
+  校园网 NAT、代理后的用户各自使用自己的额度，只有同一IP的总量异常时才会被限制；任一耗尽即返回 429。
+  多个桶原子地一起判断：全部有剩余才同时扣减，被拒绝的请求不消耗任何一个桶的额度
+- 上传并发上限：同时处理的视频上传请求数超过上限时返回 503（在读取请求体之前判断）
+- 过载保护：最近一段时间获取数据库连接的等待时间 p95 超过阈值时，除健康检查外的请求直接返回 503
+
+429/503 响应都带有 Retry-After 头。
+令牌桶默认保存在进程内（每个 worker 独立计数）；配置 RATE_LIMIT_STORE 为文件路径时
+使用本机共享的 SQLite 文件，同一台机器上的多个 worker 共享额度。
+
+注意：按 IP 限流依赖 request.remote_addr，部署在反向代理之后时需要用 ProxyFix 还原真实客户端IP。
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from flask import g, jsonify, request
+
+from utils import pool_monitor
+from utils.metrics import record_rejection
+from utils.auth import token_identity
+
+# 时间单位（秒）
+PERIODS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+}
+
+# 不参与过载保护的接口（健康检查、监控需要在过载时仍然可用）
+SHED_EXEMPT_ENDPOINTS = frozenset((
+    'health.health_check',
+    'health.liveness',
+    'health.readiness',
+    'health.pool_statistics',
+    'metrics',
+    'static',
+))
+
+
+def parse_limit(value):
+    """
+    解析限流额度
+    参数:
+        value: 形如 '20/minute' 的字符串
+    返回:
+        tuple: (桶容量, 每秒补充的令牌数)
+    """
+    count, _, period = value.partition('/')
+    count = int(count)
+    seconds = PERIODS.get(period.strip().rstrip('s'))
+    if count <= 0 or seconds is None:
+        raise ValueError(f'无效的限流额度: {value}')
+    return count, count / seconds
+
+
+def _refill(tokens, updated, capacity, rate, now):
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+def _take_all(levels, buckets, cost):
+    """
+    根据各桶补充后的令牌数判断是否放行，全部足够时才扣减
+    参数:
+        levels: 与 buckets 对齐的令牌数列表（原地扣减）
+        buckets: [(key, 容量, 每秒补充数)]
+    返回:
+        tuple: (是否允许, 需要等待的秒数)
+    """
+    waits = [(cost - tokens) / rate for tokens, (_, _, rate) in zip(levels, buckets) if tokens < cost]
+    if waits:
+        return False, max(waits)
+    for i in range(len(levels)):
+        levels[i] -= cost
+    return True, 0.0
+
+
+class MemoryBucketStore:
+    """
+    进程内令牌桶存储（线程安全）
+    """
+
+    def __init__(self, maxsize=100000):
+        self._lock = threading.Lock()
+        # key -> (令牌数, 更新时间)
+        self._buckets = {}
+        self.maxsize = maxsize
+
+    def take(self, key, capacity, rate, cost=1):
+        """
+        尝试从桶中取出 cost 个令牌
+        返回:
+            tuple: (是否允许, 需要等待的秒数)
+        """
+        return self.take_all([(key, capacity, rate)], cost)
+
+    def take_all(self, buckets, cost=1):
+        """
+        尝试从每个桶中各取出 cost 个令牌：全部足够时才同时扣减，否则都不扣减
+        参数:
+            buckets: [(key, 容量, 每秒补充数)]
+        返回:
+            tuple: (是否允许, 需要等待的秒数（取各个不足的桶中最长的）)
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            for key, capacity, rate in buckets:
+                tokens, updated = self._buckets.get(key, (capacity, now))
+                levels.append(_refill(tokens, updated, capacity, rate, now))
+            result = _take_all(levels, buckets, cost)
+            for (key, _, _), tokens in zip(buckets, levels):
+                self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.maxsize:
+                self._prune(now)
+        return result
+
+    def _prune(self, now):
+        # 超过一小时未访问的桶早已补满，删除后不影响结果
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < 3600}
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SqliteBucketStore:
+    """
+    基于本地 SQLite 文件的令牌桶存储，同一台机器上的多个进程共享额度
+    每个线程使用独立连接，BEGIN IMMEDIATE 保证读-改-写的原子性
+    """
+
+    def __init__(self, path, busy_timeout=1.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._calls = 0
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS rate_buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def take(self, key, capacity, rate, cost=1):
+        return self.take_all([(key, capacity, rate)], cost)
+
+    def take_all(self, buckets, cost=1):
+        now = time.time()
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            levels = []
+            for key, capacity, rate in buckets:
+                row = conn.execute('SELECT tokens, updated FROM rate_buckets WHERE key = ?', (key,)).fetchone()
+                levels.append(_refill(row[0], row[1], capacity, rate, now) if row else capacity)
+            result = _take_all(levels, buckets, cost)
+            conn.executemany(
+                'INSERT INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+                [(key, tokens, now) for (key, _, _), tokens in zip(buckets, levels)],
+            )
+            self._calls += 1
+            if self._calls % 10000 == 0:
+                conn.execute('DELETE FROM rate_buckets WHERE updated < ?', (now - 3600,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return result
+
+    def clear(self):
+        self._conn().execute('DELETE FROM rate_buckets')
+
+
+def create_store(location):
+    """
+    按配置创建令牌桶存储
+    参数:
+        location: 'memory' 或 SQLite 文件路径
+    """
+    if not location or location == 'memory':
+        return MemoryBucketStore()
+    os.makedirs(os.path.dirname(os.path.abspath(location)), exist_ok=True)
+    return SqliteBucketStore(location)
+
+
+class PoolWaitSampler:
+    """
+    缓存连接池等待时间分位数（每个请求都排序等待样本开销过大，按间隔重新计算）
+    """
+
+    def __init__(self, refresh_interval=1.0):
+        self.refresh_interval = refresh_interval
+        self._value = 0.0
+        self._computed_at = 0.0
+
+    def p95_ms(self, window):
+        now = time.monotonic()
+        if now - self._computed_at >= self.refresh_interval:
+            stats = pool_monitor.pool_stats.get('default')
+            self._value = stats.wait_percentile(95, window=window) * 1000 if stats else 0.0
+            self._computed_at = now
+        return self._value
+
+
+def _reject(status, msg, retry_after, endpoint, reason):
+    record_rejection(endpoint, reason)
+    response = jsonify({
+        'code': status,
+        'msg': msg
+    })
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def init_rate_limit(app):
+    """
+    在应用工厂中启用准入控制
+    配置项:
+        RATE_LIMIT_ENABLED: 是否启用限流
+        RATE_LIMITS: 接口 -> 额度（如 {'interaction.create_comment': '20/minute'}）
+        RATE_LIMIT_IP_MULTIPLIER: 登录用户按IP共享的兜底额度是接口额度的倍数
+        RATE_LIMIT_STORE: 'memory'（默认）或本地 SQLite 文件路径
+        UPLOAD_MAX_CONCURRENT: 每个进程同时处理的视频上传数上限（0 表示不限制）
+        LOAD_SHED_ENABLED: 是否启用过载保护
+        LOAD_SHED_POOL_WAIT_MS: 连接等待 p95 超过该值（毫秒）时开始拒绝请求
+        LOAD_SHED_WINDOW: 计算等待时间 p95 的统计窗口（秒）
+        LOAD_SHED_RETRY_AFTER: 过载时建议客户端的重试间隔（秒）
+    """
+    limits = {endpoint: parse_limit(value) for endpoint, value in (app.config.get('RATE_LIMITS') or {}).items()}
+    store = create_store(app.config.get('RATE_LIMIT_STORE'))
+    max_uploads = app.config.get('UPLOAD_MAX_CONCURRENT', 0)
+    upload_slots = threading.BoundedSemaphore(max_uploads) if max_uploads > 0 else None
+    wait_sampler = PoolWaitSampler()
+    app.extensions['rate_limit_store'] = store
+
+    @app.before_request
+    def admission_control():
+        endpoint = request.endpoint
+        if endpoint is None:
+            return None
+
+        # 1. 过载保护：数据库连接等待时间过长时，新请求只会继续加剧排队
+        if app.config.get('LOAD_SHED_ENABLED') and endpoint not in SHED_EXEMPT_ENDPOINTS:
+            wait_ms = wait_sampler.p95_ms(app.config.get('LOAD_SHED_WINDOW', 10))
+            if wait_ms > app.config.get('LOAD_SHED_POOL_WAIT_MS', 500):
+                return _reject(503, '服务器繁忙，请稍后再试',
+                               app.config.get('LOAD_SHED_RETRY_AFTER', 2), endpoint, 'load_shed')
+
+        # 2. 限流：登录用户按用户ID（另有按IP共享的兜底额度），未登录按IP
+        limit = limits.get(endpoint)
+        if limit is not None and app.config.get('RATE_LIMIT_ENABLED'):
+            capacity, rate = limit
+            user_id = token_identity()
+            if user_id is None:
+                buckets = [(f'ip:{request.remote_addr}', capacity, rate)]
+            else:
+                multiplier = app.config.get('RATE_LIMIT_IP_MULTIPLIER', 10)
+                buckets = [
+                    (f'user:{user_id}', capacity, rate),
+                    (f'ip-shared:{request.remote_addr}', capacity * multiplier, rate * multiplier),
+                ]
+            try:
+                # 各桶一起判断：被共享桶拒绝的请求不会消耗用户自己的额度
+                allowed, retry_after = store.take_all(
+                    [(f'{endpoint}:{key}', bucket_capacity, bucket_rate)
+                     for key, bucket_capacity, bucket_rate in buckets]
+                )
+            except sqlite3.Error as e:
+                # 共享存储不可用时放行，避免限流组件故障导致服务不可用
+                app.logger.warning('限流存储不可用: %s', e)
+                allowed = True
+            if not allowed:
+                return _reject(429, '请求过于频繁，请稍后再试', retry_after, endpoint, 'rate_limit')
+
+        # 3. 视频上传并发上限（before_request 时尚未读取请求体）
+        if upload_slots is not None and endpoint == 'video.upload_video':
+            if not upload_slots.acquire(blocking=False):
+                return _reject(503, '当前上传人数较多，请稍后再试', 5, endpoint, 'upload_busy')
+            g._upload_slot = True
+        return None
+
+    @app.teardown_request
+    def release_upload_slot(exc):
+        if g.pop('_upload_slot', False):
+            upload_slots.release()
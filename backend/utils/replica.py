@@ -0,0 +1,235 @@
+"""
+读写分离模块
+配置 DATABASE_REPLICA_URL 后，SQLALCHEMY_BINDS 中会增加名为 'replica' 的从库引擎，
+使用 @read_only 装饰的只读 GET 接口的查询由 RoutingSession 路由到从库，其余请求和所有写操作仍走主库。
+
+- 读己之写：客户端（登录用户按用户ID，未登录时按IP）发生写请求后的 REPLICA_STICKY_SECONDS 秒内，
+  其只读请求仍走主库，避免因主从复制延迟读不到自己刚写入的数据。
+  登录用户不按IP记录：同一出口IP（校园网 NAT、代理）后的其他用户不会因此被固定到主库
+  该记录保存在进程内，同时写入 Cookie，使同源部署时多个 worker 之间也能生效
+- 故障回退：从库执行出错时标记为不可用并用主库重试当前请求，
+  之后 REPLICA_RETRY_SECONDS 秒内所有只读请求直接走主库，到期后探测从库恢复情况
+
+本地可以用两个 SQLite 文件验证（复制主库文件作为从库）:
+    DATABASE_URL=sqlite:////tmp/primary.db DATABASE_REPLICA_URL=sqlite:////tmp/replica.db
+"""
+import functools
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.sql.dml import UpdateBase
+
+from utils.auth import token_identity
+
+# 从库的 bind 名称
+REPLICA_BIND = 'replica'
+# 读己之写 Cookie 名称（值为粘滞到期的 Unix 时间戳）
+STICKY_COOKIE = 'univideo_primary_until'
+# 写请求的 HTTP 方法
+WRITE_METHODS = frozenset(('POST', 'PUT', 'PATCH', 'DELETE'))
+
+
+class RoutingSession(Session):
+    """
+    按请求路由的会话：只读请求的查询走从库，flush 和 INSERT/UPDATE/DELETE 语句始终走主库
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not isinstance(clause, UpdateBase) \
+                and has_request_context() and g.get('_db_route') == REPLICA_BIND:
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaHealth:
+    """
+    从库健康状态（进程内）
+    出错后标记为不可用，retry_interval 秒后才再次探测，探测期间其他线程直接走主库
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.healthy = True
+        self.failed_at = 0.0
+        self.last_error = None
+
+    def mark_failed(self, error):
+        """
+        标记从库不可用
+        """
+        self.healthy = False
+        self.failed_at = time.time()
+        self.last_error = str(error)
+
+    def available(self, engine, retry_interval):
+        """
+        判断从库是否可用（不可用且已过重试间隔时执行一次探测）
+        """
+        if self.healthy:
+            return True
+        if time.time() - self.failed_at < retry_interval:
+            return False
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            with engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+            self.healthy = True
+            self.last_error = None
+        except Exception as e:
+            self.mark_failed(e)
+        finally:
+            self._lock.release()
+        return self.healthy
+
+    def snapshot(self):
+        return {
+            'healthy': self.healthy,
+            'failed_at': self.failed_at or None,
+            'last_error': self.last_error,
+        }
+
+
+replica_health = ReplicaHealth()
+
+
+class StickyClients:
+    """
+    记录最近发生过写操作的客户端（进程内，超出容量时淘汰最早到期的条目）
+    """
+
+    def __init__(self, maxsize=10000):
+        self._lock = threading.Lock()
+        self._until = {}
+        self.maxsize = maxsize
+
+    def mark(self, key, seconds):
+        until = time.time() + seconds
+        with self._lock:
+            self._until[key] = until
+            if len(self._until) > self.maxsize:
+                now = time.time()
+                self._until = {k: v for k, v in self._until.items() if v > now}
+                while len(self._until) > self.maxsize:
+                    self._until.pop(min(self._until, key=self._until.get))
+        return until
+
+    def is_sticky(self, key):
+        with self._lock:
+            until = self._until.get(key)
+        return until is not None and until > time.time()
+
+
+sticky_clients = StickyClients()
+
+
+def client_key():
+    """
+    识别当前客户端：有访问令牌时为用户ID，否则为 IP 地址
+    只解析请求头，不读取请求体（大文件上传在限流判断时尚未读取）
+    """
+    user_id = token_identity()
+    if user_id is not None:
+        return f'user:{user_id}'
+    return f'ip:{request.remote_addr}'
+
+
+def _sticky():
+    """
+    当前客户端是否处于写后粘滞窗口内（进程内记录或 Cookie）
+    """
+    if sticky_clients.is_sticky(client_key()):
+        return True
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def choose_route():
+    """
+    为当前只读请求选择数据库：从库未配置、不可用或客户端处于粘滞窗口内时走主库
+    返回:
+        str: 'replica' 或 'primary'
+    """
+    from models import db
+
+    engine = db.engines.get(REPLICA_BIND)
+    if engine is None:
+        return 'primary'
+    if not replica_health.available(engine, current_app.config.get('REPLICA_RETRY_SECONDS', 30)):
+        return 'primary'
+    if _sticky():
+        return 'primary'
+    return REPLICA_BIND
+
+
+def read_only(view):
+    """
+    只读接口装饰器：请求内的查询路由到从库
+    从库执行出错时回滚会话，并用主库重新执行一次接口
+    （接口内部会捕获异常并返回 500，因此根据请求标记判断是否需要重试）
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        from models import db
+
+        g._db_route = choose_route()
+        if g._db_route != REPLICA_BIND:
+            return view(*args, **kwargs)
+        try:
+            rv = view(*args, **kwargs)
+        except Exception:
+            if not g.get('_replica_failed'):
+                raise
+            rv = None
+        if g.pop('_replica_failed', False):
+            db.session.rollback()
+            g._db_route = 'primary'
+            rv = view(*args, **kwargs)
+        return rv
+    return wrapper
+
+
+def _on_replica_error(context):
+    """
+    从库引擎出错时的回调：标记从库不可用，并通知 read_only 在主库重试
+    """
+    replica_health.mark_failed(context.original_exception)
+    if has_request_context():
+        g._replica_failed = True
+
+
+def init_replica(app):
+    """
+    在应用工厂中启用读写分离（未配置从库时只注册空操作）
+    配置项:
+        SQLALCHEMY_BINDS['replica']: 从库连接URI（由 DATABASE_REPLICA_URL 生成）
+        REPLICA_STICKY_SECONDS: 写操作后该客户端读主库的时间（秒）
+        REPLICA_RETRY_SECONDS: 从库出错后重新探测的间隔（秒）
+    """
+    from models import db
+
+    with app.app_context():
+        engine = db.engines.get(REPLICA_BIND)
+    if engine is None:
+        return
+    if not event.contains(engine, 'handle_error', _on_replica_error):
+        event.listen(engine, 'handle_error', _on_replica_error)
+
+    @app.after_request
+    def track_replica_route(response):
+        sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', 5)
+        if request.method in WRITE_METHODS and response.status_code < 400 and sticky_seconds > 0:
+            until = sticky_clients.mark(client_key(), sticky_seconds)
+            response.set_cookie(STICKY_COOKIE, str(int(until) + 1), max_age=sticky_seconds,
+                                httponly=True, samesite='Lax')
+        route = g.get('_db_route')
+        if route is not None:
+            response.headers['X-DB-Route'] = route
+        return response
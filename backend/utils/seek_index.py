@@ -0,0 +1,458 @@
+"""
+视频关键帧索引模块
+在上传时解析 MP4/MOV 文件的 moov 元数据，预先计算 "关键帧时间 → 文件字节偏移" 映射，
+并以紧凑的二进制 sidecar 文件保存，供播放器拖动进度条和 Range 请求直接定位字节位置。
+
+sidecar 文件格式（小端序）:
+    文件头: magic(4s) + version(H) + record_size(H) + count(I)，共 12 字节
+    记录:   time_ms(I) + offset(Q)，每条 12 字节，按时间升序排列
+
+time_ms 是关键帧的显示时间（与播放器进度条一致）: 解码时间 + ctts 合成偏移，再按 elst 编辑列表平移
+（开头的空编辑向后推迟，第一个正常编辑的 media_time 向前裁掉）。
+只处理编辑列表开头的空编辑和第一个正常编辑，多段剪辑（中间跳过片段、变速）的文件按第一段的平移量近似。
+
+解析只信任 box 自身的长度: 表的条目数超出 box、样本数超过 MAX_SAMPLES 等异常文件一律抛出 SeekIndexError，
+解析时间与样本数成正比且有上限。构建失败时在 sidecar 旁写入失败标记（内容为失败原因），
+之后的请求直接返回该原因，不再重复解析同一个文件。
+"""
+import os
+import struct
+import tempfile
+
+# sidecar 文件头和记录的二进制格式
+HEADER_FORMAT = '<4sHHI'
+RECORD_FORMAT = '<IQ'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+MAGIC = b'USIX'
+VERSION = 1
+
+# sidecar 文件扩展名（与视频文件放在同一目录）
+SIDECAR_SUFFIX = '.seek'
+# 构建失败标记的扩展名（追加在 sidecar 路径之后）
+FAILED_SUFFIX = '.failed'
+
+# 支持解析的容器格式（ISO BMFF 家族）
+SUPPORTED_EXTENSIONS = {'mp4', 'mov'}
+
+# 没有 stss 表（每一帧都是关键帧）时，两条索引记录之间的最小时间间隔（毫秒）
+MIN_INTERVAL_WITHOUT_STSS = 1000
+
+# 样本数上限（60fps 约 9 小时），超过时视为异常文件，避免上传请求和按需补建长时间占用 worker
+MAX_SAMPLES = 2000000
+
+# moov box 的最大读取长度
+MAX_MOOV_SIZE = 64 * 1024 * 1024
+
+# 这些容器 box 只包含子 box，需要递归进入
+_CONTAINER_BOXES = {b'moov', b'trak', b'edts', b'mdia', b'minf', b'stbl'}
+
+
+class SeekIndexError(Exception):
+    """
+    关键帧索引构建失败（文件不是合法的 MP4 或缺少必要的 box）
+    """
+
+
+def sidecar_path(video_file_path):
+    """
+    获取视频文件对应的 sidecar 索引文件路径
+    参数:
+        video_file_path: 视频文件路径（绝对路径或相对 UPLOAD_FOLDER 的路径）
+    返回:
+        str: sidecar 文件路径
+    """
+    return video_file_path + SIDECAR_SUFFIX
+
+
+def failure_path(video_file_path):
+    """
+    获取视频文件对应的构建失败标记路径
+    """
+    return sidecar_path(video_file_path) + FAILED_SUFFIX
+
+
+def read_failure(video_file_path):
+    """
+    读取之前构建失败时记录的原因
+    返回:
+        str | None: 失败原因，没有失败记录时返回 None
+    """
+    try:
+        with open(failure_path(video_file_path), 'rb') as f:
+            return f.read().decode('utf-8', 'replace')
+    except FileNotFoundError:
+        return None
+
+
+def is_supported(filename):
+    """
+    检查文件格式是否支持构建关键帧索引
+    """
+    return os.path.splitext(filename)[1].lower().lstrip('.') in SUPPORTED_EXTENSIONS
+
+
+def _iter_boxes(data, start=0, end=None):
+    """
+    遍历一段字节数据中的 box，返回 (类型, 内容起始位置, 内容结束位置)
+    """
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack_from('>I4s', data, pos)
+        header = 8
+        if size == 1:
+            # 64 位扩展长度
+            if pos + 16 > end:
+                raise SeekIndexError(f'box {box_type!r} 长度非法')
+            size = struct.unpack_from('>Q', data, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            # 长度为 0 表示一直延续到末尾
+            size = end - pos
+        if size < header or pos + size > end:
+            raise SeekIndexError(f'box {box_type!r} 长度非法')
+        yield box_type, pos + header, pos + size
+        pos += size
+
+
+def _read_moov(f):
+    """
+    在文件顶层 box 中查找 moov 并读入内存（moov 可能位于文件末尾，通过 seek 跳过 mdat）
+    """
+    file_size = os.fstat(f.fileno()).st_size
+    pos = 0
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        header = f.read(16)
+        size, box_type = struct.unpack_from('>I4s', header, 0)
+        header_len = 8
+        if size == 1:
+            if len(header) < 16:
+                raise SeekIndexError('顶层 box 长度非法')
+            size = struct.unpack_from('>Q', header, 8)[0]
+            header_len = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header_len:
+            raise SeekIndexError('顶层 box 长度非法')
+        if box_type == b'moov':
+            if pos + size > file_size:
+                raise SeekIndexError('moov box 不完整')
+            if size - header_len > MAX_MOOV_SIZE:
+                raise SeekIndexError('moov box 过大')
+            f.seek(pos + header_len)
+            return f.read(size - header_len)
+        pos += size
+    raise SeekIndexError('未找到 moov box（可能是分片 MP4 或文件不完整）')
+
+
+def _find_video_track(moov):
+    """
+    在 moov 中找到第一个视频轨道，返回 {box类型: (内容起始, 内容结束)}
+    """
+    for box_type, start, end in _iter_boxes(moov):
+        if box_type != b'trak':
+            continue
+        boxes = {}
+        _collect_boxes(moov, start, end, boxes)
+        hdlr = boxes.get(b'hdlr')
+        # hdlr 内容: version/flags(4) + pre_defined(4) + handler_type(4)
+        if hdlr and hdlr[0] + 12 <= hdlr[1] and moov[hdlr[0] + 8:hdlr[0] + 12] == b'vide':
+            return boxes
+    raise SeekIndexError('未找到视频轨道')
+
+
+def _collect_boxes(data, start, end, boxes):
+    """
+    递归收集轨道内的 box 位置（同类型只保留第一个）
+    """
+    for box_type, box_start, box_end in _iter_boxes(data, start, end):
+        if box_type in _CONTAINER_BOXES:
+            _collect_boxes(data, box_start, box_end, boxes)
+        else:
+            boxes.setdefault(box_type, (box_start, box_end))
+
+
+def _box_version(data, start, end):
+    """
+    读取 full box 的 version 字段
+    """
+    if start >= end:
+        raise SeekIndexError('box 内容为空')
+    return data[start]
+
+
+def _parse_timescale(data, start, end):
+    """
+    解析 mdhd / mvhd 中的时间刻度（每秒的时间单位数，两者布局相同）
+    """
+    offset = 20 if _box_version(data, start, end) == 1 else 12
+    if start + offset + 4 > end:
+        raise SeekIndexError('mdhd/mvhd box 长度不足')
+    return struct.unpack_from('>I', data, start + offset)[0]
+
+
+def _parse_entries(data, start, end, fmt):
+    """
+    解析 "version/flags + entry_count + 定长条目" 结构的表（stts/stss/stsc/stco/co64/ctts/elst）
+    声明的条目数超出 box 长度时抛出 SeekIndexError
+    """
+    if start + 8 > end:
+        raise SeekIndexError('表头长度不足')
+    count = struct.unpack_from('>I', data, start + 4)[0]
+    entry_size = struct.calcsize(fmt)
+    if count > (end - start - 8) // entry_size:
+        raise SeekIndexError('表的条目数超出 box 长度')
+    return list(struct.iter_unpack(fmt, data[start + 8:start + 8 + count * entry_size]))
+
+
+def _parse_composition_offsets(data, start, end):
+    """
+    解析 ctts 表，返回 [(样本数, 合成偏移)]（version 1 的偏移为有符号数）
+    """
+    fmt = '>Ii' if _box_version(data, start, end) == 1 else '>II'
+    return _parse_entries(data, start, end, fmt)
+
+
+def _parse_edit_shift(data, start, end, movie_timescale, timescale):
+    """
+    解析 elst 表，返回显示时间的平移量（媒体时间单位）:
+    开头空编辑（media_time = -1）的时长换算后为正，第一个正常编辑的 media_time 为负
+    """
+    fmt = '>QqI' if _box_version(data, start, end) == 1 else '>IiI'
+    shift = 0
+    for segment_duration, media_time, _ in _parse_entries(data, start, end, fmt):
+        if media_time == -1:
+            if movie_timescale:
+                shift += segment_duration * timescale // movie_timescale
+            continue
+        return shift - media_time
+    return shift
+
+
+def _parse_sample_sizes(data, start, end):
+    """
+    解析 stsz 表，返回 (统一大小, 样本数, 各样本大小列表)
+    样本数超过 MAX_SAMPLES 或超出 box 长度时抛出 SeekIndexError
+    """
+    if start + 12 > end:
+        raise SeekIndexError('stsz 表头长度不足')
+    sample_size, count = struct.unpack_from('>II', data, start + 4)
+    if count > MAX_SAMPLES:
+        raise SeekIndexError(f'样本数 {count} 超过上限 {MAX_SAMPLES}')
+    if sample_size:
+        return sample_size, count, None
+    if count > (end - start - 12) // 4:
+        raise SeekIndexError('stsz 的样本数超出 box 长度')
+    sizes = struct.unpack_from(f'>{count}I', data, start + 12)
+    return 0, count, sizes
+
+
+def build_seek_index(video_file_path):
+    """
+    解析视频文件，生成关键帧 (time_ms, byte_offset) 列表
+    参数:
+        video_file_path: 视频文件绝对路径
+    返回:
+        list[tuple[int, int]]: 按时间升序排列的 (毫秒, 字节偏移) 列表
+    """
+    try:
+        with open(video_file_path, 'rb') as f:
+            moov = _read_moov(f)
+        return _build_from_moov(moov)
+    except (struct.error, IndexError, ValueError, OverflowError) as e:
+        # 各解析函数已按 box 长度校验，这里兜底其余的截断 / 畸形数据
+        raise SeekIndexError(f'文件结构异常: {e}') from e
+
+
+def _build_from_moov(moov):
+    """
+    根据 moov 内容生成关键帧 (time_ms, byte_offset) 列表
+    """
+    boxes = _find_video_track(moov)
+    movie_timescale = 0
+    for box_type, start, end in _iter_boxes(moov):
+        if box_type == b'mvhd':
+            movie_timescale = _parse_timescale(moov, start, end)
+            break
+    for required in (b'mdhd', b'stts', b'stsc', b'stsz'):
+        if required not in boxes:
+            raise SeekIndexError(f'视频轨道缺少 {required.decode()} box')
+
+    timescale = _parse_timescale(moov, *boxes[b'mdhd'])
+    if not timescale:
+        raise SeekIndexError('mdhd 时间刻度为 0')
+
+    stts = _parse_entries(moov, *boxes[b'stts'], '>II')
+    stsc = _parse_entries(moov, *boxes[b'stsc'], '>III')
+    if b'stco' in boxes:
+        chunk_offsets = [entry[0] for entry in _parse_entries(moov, *boxes[b'stco'], '>I')]
+    elif b'co64' in boxes:
+        chunk_offsets = [entry[0] for entry in _parse_entries(moov, *boxes[b'co64'], '>Q')]
+    else:
+        raise SeekIndexError('视频轨道缺少 stco/co64 box')
+    uniform_size, sample_count, sample_sizes = _parse_sample_sizes(moov, *boxes[b'stsz'])
+    # 每个 chunk 至少包含一个样本
+    if len(chunk_offsets) > sample_count:
+        raise SeekIndexError('chunk 数多于样本数')
+    ctts = _parse_composition_offsets(moov, *boxes[b'ctts']) if b'ctts' in boxes else []
+    shift = _parse_edit_shift(moov, *boxes[b'elst'], movie_timescale, timescale) if b'elst' in boxes else 0
+
+    # 关键帧样本序号（从 1 开始）；没有 stss 表时所有样本都是关键帧
+    sync_samples = None
+    if b'stss' in boxes:
+        sync_samples = [entry[0] for entry in _parse_entries(moov, *boxes[b'stss'], '>I')]
+        sync_set = set(sync_samples)
+
+    if not stsc:
+        raise SeekIndexError('stsc 表为空')
+
+    index = []
+    last_time_ms = None
+    stsc_pos = 0
+
+    # stts 游标：当前样本的解码时间
+    stts_pos, stts_left, decode_time = 0, stts[0][0] if stts else 0, 0
+    # ctts 游标：当前样本的合成偏移
+    ctts_pos, ctts_left = 0, ctts[0][0] if ctts else 0
+    sample_number = 1
+
+    # 按 chunk 顺序遍历所有样本，同时推进 stts 解码时间（最多遍历 stsz 声明的样本数）
+    for chunk_idx, chunk_offset in enumerate(chunk_offsets, start=1):
+        if sample_number > sample_count:
+            break
+        # 找到该 chunk 适用的 stsc 条目（first_chunk 不大于当前 chunk 的最后一条）
+        while stsc_pos + 1 < len(stsc) and stsc[stsc_pos + 1][0] <= chunk_idx:
+            stsc_pos += 1
+        samples_per_chunk = min(stsc[stsc_pos][1], sample_count - sample_number + 1)
+
+        offset = chunk_offset
+        for _ in range(samples_per_chunk):
+            is_sync = sample_number in sync_set if sync_samples is not None else True
+            if is_sync:
+                composition_offset = ctts[ctts_pos][1] if ctts_pos < len(ctts) else 0
+                time_ms = max(decode_time + composition_offset + shift, 0) * 1000 // timescale
+                if sync_samples is not None or last_time_ms is None or \
+                        time_ms - last_time_ms >= MIN_INTERVAL_WITHOUT_STSS:
+                    # sidecar 记录为 uint32 毫秒 + uint64 偏移
+                    if time_ms > 0xFFFFFFFF or offset > 0xFFFFFFFFFFFFFFFF:
+                        raise SeekIndexError('关键帧时间或偏移超出范围')
+                    index.append((time_ms, offset))
+                    last_time_ms = time_ms
+
+            offset += uniform_size or sample_sizes[sample_number - 1]
+            sample_number += 1
+
+            # 推进解码时间
+            if stts_pos < len(stts):
+                decode_time += stts[stts_pos][1]
+                stts_left -= 1
+                if stts_left == 0:
+                    stts_pos += 1
+                    if stts_pos < len(stts):
+                        stts_left = stts[stts_pos][0]
+            if ctts_pos < len(ctts):
+                ctts_left -= 1
+                if ctts_left <= 0:
+                    ctts_pos += 1
+                    if ctts_pos < len(ctts):
+                        ctts_left = ctts[ctts_pos][0]
+    # 关键帧的显示时间通常随解码顺序递增，排序只是防御异常文件
+    return sorted(index)
+
+
+def pack_seek_index(entries):
+    """
+    将 (time_ms, offset) 列表打包为 sidecar 二进制数据
+    """
+    parts = [struct.pack(HEADER_FORMAT, MAGIC, VERSION, RECORD_SIZE, len(entries))]
+    parts.extend(struct.pack(RECORD_FORMAT, time_ms, offset) for time_ms, offset in entries)
+    return b''.join(parts)
+
+
+def unpack_seek_index(data):
+    """
+    将 sidecar 二进制数据解析为 (time_ms, offset) 列表
+    """
+    count = _validate(data)
+    return list(struct.iter_unpack(RECORD_FORMAT, data[HEADER_SIZE:HEADER_SIZE + count * RECORD_SIZE]))
+
+
+def _validate(data):
+    """
+    校验 sidecar 文件头，返回记录条数
+    """
+    if len(data) < HEADER_SIZE:
+        raise SeekIndexError('索引文件过短')
+    magic, version, record_size, count = struct.unpack_from(HEADER_FORMAT, data, 0)
+    if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+        raise SeekIndexError('索引文件格式不匹配')
+    if len(data) < HEADER_SIZE + count * RECORD_SIZE:
+        raise SeekIndexError('索引文件不完整')
+    return count
+
+
+def lookup(data, time_ms):
+    """
+    在打包好的索引中二分查找不晚于指定时间的最近关键帧（不展开整个数组）
+    参数:
+        data: sidecar 二进制数据
+        time_ms: 目标播放时间（毫秒）
+    返回:
+        tuple[int, int] | None: (关键帧时间, 字节偏移)，索引为空时返回 None
+    """
+    count = _validate(data)
+    if count == 0:
+        return None
+    lo, hi = 0, count - 1
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        mid_time = struct.unpack_from('<I', data, HEADER_SIZE + mid * RECORD_SIZE)[0]
+        if mid_time <= time_ms:
+            lo = mid
+        else:
+            hi = mid - 1
+    return struct.unpack_from(RECORD_FORMAT, data, HEADER_SIZE + lo * RECORD_SIZE)
+
+
+def write_seek_index(video_file_path):
+    """
+    为视频文件构建并写入 sidecar 索引
+    参数:
+        video_file_path: 视频文件绝对路径
+    返回:
+        int: 写入的关键帧条数
+    构建失败（SeekIndexError）时写入失败标记后重新抛出
+    """
+    try:
+        data = pack_seek_index(build_seek_index(video_file_path))
+    except SeekIndexError as e:
+        try:
+            _write_atomic(failure_path(video_file_path), str(e).encode('utf-8'))
+        except OSError as marker_err:
+            print(f'写入关键帧索引失败标记失败: {marker_err}')
+        raise
+    _write_atomic(sidecar_path(video_file_path), data)
+    return (len(data) - HEADER_SIZE) // RECORD_SIZE
+
+
+def _write_atomic(target, data):
+    """
+    先写同目录下唯一命名的临时文件再替换，避免并发读取到写了一半的文件，
+    也避免多个请求同时补建同一个索引时互相覆盖临时文件
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(target) + '.', suffix='.tmp',
+                                    dir=os.path.dirname(target) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        # mkstemp 创建的文件权限为 0600，改回与普通文件一致
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, target)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
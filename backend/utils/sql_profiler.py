@@ -0,0 +1,232 @@
+"""
+SQL 性能分析模块
+通过 SQLAlchemy 引擎事件记录每个请求的查询次数、数据库总耗时和最慢语句，
+并把重复出现的同形语句标记为疑似 N+1 查询。
+
+- 调试模式下通过响应头 X-DB-* 返回单个请求的统计信息
+- 按接口（endpoint）汇总的报告通过 /api/debug/sql-report 查看（需要管理员令牌）
+"""
+import re
+import threading
+import time
+from collections import Counter
+
+from flask import g, has_request_context, jsonify, request
+from sqlalchemy import event
+
+from models import db
+from utils.auth import admin_required
+
+# 语句归一化：把字面量和展开的 IN 参数列表折叠成统一形状
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAM_LIST = re.compile(r'\(\s*(?:\?|%s|%\(\w+\)s)(?:\s*,\s*(?:\?|%s|%\(\w+\)s))*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_statement(statement):
+    """
+    将 SQL 语句归一化为 "语句形状"，用于识别重复查询
+    参数:
+        statement: 驱动层实际执行的 SQL 字符串
+    返回:
+        str: 归一化后的语句形状
+    """
+    shape = _STRING_LITERAL.sub('?', statement)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _PARAM_LIST.sub('(?)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class RequestSqlStats:
+    """
+    单个请求的 SQL 统计
+    """
+
+    def __init__(self):
+        self.query_count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+        self.shapes = Counter()
+
+    def record(self, statement, elapsed):
+        """
+        记录一条已执行的语句
+        """
+        self.query_count += 1
+        self.total_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+        self.shapes[normalize_statement(statement)] += 1
+
+    def suspected_n_plus_one(self, threshold):
+        """
+        返回重复次数达到阈值的语句形状（疑似 N+1）
+        """
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+
+class SqlReport:
+    """
+    按接口汇总的 SQL 统计报告（进程内，线程安全）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def add(self, endpoint, stats, n_plus_one):
+        """
+        把一个请求的统计合并到对应接口的汇总中
+        """
+        with self._lock:
+            entry = self._endpoints.setdefault(endpoint, {
+                'requests': 0,
+                'total_queries': 0,
+                'max_queries': 0,
+                'total_db_ms': 0.0,
+                'slowest_ms': 0.0,
+                'slowest_statement': None,
+                'n_plus_one': Counter(),
+            })
+            entry['requests'] += 1
+            entry['total_queries'] += stats.query_count
+            entry['max_queries'] = max(entry['max_queries'], stats.query_count)
+            entry['total_db_ms'] += stats.total_time * 1000
+            if stats.slowest_time * 1000 > entry['slowest_ms']:
+                entry['slowest_ms'] = stats.slowest_time * 1000
+                entry['slowest_statement'] = stats.slowest_statement
+            for shape, count in n_plus_one.items():
+                entry['n_plus_one'][shape] = max(entry['n_plus_one'][shape], count)
+
+    def snapshot(self):
+        """
+        返回当前汇总数据（按平均查询次数倒序）
+        """
+        with self._lock:
+            rows = []
+            for endpoint, entry in self._endpoints.items():
+                requests = entry['requests']
+                rows.append({
+                    'endpoint': endpoint,
+                    'requests': requests,
+                    'avg_queries': round(entry['total_queries'] / requests, 2),
+                    'max_queries': entry['max_queries'],
+                    'avg_db_ms': round(entry['total_db_ms'] / requests, 3),
+                    'slowest_ms': round(entry['slowest_ms'], 3),
+                    'slowest_statement': entry['slowest_statement'],
+                    'suspected_n_plus_one': [
+                        {'statement': shape, 'max_repeats': count}
+                        for shape, count in entry['n_plus_one'].most_common()
+                    ],
+                })
+        rows.sort(key=lambda row: row['avg_queries'], reverse=True)
+        return rows
+
+    def reset(self):
+        """
+        清空汇总数据
+        """
+        with self._lock:
+            self._endpoints.clear()
+
+
+# 进程级汇总报告
+sql_report = SqlReport()
+
+
+def current_stats():
+    """
+    获取当前请求的 SQL 统计（不在请求上下文中时返回 None）
+    """
+    if not has_request_context():
+        return None
+    return g.get('_sql_stats')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_sql_profiler_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('_sql_profiler_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = current_stats()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+
+def _listen_engine(engine):
+    """
+    为引擎挂载执行事件（重复调用不会重复挂载）
+    """
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def init_sql_profiler(app):
+    """
+    在应用工厂中启用 SQL 性能分析
+    配置项:
+        SQL_PROFILER_ENABLED: 是否启用
+        SQL_PROFILER_HEADERS: 是否在响应头中返回统计（默认跟随 DEBUG）
+        SQL_N_PLUS_ONE_THRESHOLD: 同形语句在一个请求内重复多少次视为疑似 N+1
+    """
+    if not app.config.get('SQL_PROFILER_ENABLED'):
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            _listen_engine(engine)
+
+    @app.before_request
+    def start_sql_stats():
+        g._sql_stats = RequestSqlStats()
+
+    @app.after_request
+    def finish_sql_stats(response):
+        stats = g.pop('_sql_stats', None)
+        if stats is None:
+            return response
+
+        n_plus_one = stats.suspected_n_plus_one(app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 5))
+        endpoint = request.endpoint or request.path
+        sql_report.add(endpoint, stats, n_plus_one)
+
+        if n_plus_one:
+            app.logger.warning(
+                '疑似 N+1 查询: %s 共执行 %d 条SQL, 重复语句: %s',
+                endpoint, stats.query_count,
+                '; '.join(f'{count}x {shape[:120]}' for shape, count in n_plus_one.items())
+            )
+
+        if app.config.get('SQL_PROFILER_HEADERS', app.debug):
+            response.headers['X-DB-Query-Count'] = str(stats.query_count)
+            response.headers['X-DB-Time-Ms'] = f'{stats.total_time * 1000:.3f}'
+            response.headers['X-DB-Slowest-Ms'] = f'{stats.slowest_time * 1000:.3f}'
+            response.headers['X-DB-N-Plus-One'] = str(len(n_plus_one))
+        return response
+
+    @app.route('/api/debug/sql-report', methods=['GET', 'DELETE'])
+    @admin_required
+    def sql_report_view():
+        """
+        按接口汇总的 SQL 统计报告（仅管理员，报告包含所有接口的语句结构和耗时）
+        GET 查看报告，DELETE 清空报告
+        """
+        if request.method == 'DELETE':
+            sql_report.reset()
+            return jsonify({
+                'code': 200,
+                'msg': '报告已清空'
+            }), 200
+        return jsonify({
+            'code': 200,
+            'msg': '获取成功',
+            'data': sql_report.snapshot()
+        }), 200
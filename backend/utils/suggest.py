@@ -0,0 +1,260 @@
+"""
+标题联想模块
+进程内维护已发布视频标题的有序数组前缀索引，搜索框输入时按前缀返回播放量最高的若干个标题，请求中不访问数据库。
+
+索引结构:
+    _keys    按 (规范化标题, 视频ID) 排序的列表，前缀 p 对应的条目是二分查找得到的连续区间 [lo, hi)
+    _scores  与 _keys 对齐的热度（播放量）
+    _top     匹配条目超过 SCAN_LIMIT 个的前缀（短前缀、大量标题共用的前缀）-> 预先算好的前 TOP_CAPACITY 个
+             (热度, 视频ID)，LRU 淘汰；其余前缀直接扫描区间取前 N 个
+构建只取播放量最高的 max_titles 个标题，内存有上限。启动预热时构建一次，之后由每个进程的后台线程按刷新间隔重建
+（gunicorn 在 worker 初始化时启动，开发服务器在第一次查询时启动），请求线程只读取当前索引，不访问数据库。
+审核通过、管理员上传、删除视频时增量更新本进程的索引；其他 worker 进程的索引在下次定时重建时收敛，
+播放量变化带来的排序变化同样在重建时更新。
+"""
+import heapq
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+
+# 排在所有字符之后的哨兵，用于求前缀区间的右端
+_MAX_CHAR = '\U0010ffff'
+
+# 匹配条目不超过该数量的前缀直接扫描区间
+SCAN_LIMIT = 256
+
+# 预先计算的前缀保留的条目数（大于接口的条数上限，去掉重复标题后仍然够用）
+TOP_CAPACITY = 20
+
+# 接口返回的默认 / 最大条数
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 10
+
+# 后台重建失败后的重试间隔（秒）
+RETRY_INTERVAL = 30
+
+
+def normalize(text):
+    """
+    规范化标题或查询前缀：忽略大小写，合并连续空白
+    """
+    return ' '.join(text.split()).casefold()
+
+
+class TitleIndex:
+    """
+    标题前缀索引（线程安全）
+    参数:
+        max_titles: 最多索引的标题数
+        max_prefixes: 最多缓存的前缀结果数
+        refresh_interval: 距上次构建超过该秒数时重建
+    """
+
+    def __init__(self, max_titles=200000, max_prefixes=10000, refresh_interval=300):
+        self.max_titles = max_titles
+        self.max_prefixes = max_prefixes
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        # 已启动后台重建线程的进程ID（fork 出的子进程需要重新启动）
+        self._refresher_pid = None
+        self._keys = []
+        self._scores = []
+        # video_id -> (标题, 规范化标题)
+        self._titles = {}
+        # 前缀 -> 按热度从高到低排列的 (热度, 视频ID)
+        self._top = OrderedDict()
+        self._built_at = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._keys)
+
+    def build(self, rows):
+        """
+        用 (视频ID, 标题, 热度) 列表重建索引（超过 max_titles 时保留热度最高的）
+        返回:
+            int: 索引的标题数
+        """
+        rows = heapq.nlargest(self.max_titles, rows, key=lambda row: (row[2], row[0]))
+        entries = sorted((normalize(title), vid, title, score) for vid, title, score in rows)
+        keys = [(key, vid) for key, vid, _, _ in entries]
+        scores = [score for _, _, _, score in entries]
+        titles = {vid: (title, key) for key, vid, title, _ in entries}
+        top = OrderedDict()
+        for prefix, lo, hi in _hot_prefixes(keys):
+            if len(top) >= self.max_prefixes:
+                break
+            top[prefix] = _top_entries(keys, scores, lo, hi)
+        with self._lock:
+            self._keys, self._scores, self._titles, self._top = keys, scores, titles, top
+            self._built_at = time.monotonic()
+        return len(keys)
+
+    def start_refresher(self, app):
+        """
+        启动本进程的后台重建线程（守护线程；同一进程重复调用直接返回）
+        参数:
+            app: Flask 应用实例（线程中重建时需要应用上下文）
+        """
+        pid = os.getpid()
+        if self._refresher_pid == pid:
+            return
+        with self._lock:
+            if self._refresher_pid == pid:
+                return
+            self._refresher_pid = pid
+        threading.Thread(target=self._refresh_loop, args=(app,), name='title-index-refresh', daemon=True).start()
+
+    def _refresh_loop(self, app):
+        """
+        后台线程：未构建时立即构建，之后每隔 refresh_interval 秒重建，失败时 RETRY_INTERVAL 秒后重试
+        """
+        while True:
+            if self._built_at is not None:
+                time.sleep(max(self.refresh_interval - (time.monotonic() - self._built_at), 0))
+            try:
+                with app.app_context():
+                    self.refresh()
+            except Exception as e:
+                print(f'标题联想索引重建失败: {e}')
+                time.sleep(RETRY_INTERVAL)
+
+    def refresh(self):
+        """
+        从数据库读取已发布视频的标题和播放量并重建索引（需要应用上下文）
+        """
+        from models import Video
+
+        rows = Video.query.with_entities(Video.id, Video.title, Video.view_count).filter(
+            Video.status == Video.STATUS_PUBLISHED
+        ).order_by(Video.view_count.desc()).limit(self.max_titles).all()
+        return self.build([(vid, title, view_count or 0) for vid, title, view_count in rows])
+
+    def add(self, video_id, title, score=0):
+        """
+        加入一个新发布的视频（索引已满时忽略，下次重建时按热度决定是否收录）
+        """
+        key = normalize(title)
+        if not key:
+            return
+        with self._lock:
+            if video_id in self._titles or len(self._keys) >= self.max_titles:
+                return
+            entry = (key, video_id)
+            index = bisect_left(self._keys, entry)
+            self._keys.insert(index, entry)
+            self._scores.insert(index, score)
+            self._titles[video_id] = (title, key)
+            # 更新已缓存的前缀结果
+            rank = (score, video_id)
+            for end in range(1, len(key) + 1):
+                top = self._top.get(key[:end])
+                if top is not None and (len(top) < TOP_CAPACITY or rank > top[-1]):
+                    top.insert(sum(1 for r in top if r > rank), rank)
+                    del top[TOP_CAPACITY:]
+
+    def remove(self, video_id):
+        """
+        移除已删除的视频（包含它的前缀缓存被丢弃，下次查询时重新计算）
+        """
+        with self._lock:
+            item = self._titles.pop(video_id, None)
+            if item is None:
+                return
+            key = item[1]
+            entry = (key, video_id)
+            index = bisect_left(self._keys, entry)
+            if index < len(self._keys) and self._keys[index] == entry:
+                del self._keys[index]
+                del self._scores[index]
+            for end in range(1, len(key) + 1):
+                top = self._top.get(key[:end])
+                if top is not None and any(vid == video_id for _, vid in top):
+                    del self._top[key[:end]]
+
+    def suggest(self, prefix, limit=DEFAULT_LIMIT):
+        """
+        返回以 prefix 开头、热度最高的标题（相同标题只返回一次）
+        返回:
+            list: [{id, title}]
+        """
+        key = normalize(prefix)
+        if not key:
+            return []
+        with self._lock:
+            lo = bisect_left(self._keys, (key,))
+            hi = bisect_left(self._keys, (key + _MAX_CHAR,), lo)
+            if hi - lo <= SCAN_LIMIT:
+                entries = _top_entries(self._keys, self._scores, lo, hi)
+            else:
+                entries = self._top.get(key)
+                if entries is None:
+                    entries = self._top[key] = _top_entries(self._keys, self._scores, lo, hi)
+                    while len(self._top) > self.max_prefixes:
+                        self._top.popitem(last=False)
+                else:
+                    self._top.move_to_end(key)
+            results, seen = [], set()
+            for _, vid in entries:
+                title = self._titles[vid][0]
+                if title in seen:
+                    continue
+                seen.add(title)
+                results.append({'id': vid, 'title': title})
+                if len(results) >= limit:
+                    break
+        return results
+
+
+def _top_entries(keys, scores, lo, hi):
+    """
+    区间 [lo, hi) 内热度最高的 TOP_CAPACITY 个条目（热度相同时较新的视频在前）
+    返回:
+        list: 按热度从高到低排列的 (热度, 视频ID)
+    """
+    return heapq.nlargest(TOP_CAPACITY, ((scores[i], keys[i][1]) for i in range(lo, hi)))
+
+
+def _hot_prefixes(keys):
+    """
+    逐层列出匹配条目超过 SCAN_LIMIT 个的前缀（只在上一层的大区间内继续细分）
+    返回:
+        generator: (前缀, lo, hi)
+    """
+    ranges = [(0, len(keys))] if len(keys) > SCAN_LIMIT else []
+    depth = 0
+    while ranges:
+        depth += 1
+        next_ranges = []
+        for lo, hi in ranges:
+            start = lo
+            while start < hi:
+                key = keys[start][0]
+                if len(key) < depth:
+                    start += 1
+                    continue
+                prefix = key[:depth]
+                end = bisect_left(keys, (prefix + _MAX_CHAR,), start, hi)
+                if end - start > SCAN_LIMIT:
+                    yield prefix, start, end
+                    next_ranges.append((start, end))
+                start = end
+        ranges = next_ranges
+
+
+title_index = TitleIndex()
+
+
+def init_suggest(app):
+    """
+    在应用工厂中配置标题联想索引（索引在预热时构建，之后由后台线程定时重建，见 TitleIndex.start_refresher）
+    配置项:
+        SUGGEST_MAX_TITLES: 最多索引的标题数
+        SUGGEST_MAX_PREFIXES: 最多缓存的前缀结果数
+        SUGGEST_REFRESH_INTERVAL: 重建间隔（秒）
+    """
+    title_index.max_titles = app.config.get('SUGGEST_MAX_TITLES', title_index.max_titles)
+    title_index.max_prefixes = app.config.get('SUGGEST_MAX_PREFIXES', title_index.max_prefixes)
+    title_index.refresh_interval = app.config.get('SUGGEST_REFRESH_INTERVAL', title_index.refresh_interval)
@@ -0,0 +1,234 @@
+"""
+合成数据生成模块
+按参数批量生成用户、视频、点赞、收藏和多级评论，用于在本地复现生产规模的数据量并做性能测试。
+
+- 视频热度服从 Zipf 分布（少数视频获得大部分互动），上传者的活跃度同样服从 Zipf 分布
+- 评论包含一级评论和楼中楼回复，root_id/parent_id 与线上数据结构一致
+- 通过 Core executemany 大批量写入，不经过 ORM
+- 媒体文件统一指向占位文件
+- 相同的随机种子生成完全相同的数据
+"""
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from models import db, User, Category, Video, Comment, Like, Collection
+
+# 占位媒体文件（相对 UPLOAD_FOLDER）
+PLACEHOLDER_VIDEO = 'videos/placeholder.mp4'
+PLACEHOLDER_COVER = 'covers/placeholder.jpg'
+
+# 默认分类（与 init_db.py 保持一致）
+DEFAULT_CATEGORIES = ['校园生活', '课程学习', '社团活动', '娱乐搞笑']
+
+# 批量生成用户的统一密码（只计算一次哈希，避免逐个调用慢哈希）
+BULK_USER_PASSWORD = 'password123'
+
+# 视频状态分布：已发布 / 待审核 / 已驳回
+STATUS_WEIGHTS = [(Video.STATUS_PUBLISHED, 0.90), (Video.STATUS_PENDING, 0.07), (Video.STATUS_REJECTED, 0.03)]
+
+# 评论中回复（楼中楼）的比例
+REPLY_RATIO = 0.6
+
+# 生成数据的时间跨度（天）
+TIME_SPAN_DAYS = 365
+
+
+def _zipf_cum_weights(n, s, rng):
+    """
+    生成 n 个元素的 Zipf 累积权重，热度排名随机打乱（避免 id 越小越热门）
+    """
+    ranks = list(range(1, n + 1))
+    rng.shuffle(ranks)
+    return list(accumulate(1.0 / (rank ** s) for rank in ranks))
+
+
+def _next_id(model):
+    """
+    获取表中下一个可用的主键（显式指定主键，便于在内存中构建评论的父子关系）
+    """
+    return (db.session.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _insert_batches(table, rows, batch_size):
+    """
+    使用 Core executemany 分批写入
+    """
+    conn = db.session.connection()
+    for start in range(0, len(rows), batch_size):
+        conn.execute(table.insert(), rows[start:start + batch_size])
+
+
+def _ensure_placeholders():
+    """
+    创建占位媒体文件（已存在则跳过）
+    """
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    for relative_path, content in ((PLACEHOLDER_VIDEO, b''), (PLACEHOLDER_COVER, b'')):
+        path = os.path.join(upload_folder, relative_path)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(content)
+
+
+def _unique_pairs(count, user_ids, video_ids, video_cum_weights, rng):
+    """
+    生成不重复的 (user_id, video_id) 组合（用户均匀，视频按 Zipf 热度）
+    """
+    pairs = set()
+    max_pairs = len(user_ids) * len(video_ids)
+    count = min(count, max_pairs)
+    while len(pairs) < count:
+        need = count - len(pairs)
+        users = rng.choices(user_ids, k=need)
+        videos = rng.choices(video_ids, cum_weights=video_cum_weights, k=need)
+        pairs.update(zip(users, videos))
+    return pairs
+
+
+def seed_bulk(users=1000, videos=5000, likes=500000, collections=200000, comments=300000,
+              seed=42, zipf_s=1.1, batch_size=20000, log=print):
+    """
+    批量生成合成数据（需在应用上下文中调用）
+    参数:
+        users: 用户数量
+        videos: 视频数量
+        likes: 点赞数量
+        collections: 收藏数量
+        comments: 评论数量（含回复）
+        seed: 随机种子
+        zipf_s: Zipf 分布指数（越大头部越集中）
+        batch_size: 每批写入行数
+        log: 进度输出函数
+    返回:
+        dict: 各表写入的行数和耗时
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    # 固定时间基准，保证相同种子生成相同数据
+    now = datetime(2026, 1, 1)
+    span_seconds = TIME_SPAN_DAYS * 86400
+
+    def random_time():
+        return now - timedelta(seconds=rng.randrange(span_seconds))
+
+    is_sqlite = db.engine.dialect.name == 'sqlite'
+    if is_sqlite:
+        # 批量写入期间关闭同步，提高 SQLite 写入速度
+        db.session.execute(db.text('PRAGMA synchronous=OFF'))
+        db.session.execute(db.text('PRAGMA journal_mode=MEMORY'))
+
+    _ensure_placeholders()
+
+    # ==================== 分类 ====================
+    category_ids = list(db.session.execute(select(Category.id)).scalars())
+    if not category_ids:
+        _insert_batches(Category.__table__, [{'name': name} for name in DEFAULT_CATEGORIES], batch_size)
+        category_ids = list(db.session.execute(select(Category.id)).scalars())
+
+    # ==================== 用户 ====================
+    user_base = _next_id(User)
+    probe = User()
+    probe.set_password(BULK_USER_PASSWORD)
+    password_hash = probe.password
+    user_rows = [{
+        'id': user_base + i,
+        'username': f'bulk{seed}_{user_base + i}',
+        'password': password_hash,
+        'nickname': f'用户{user_base + i}',
+        'role': 'user',
+        'avatar': '',
+        'created_at': random_time(),
+    } for i in range(users)]
+    _insert_batches(User.__table__, user_rows, batch_size)
+    user_ids = [row['id'] for row in user_rows]
+    del user_rows
+    log(f'✓ 用户 {users} 条')
+
+    # ==================== 视频 ====================
+    video_base = _next_id(Video)
+    uploader_weights = _zipf_cum_weights(len(user_ids), zipf_s, rng)
+    video_weights = _zipf_cum_weights(videos, zipf_s, rng)
+    statuses, status_weights = zip(*STATUS_WEIGHTS)
+    total_weight = video_weights[-1] if video_weights else 1.0
+    uploaders = rng.choices(user_ids, cum_weights=uploader_weights, k=videos)
+    video_rows = []
+    published_ids, published_weights = [], []
+    previous_weight = 0.0
+    for i in range(videos):
+        video_id = video_base + i
+        weight = video_weights[i] - previous_weight
+        previous_weight = video_weights[i]
+        status = rng.choices(statuses, weights=status_weights)[0]
+        video_rows.append({
+            'id': video_id,
+            'title': f'视频 {video_id}',
+            'description': f'合成数据视频 {video_id}',
+            'cover_path': PLACEHOLDER_COVER,
+            'video_path': PLACEHOLDER_VIDEO,
+            'status': status,
+            # 播放量与热度成正比
+            'view_count': int(weight / total_weight * likes * 20) if status == Video.STATUS_PUBLISHED else 0,
+            'created_at': random_time(),
+            'user_id': uploaders[i],
+            'category_id': rng.choice(category_ids),
+        })
+        if status == Video.STATUS_PUBLISHED:
+            published_ids.append(video_id)
+            published_weights.append(weight)
+    _insert_batches(Video.__table__, video_rows, batch_size)
+    del video_rows
+    log(f'✓ 视频 {videos} 条（已发布 {len(published_ids)} 条）')
+
+    counts = {'users': users, 'videos': videos, 'likes': 0, 'collections': 0, 'comments': 0}
+    if published_ids:
+        published_cum_weights = list(accumulate(published_weights))
+
+        # ==================== 点赞 / 收藏 ====================
+        for model, amount, key in ((Like, likes, 'likes'), (Collection, collections, 'collections')):
+            pairs = _unique_pairs(amount, user_ids, published_ids, published_cum_weights, rng)
+            # 排序后写入，保证同一种子下主键分配一致
+            rows = [{'user_id': user_id, 'video_id': video_id, 'created_at': random_time()}
+                    for user_id, video_id in sorted(pairs)]
+            _insert_batches(model.__table__, rows, batch_size)
+            counts[key] = len(rows)
+            log(f'✓ {key} {len(rows)} 条')
+
+        # ==================== 评论（含楼中楼回复） ====================
+        comment_base = _next_id(Comment)
+        comment_videos = rng.choices(published_ids, cum_weights=published_cum_weights, k=comments)
+        comment_authors = rng.choices(user_ids, k=comments)
+        # 每个视频已生成的评论：[(comment_id, root_id)]
+        video_comments = {}
+        rows = []
+        for i in range(comments):
+            comment_id = comment_base + i
+            video_id = comment_videos[i]
+            existing = video_comments.setdefault(video_id, [])
+            parent_id = root_id = None
+            if existing and rng.random() < REPLY_RATIO:
+                parent_id, parent_root = rng.choice(existing)
+                root_id = parent_root or parent_id
+            existing.append((comment_id, root_id))
+            rows.append({
+                'id': comment_id,
+                'content': f'评论 {comment_id}',
+                'created_at': now - timedelta(seconds=span_seconds - i * span_seconds // max(comments, 1)),
+                'user_id': comment_authors[i],
+                'video_id': video_id,
+                'parent_id': parent_id,
+                'root_id': root_id,
+            })
+        _insert_batches(Comment.__table__, rows, batch_size)
+        counts['comments'] = len(rows)
+        log(f'✓ comments {len(rows)} 条')
+
+    db.session.commit()
+    counts['elapsed_seconds'] = round(time.perf_counter() - started, 2)
+    return counts
@@ -0,0 +1,193 @@
+"""
+视频独立访客数统计模块
+视频详情接口每次访问把访客标识（登录用户为用户ID，未登录为 IP）加入该视频的 HyperLogLog 草图（见 utils/hll.py），
+每个视频的草图固定占用 4KB 内存，不保存 (用户, 视频) 明细，也不保存原始 IP（只保存其哈希落入的寄存器）。
+
+写回（达到时间间隔或本进程草图数达到上限时，由请求线程顺带执行）:
+    1. 为这批视频补建草图行（已存在则忽略），再 SELECT ... FOR UPDATE 读取已保存的草图
+    2. 与本进程的草图合并（逐寄存器取最大值），写回草图和估计值 videos.unique_viewers
+多个 worker 进程各自累加、写回时合并，结果等同于所有进程访客集合的并集；写回后本进程草图清空。
+"""
+import atexit
+import threading
+import time
+from datetime import datetime
+
+from flask import request
+from sqlalchemy import bindparam, select, update
+
+from utils.auth import token_identity
+from utils.hll import HyperLogLog
+from utils.upsert import insert_ignore_stmt
+
+
+def viewer_key():
+    """
+    当前访客标识：登录用户按用户ID，未登录按 IP 地址（加入草图前会被哈希）
+    """
+    user_id = token_identity()
+    if user_id is not None:
+        return f'user:{user_id}'
+    return f'ip:{request.remote_addr}'
+
+
+class ViewerSketches:
+    """
+    进程内各视频的访客草图（线程安全）
+    参数:
+        flush_interval: 距上次写回超过该秒数时写回
+        max_videos: 本进程持有的草图数达到该值时写回（限制内存：每个草图 4KB）
+    """
+
+    def __init__(self, flush_interval=60, max_videos=1000):
+        self.flush_interval = flush_interval
+        self.max_videos = max_videos
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # video_id -> 上次写回后本进程的访客草图
+        self._sketches = {}
+        self._last_flush = time.monotonic()
+
+    def add(self, video_id, key):
+        """
+        记录一次访问
+        """
+        with self._lock:
+            sketch = self._sketches.get(video_id)
+            if sketch is None:
+                sketch = self._sketches[video_id] = HyperLogLog()
+            sketch.add(key)
+
+    def forget(self, video_id):
+        """
+        删除视频时丢弃其草图
+        """
+        with self._lock:
+            self._sketches.pop(video_id, None)
+
+    def pending(self):
+        """
+        返回未写回的视频数
+        """
+        with self._lock:
+            return len(self._sketches)
+
+    def should_flush(self):
+        return bool(self._sketches) and (
+            len(self._sketches) >= self.max_videos
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        )
+
+    def maybe_flush(self):
+        """
+        达到时间间隔或数量上限时写回（已有线程在写回时直接返回），写回失败不影响当前请求
+        """
+        if self.should_flush() and self._flush_lock.acquire(blocking=False):
+            try:
+                self._flush()
+            except Exception as e:
+                print(f'独立访客草图写回失败: {e}')
+            finally:
+                self._flush_lock.release()
+
+    def flush(self):
+        """
+        立即写回所有草图（需要应用上下文）
+        返回:
+            int: 写回的视频数
+        """
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self):
+        from models import db, Video, VideoViewerSketch
+
+        with self._lock:
+            batch, self._sketches = self._sketches, {}
+            self._last_flush = time.monotonic()
+        if not batch:
+            return 0
+
+        sketches = VideoViewerSketch.__table__
+        videos = Video.__table__
+        now = datetime.utcnow()
+        try:
+            with db.engine.begin() as conn:
+                # 已删除的视频不再写回
+                ids = sorted(conn.execute(
+                    select(videos.c.id).where(videos.c.id.in_(list(batch)))
+                ).scalars())
+                if not ids:
+                    return 0
+                # 先补建缺少的草图行，再加锁读取，并发写回的进程依次合并，不会互相覆盖
+                empty = HyperLogLog().to_bytes()
+                conn.execute(
+                    insert_ignore_stmt(conn.dialect.name, sketches),
+                    [{'video_id': vid, 'registers': empty, 'updated_at': now} for vid in ids],
+                )
+                stored = dict(conn.execute(
+                    select(sketches.c.video_id, sketches.c.registers)
+                    .where(sketches.c.video_id.in_(ids))
+                    .with_for_update()
+                ).all())
+
+                rows = []
+                for vid in ids:
+                    merged = batch[vid]
+                    try:
+                        merged.merge(HyperLogLog.from_bytes(stored.get(vid)))
+                    except ValueError as e:
+                        # 已保存的草图损坏时以本进程的草图重新开始
+                        print(f'视频 {vid} 的访客草图无法解析，已重置: {e}')
+                    rows.append({
+                        'vid': vid,
+                        'blob': merged.to_bytes(),
+                        'estimate': merged.count(),
+                    })
+
+                conn.execute(
+                    update(sketches)
+                    .where(sketches.c.video_id == bindparam('vid'))
+                    .values(registers=bindparam('blob'), updated_at=now),
+                    rows,
+                )
+                conn.execute(
+                    update(videos)
+                    .where(videos.c.id == bindparam('vid'))
+                    .values(unique_viewers=bindparam('estimate')),
+                    rows,
+                )
+        except Exception:
+            # 写回失败时把草图合并回去（并集，可重复合并），下次再试
+            with self._lock:
+                for vid, sketch in batch.items():
+                    current = self._sketches.get(vid)
+                    self._sketches[vid] = sketch if current is None else current.merge(sketch)
+            raise
+        return len(rows)
+
+
+viewer_sketches = ViewerSketches()
+
+
+def init_unique_viewers(app):
+    """
+    在应用工厂中配置独立访客草图写回，并在进程退出时写回剩余草图
+    配置项:
+        UNIQUE_VIEWERS_FLUSH_INTERVAL: 写回间隔（秒）
+        UNIQUE_VIEWERS_MAX_VIDEOS: 进程内最多持有的草图数
+    """
+    viewer_sketches.flush_interval = app.config.get('UNIQUE_VIEWERS_FLUSH_INTERVAL', viewer_sketches.flush_interval)
+    viewer_sketches.max_videos = app.config.get('UNIQUE_VIEWERS_MAX_VIDEOS', viewer_sketches.max_videos)
+
+    def flush_on_exit():
+        if not viewer_sketches.pending():
+            return
+        try:
+            with app.app_context():
+                viewer_sketches.flush()
+        except Exception as e:
+            print(f'独立访客草图写回失败: {e}')
+
+    atexit.register(flush_on_exit)
+    return flush_on_exit
@@ -0,0 +1,95 @@
+"""
+跨数据库的 UPSERT 语句构造
+- MySQL:               INSERT ... ON DUPLICATE KEY UPDATE
+- SQLite / PostgreSQL: INSERT ... ON CONFLICT (主键) DO UPDATE
+
+用法:
+    increment_stmt:     计数器累加（行不存在时插入），用于写操作顺带维护汇总表
+    accumulate_stmt:    批量累加（executemany），用于批量写回进程内累计的增量
+    replace_stmt:       批量覆盖写入（executemany），用于离线重算汇总表
+    insert_ignore_stmt: 批量插入，主键已存在时忽略（executemany），用于先建行再加锁读取
+"""
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+_INSERTS = {
+    'mysql': mysql.insert,
+    'mariadb': mysql.insert,
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def _insert(dialect_name, table):
+    try:
+        return _INSERTS[dialect_name](table)
+    except KeyError:
+        raise NotImplementedError(f'不支持的数据库类型: {dialect_name}') from None
+
+
+def _on_conflict(stmt, dialect_name, key_columns, set_):
+    if dialect_name in ('mysql', 'mariadb'):
+        return stmt.on_duplicate_key_update(set_)
+    return stmt.on_conflict_do_update(index_elements=key_columns, set_=set_)
+
+
+def increment_stmt(dialect_name, table, keys, deltas, extra=None):
+    """
+    构造计数器累加语句：行存在时 col = col + delta，不存在时以 max(delta, 0) 插入
+    参数:
+        dialect_name: 数据库类型（engine.dialect.name）
+        table: 目标表
+        keys: 主键列 -> 值
+        deltas: 计数列 -> 增量（可为负数）
+        extra: 每次写入都覆盖的其他列（如更新时间）
+    """
+    extra = extra or {}
+    values = dict(keys, **{col: max(delta, 0) for col, delta in deltas.items()}, **extra)
+    stmt = _insert(dialect_name, table).values(**values)
+    set_ = {col: table.c[col] + delta for col, delta in deltas.items()}
+    set_.update(extra)
+    return _on_conflict(stmt, dialect_name, list(keys), set_)
+
+
+def accumulate_stmt(dialect_name, table, key_columns, value_columns):
+    """
+    构造批量累加语句（配合 executemany 使用，参数名与列名相同）：行存在时 col = col + 参数值，不存在时以参数值插入
+    参数:
+        dialect_name: 数据库类型
+        table: 目标表
+        key_columns: 主键列名列表
+        value_columns: 累加的列名列表
+    """
+    stmt = _insert(dialect_name, table)
+    new = stmt.inserted if dialect_name in ('mysql', 'mariadb') else stmt.excluded
+    set_ = {col: table.c[col] + new[col] for col in value_columns}
+    return _on_conflict(stmt, dialect_name, key_columns, set_)
+
+
+def replace_stmt(dialect_name, table, key_columns, update_columns):
+    """
+    构造批量覆盖语句（配合 executemany 使用，参数名与列名相同）
+    参数:
+        dialect_name: 数据库类型
+        table: 目标表
+        key_columns: 主键列名列表
+        update_columns: 冲突时覆盖的列名列表
+    """
+    stmt = _insert(dialect_name, table)
+    if dialect_name in ('mysql', 'mariadb'):
+        set_ = {col: stmt.inserted[col] for col in update_columns}
+    else:
+        set_ = {col: stmt.excluded[col] for col in update_columns}
+    return _on_conflict(stmt, dialect_name, key_columns, set_)
+
+
+def insert_ignore_stmt(dialect_name, table):
+    """
+    构造插入语句，主键冲突时忽略（配合 executemany 使用，参数名与列名相同）
+    参数:
+        dialect_name: 数据库类型
+        table: 目标表
+    """
+    stmt = _insert(dialect_name, table)
+    if dialect_name in ('mysql', 'mariadb'):
+        return stmt.prefix_with('IGNORE')
+    return stmt.on_conflict_do_nothing()
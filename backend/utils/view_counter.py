@@ -0,0 +1,201 @@
+"""
+播放量计数模块
+视频详情接口不再每次访问都执行 UPDATE + COMMIT，而是在进程内累加播放量，
+达到批量大小或时间间隔后一次性批量写回数据库（UPDATE ... SET view_count = view_count + n）。
+
+计数器同时维护每个视频的实时播放量（数据库值 + 本进程未写回的增量），
+详情缓存中的响应体不包含播放量，读取时用实时值填入，因此播放量变化不会使缓存失效。
+实时值按 LRU 最多保留 max_live 个视频，被淘汰的视频下次访问时由 缓存中的数据库值 + 增量 重新初始化。
+多进程部署时各 worker 只累加自己的增量，其他 worker 的增量在写回数据库、详情缓存重新加载后体现。
+"""
+import atexit
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import bindparam, select, update
+
+
+class ViewCounter:
+    """
+    进程内播放量计数器（线程安全）
+    参数:
+        flush_interval: 距上次写回超过该秒数时写回
+        flush_batch: 未写回的播放次数达到该值时写回
+        max_live: 最多保留实时播放量的视频数
+    """
+
+    def __init__(self, flush_interval=5, flush_batch=500, max_live=10000):
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.max_live = max_live
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # video_id -> 未写回数据库的增量
+        self._pending = {}
+        self._pending_total = 0
+        # video_id -> 已从 _pending 取出、正在写回（尚未提交）的增量
+        self._inflight = {}
+        # video_id -> 实时播放量（LRU）
+        self._live = OrderedDict()
+        self._last_flush = time.monotonic()
+
+    def _unflushed(self, video_id):
+        """
+        数据库中尚未体现的增量（调用方持有 _lock）
+        """
+        return self._pending.get(video_id, 0) + self._inflight.get(video_id, 0)
+
+    def _set_live(self, video_id, live):
+        """
+        更新实时值，超出容量时淘汰最久未访问的视频（调用方持有 _lock）
+        """
+        self._live[video_id] = live
+        self._live.move_to_end(video_id)
+        while len(self._live) > self.max_live:
+            self._live.popitem(last=False)
+
+    def seed(self, video_id, db_count):
+        """
+        用数据库中的播放量校准实时值（详情缓存重新加载时调用）
+        """
+        with self._lock:
+            self._set_live(video_id, (db_count or 0) + self._unflushed(video_id))
+
+    def hit(self, video_id, db_count):
+        """
+        记录一次播放
+        参数:
+            video_id: 视频ID
+            db_count: 数据库（或缓存）中的播放量，实时值不存在时用于初始化
+        返回:
+            int: 本次播放后的实时播放量
+        """
+        with self._lock:
+            live = self._live.get(video_id)
+            if live is None:
+                live = (db_count or 0) + self._unflushed(video_id)
+            live += 1
+            self._set_live(video_id, live)
+            self._pending[video_id] = self._pending.get(video_id, 0) + 1
+            self._pending_total += 1
+        return live
+
+    def forget(self, video_id):
+        """
+        删除视频时丢弃其计数
+        """
+        with self._lock:
+            self._live.pop(video_id, None)
+            self._inflight.pop(video_id, None)
+            self._pending_total -= self._pending.pop(video_id, 0)
+
+    def pending(self):
+        """
+        返回未写回数据库的播放次数
+        """
+        with self._lock:
+            return self._pending_total
+
+    def should_flush(self):
+        return self._pending_total > 0 and (
+            self._pending_total >= self.flush_batch
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        )
+
+    def maybe_flush(self):
+        """
+        达到批量大小或时间间隔时写回（由请求线程顺带执行，已有线程在写回时直接返回）
+        写回失败不影响当前请求，增量保留到下次写回
+        """
+        if self.should_flush() and self._flush_lock.acquire(blocking=False):
+            try:
+                self._flush()
+            except Exception as e:
+                print(f'播放量写回失败: {e}')
+            finally:
+                self._flush_lock.release()
+
+    def flush(self):
+        """
+        立即写回所有未写回的增量（需要应用上下文）
+        返回:
+            int: 写回的播放次数
+        """
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self):
+        from models import db, Video
+        from utils.analytics import analytics
+        from utils.author_stats import views_update_stmt
+
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            total, self._pending_total = self._pending_total, 0
+            # 提交前的重新校准（seed）仍需加上这批增量
+            self._inflight = dict(batch)
+            self._last_flush = time.monotonic()
+        if not batch:
+            return 0
+
+        table = Video.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam('video_id'))
+            .values(view_count=table.c.view_count + bindparam('delta'))
+        )
+        try:
+            params = [{'video_id': vid, 'delta': delta} for vid, delta in batch.items()]
+            with db.engine.begin() as conn:
+                conn.execute(stmt, params)
+                # 同一事务中累加作者总播放量
+                conn.execute(views_update_stmt(), params)
+                categories = dict(conn.execute(
+                    select(table.c.id, table.c.category_id).where(table.c.id.in_(list(batch)))
+                ).all())
+        except Exception:
+            # 写回失败时把增量合并回去，下次再试（期间被删除的视频不再合并）
+            with self._lock:
+                for vid in self._inflight:
+                    delta = batch[vid]
+                    self._pending[vid] = self._pending.get(vid, 0) + delta
+                    self._pending_total += delta
+                self._inflight = {}
+            raise
+        with self._lock:
+            self._inflight = {}
+
+        # 按分类计入运营统计的播放次数（记在写回时所在的小时）
+        for vid, delta in batch.items():
+            analytics.add('views', categories.get(vid), delta)
+        analytics.maybe_flush()
+        return total
+
+
+view_counter = ViewCounter()
+
+
+def init_view_counter(app):
+    """
+    在应用工厂中配置播放量计数器，并在进程退出时写回剩余增量
+    配置项:
+        VIEW_FLUSH_INTERVAL: 写回间隔（秒）
+        VIEW_FLUSH_BATCH: 写回批量大小
+        VIEW_LIVE_MAXSIZE: 最多保留实时播放量的视频数
+    """
+    view_counter.flush_interval = app.config.get('VIEW_FLUSH_INTERVAL', view_counter.flush_interval)
+    view_counter.flush_batch = app.config.get('VIEW_FLUSH_BATCH', view_counter.flush_batch)
+    view_counter.max_live = app.config.get('VIEW_LIVE_MAXSIZE', view_counter.max_live)
+
+    def flush_on_exit():
+        if not view_counter.pending():
+            return
+        try:
+            with app.app_context():
+                view_counter.flush()
+        except Exception as e:
+            print(f'播放量写回失败: {e}')
+
+    atexit.register(flush_on_exit)
+    return flush_on_exit
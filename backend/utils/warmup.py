@@ -0,0 +1,71 @@
+"""
+启动预热模块
+生产环境（gunicorn preload_app）下在 master 进程加载应用后、fork worker 之前预热缓存，
+worker 启动后重建连接池并预先建立数据库连接，使第一个请求不必承担冷启动开销。
+"""
+from sqlalchemy import text
+
+from models import db, Category
+from utils.suggest import title_index
+
+
+def warm_caches(app):
+    """
+    预热进程内缓存：视频分类、首页列表（全部分类及每个分类）和标题联想索引
+    参数:
+        app: Flask 应用实例
+    返回:
+        int: 预热的首页列表条目数
+    """
+    with app.app_context():
+        category_ids = [c.id for c in Category.query.order_by(Category.id).all()]
+        title_index.refresh()
+    view_categories = app.view_functions['video.get_categories']
+    view_list = app.view_functions['video.get_video_list']
+
+    with app.test_request_context('/api/videos/categories'):
+        view_categories()
+    paths = ['/api/videos/list'] + [f'/api/videos/list?category_id={cid}' for cid in category_ids]
+    for path in paths:
+        with app.test_request_context(path):
+            view_list()
+    return len(paths)
+
+
+def warm_pool(app):
+    """
+    预先建立连接池中的常驻连接（同时借出 pool_size 个连接并各执行一次 SELECT 1）
+    参数:
+        app: Flask 应用实例
+    返回:
+        int: 建立的连接数
+    """
+    opened = 0
+    with app.app_context():
+        for engine in db.engines.values():
+            size_method = getattr(engine.pool, 'size', None)
+            size = size_method() if callable(size_method) else 1
+            connections = []
+            try:
+                for _ in range(max(size, 1)):
+                    conn = engine.connect()
+                    connections.append(conn)
+                    conn.execute(text('SELECT 1'))
+            finally:
+                for conn in connections:
+                    conn.close()
+            opened += len(connections)
+    return opened
+
+
+def dispose_engines(app, close=True):
+    """
+    丢弃当前进程持有的连接池
+    参数:
+        app: Flask 应用实例
+        close: 是否关闭连接。fork 之后的子进程不能复用父进程的数据库连接（socket 会被多个进程共享），
+               应传入 False，只丢弃引用、不关闭父进程仍在使用的连接
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
@@ -0,0 +1,13 @@
+"""
+UniVideo 生产环境 WSGI 入口
+供 gunicorn 等 WSGI 服务器加载，默认使用生产环境配置:
+    gunicorn -c gunicorn.conf.py wsgi:application
+"""
+import os
+
+os.environ.setdefault('FLASK_ENV', 'production')
+
+from app import app  # noqa: E402
+
+# WSGI 服务器约定的应用对象名
+application = app
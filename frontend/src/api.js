@@ -20,12 +20,12 @@ const api = axios.create({
  */
 api.interceptors.request.use(
   (config) => {
-    // 从 localStorage 获取用户ID
-    const userId = localStorage.getItem('user_id')
+    // 从 localStorage 获取登录时签发的访问令牌
+    const token = localStorage.getItem('token')
     
-    // 如果存在用户ID，添加到请求头中进行身份透传
-    if (userId) {
-      config.headers['X-User-ID'] = userId
+    // 如果已登录，在请求头中携带令牌（后端校验签名后识别当前用户）
+    if (token) {
+      config.headers['Authorization'] = `Bearer ${token}`
     }
     
     return config
@@ -36,5 +36,23 @@ api.interceptors.request.use(
   }
 )
 
+/**
+ * 响应拦截器
+ * 令牌过期或无效（401）时清除本地登录信息，跳转到登录页
+ */
+api.interceptors.response.use(
+  (response) => response,
+  (error) => {
+    if (error.response?.status === 401 && localStorage.getItem('token')) {
+      localStorage.removeItem('token')
+      localStorage.removeItem('user_id')
+      localStorage.removeItem('nickname')
+      localStorage.removeItem('role')
+      window.location.href = '/login'
+    }
+    return Promise.reject(error)
+  }
+)
+
 // 导出配置好的 axios 实例
 export default api
@@ -31,10 +31,18 @@ CREATE TABLE IF NOT EXISTS `videos` (
   `video_path` VARCHAR(255) NOT NULL COMMENT '视频文件路径',
   `status` TINYINT DEFAULT 0 COMMENT '状态: 0=待审核, 1=已发布, 2=驳回',
   `view_count` INT DEFAULT 0 COMMENT '播放量',
+  `play_count` INT NOT NULL DEFAULT 0 COMMENT '开始播放次数',
+  `complete_count` INT NOT NULL DEFAULT 0 COMMENT '完整播放次数',
+  `watch_time_ms` BIGINT NOT NULL DEFAULT 0 COMMENT '累计观看时长（毫秒）',
+  `unique_viewers` INT NOT NULL DEFAULT 0 COMMENT '独立访客数（估计值）',
   `created_at` DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '上传时间',
   FOREIGN KEY (`user_id`) REFERENCES `users`(`id`) ON DELETE CASCADE,
   FOREIGN KEY (`category_id`) REFERENCES `categories`(`id`),
-  INDEX `idx_status` (`status`) /* 优化审核查询速度 */
+  INDEX `idx_status` (`status`), /* 优化审核查询速度 */
+  INDEX `idx_status_created` (`status`, `created_at`), /* 首页列表：已发布视频按时间倒序 */
+  INDEX `idx_status_category_created` (`status`, `category_id`, `created_at`), /* 首页分类筛选 */
+  INDEX `idx_user_status_created` (`user_id`, `status`, `created_at`), /* 作者主页：某作者的已发布视频 */
+  INDEX `idx_user_created` (`user_id`, `created_at`) /* 个人中心：我的视频 */
 ) COMMENT='视频信息表';
 
 /* 4. 评论表 (已更新：增加 root_id 和索引) */
@@ -50,7 +58,8 @@ CREATE TABLE IF NOT EXISTS `comments` (
   FOREIGN KEY (`video_id`) REFERENCES `videos`(`id`) ON DELETE CASCADE,
   FOREIGN KEY (`parent_id`) REFERENCES `comments`(`id`) ON DELETE CASCADE,
   FOREIGN KEY (`root_id`) REFERENCES `comments`(`id`) ON DELETE CASCADE,
-  INDEX `idx_video_root` (`video_id`, `root_id`) /* 核心索引：查询某视频下某楼层的所有回复 */
+  INDEX `idx_video_root` (`video_id`, `root_id`), /* 核心索引：查询某视频下某楼层的所有回复 */
+  INDEX `idx_video_created` (`video_id`, `created_at`) /* 某视频的评论按时间排序 */
 ) COMMENT='评论互动表';
 
 /* 5. 点赞表 */
@@ -60,6 +69,7 @@ CREATE TABLE IF NOT EXISTS `likes` (
   `video_id` INT NOT NULL,
   `created_at` DATETIME DEFAULT CURRENT_TIMESTAMP,
   UNIQUE KEY `unique_like` (`user_id`, `video_id`),
+  INDEX `idx_likes_video` (`video_id`), /* 按视频统计点赞数（唯一键以 user_id 开头，无法使用） */
   FOREIGN KEY (`user_id`) REFERENCES `users`(`id`) ON DELETE CASCADE,
   FOREIGN KEY (`video_id`) REFERENCES `videos`(`id`) ON DELETE CASCADE
 ) COMMENT='点赞记录表';
@@ -71,6 +81,62 @@ CREATE TABLE IF NOT EXISTS `collections` (
   `video_id` INT NOT NULL COMMENT '视频ID',
   `created_at` DATETIME DEFAULT CURRENT_TIMESTAMP,
   UNIQUE KEY `unique_collection` (`user_id`, `video_id`), /* 防止重复收藏 */
+  INDEX `idx_collections_video` (`video_id`), /* 按视频统计收藏数 */
+  INDEX `idx_collections_user_created` (`user_id`, `created_at`, `id`), /* 我的收藏：游标分页 */
   FOREIGN KEY (`user_id`) REFERENCES `users`(`id`) ON DELETE CASCADE,
   FOREIGN KEY (`video_id`) REFERENCES `videos`(`id`) ON DELETE CASCADE
-) COMMENT='用户收藏表';
\ No newline at end of file
+) COMMENT='用户收藏表';
+
+/* 7. 作者统计汇总表（作者主页、个人中心按主键读取，由写操作增量维护，flask recompute-author-stats 全量重算） */
+CREATE TABLE IF NOT EXISTS `author_stats` (
+  `user_id` INT NOT NULL PRIMARY KEY COMMENT '作者ID',
+  `published_videos` INT NOT NULL DEFAULT 0 COMMENT '已发布视频数',
+  `total_views` BIGINT NOT NULL DEFAULT 0 COMMENT '已发布视频总播放量',
+  `total_likes` INT NOT NULL DEFAULT 0 COMMENT '已发布视频总获赞数',
+  `total_collections` INT NOT NULL DEFAULT 0 COMMENT '已发布视频总收藏数',
+  `followers_count` INT NOT NULL DEFAULT 0 COMMENT '粉丝数',
+  `following_count` INT NOT NULL DEFAULT 0 COMMENT '关注数',
+  `updated_at` DATETIME DEFAULT NULL COMMENT '更新时间',
+  FOREIGN KEY (`user_id`) REFERENCES `users`(`id`) ON DELETE CASCADE
+) COMMENT='作者统计汇总表';
+
+/* 8. 运营统计表（按小时 / 按天，每个 (指标, 时间, 分类) 一行，时间为 UTC，由 utils/analytics.py 批量写回） */
+CREATE TABLE IF NOT EXISTS `stats_hourly` (
+  `metric` VARCHAR(20) NOT NULL COMMENT '指标名称',
+  `bucket` DATETIME NOT NULL COMMENT '小时起点（UTC）',
+  `category_id` INT NOT NULL COMMENT '视频分类ID',
+  `value` BIGINT NOT NULL DEFAULT 0 COMMENT '累计值',
+  PRIMARY KEY (`metric`, `bucket`, `category_id`) /* 按 (指标, 时间) 范围查询 */
+) COMMENT='按小时汇总的运营统计表';
+
+CREATE TABLE IF NOT EXISTS `stats_daily` (
+  `metric` VARCHAR(20) NOT NULL COMMENT '指标名称',
+  `bucket` DATE NOT NULL COMMENT '日期（UTC）',
+  `category_id` INT NOT NULL COMMENT '视频分类ID',
+  `value` BIGINT NOT NULL DEFAULT 0 COMMENT '累计值',
+  PRIMARY KEY (`metric`, `bucket`, `category_id`)
+) COMMENT='按天汇总的运营统计表';
+
+/* 9. 视频访客草图表（每个视频一个压缩的 HyperLogLog 寄存器数组，估计值同步到 videos.unique_viewers） */
+CREATE TABLE IF NOT EXISTS `video_viewer_sketches` (
+  `video_id` INT NOT NULL PRIMARY KEY COMMENT '视频ID',
+  `registers` BLOB NOT NULL COMMENT 'HyperLogLog 草图（压缩）',
+  `updated_at` DATETIME DEFAULT NULL COMMENT '更新时间',
+  FOREIGN KEY (`video_id`) REFERENCES `videos`(`id`) ON DELETE CASCADE
+) COMMENT='视频访客草图表';
+
+/* 10. 相关视频表（每个视频按相似度排列的相关视频ID，小端 uint32 数组，由 flask build-related 离线构建） */
+CREATE TABLE IF NOT EXISTS `video_related` (
+  `video_id` INT NOT NULL PRIMARY KEY COMMENT '视频ID',
+  `related_ids` BLOB NOT NULL COMMENT '相关视频ID数组',
+  `updated_at` DATETIME DEFAULT NULL COMMENT '构建时间',
+  FOREIGN KEY (`video_id`) REFERENCES `videos`(`id`) ON DELETE CASCADE
+) COMMENT='相关视频表';
+
+/* 11. 首页推荐候选表（每个用户按得分排列的候选视频ID，小端 uint32 数组，由 flask build-feeds 离线生成） */
+CREATE TABLE IF NOT EXISTS `user_feeds` (
+  `user_id` INT NOT NULL PRIMARY KEY COMMENT '用户ID',
+  `video_ids` BLOB NOT NULL COMMENT '候选视频ID数组',
+  `updated_at` DATETIME DEFAULT NULL COMMENT '生成时间',
+  FOREIGN KEY (`user_id`) REFERENCES `users`(`id`) ON DELETE CASCADE
+) COMMENT='首页推荐候选表';